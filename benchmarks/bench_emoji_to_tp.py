@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Round-trip benchmark: convert a large synthetic toki pona text to sitelen
+emoji and back, checking the result and timing both directions.
+
+    python -m benchmarks.bench_emoji_to_tp --lines 200000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from tools.convert_tp_text import LineConverter
+from tools.emoji_to_tp import EmojiDecoder
+from tools.profile import load_profile
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def make_lines(words: list[str], n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(3, 14)))
+        lines.append(sentence + rng.choice([".", ":", "!", "?", ","]))
+    return lines
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    ap.add_argument("--lines", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    profile = load_profile(args.profile)
+    # canonical words only, so the round trip is exact
+    words = sorted(w for w in profile.entries if not w.startswith("_") and w not in profile.aliases)
+    src = make_lines(words, args.lines, args.seed)
+    size = sum(len(line.encode("utf-8")) + 1 for line in src)
+
+    convert = LineConverter(profile)
+    decode = EmojiDecoder(profile)
+
+    t0 = time.perf_counter()
+    emoji = [convert(line) for line in src]
+    t1 = time.perf_counter()
+    back = [decode(line) for line in emoji]
+    t2 = time.perf_counter()
+
+    bad = sum(a != b for a, b in zip(src, back))
+    mb = size / 1e6
+    print(f"input: {args.lines} lines, {mb:.1f} MB")
+    print(f"tp -> emoji: {t1 - t0:6.2f}s ({mb / (t1 - t0):6.1f} MB/s)")
+    print(f"emoji -> tp: {t2 - t1:6.2f}s ({mb / (t2 - t1):6.1f} MB/s)")
+    print(f"round trip: {'OK' if not bad else f'{bad} lines differ'}")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-token cost of the emoji check + slug computation in the
+HTML export, before (is_probably_emoji_token + to_twemoji_slug on every token)
+and after (a per-profile SlugIndex).
+
+    python -m benchmarks.bench_twemoji_slug
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+from pathlib import Path
+
+from tools.profile import load_compiled_profile
+from tools.twemoji import SlugIndex
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def slug_before(s: str) -> str:
+    # to_twemoji_slug as it was: codepoint list + filter + hex per call
+    cps = []
+    for cp in [ord(ch) for ch in s]:
+        if cp in (0xFE0E, 0xFE0F):
+            continue
+        cps.append(cp)
+    return "-".join(f"{cp:x}" for cp in cps)
+
+def is_emoji_before(token: str) -> bool:
+    return any(ord(ch) > 0x7F for ch in token) and token.strip() != ""
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    ap.add_argument("--tokens", type=int, default=200_000, help="Tokens per run")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    profile = load_compiled_profile(args.profile)
+    glyphs = sorted(set(profile.values()))
+    rng = random.Random(0)
+    # Mostly profile glyphs, some untranslated words and punctuation, like a converted book
+    pool = glyphs * 8 + ["kijetesantakalu", "!", ",", "Mewi", "?"]
+    tokens = [rng.choice(pool) for _ in range(args.tokens)]
+
+    def before() -> None:
+        for t in tokens:
+            if is_emoji_before(t):
+                slug_before(t)
+
+    index = SlugIndex(glyphs)
+    emoji_slug = index.emoji_slug
+
+    def after() -> None:
+        for t in tokens:
+            emoji_slug(t)
+
+    for name, fn in (("before", before), ("after", after)):
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:>6}: {best / len(tokens) * 1e9:8.1f} ns/token")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
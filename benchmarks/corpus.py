@@ -0,0 +1,72 @@
+"""
+Seeded synthetic toki pona corpus for the benchmarks.
+
+Sentences are built from words/nimi_pu.txt around the usual particles
+(li, e, la, pi, o), with commas, quotes, parentheses, colons, a few proper
+names (not in the profile) and blank lines between paragraphs, so the
+converter and renderer see roughly what a real book gives them.
+"""
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+WORDS_FILE = ROOT / "words" / "nimi_pu.txt"
+
+PARTICLES = {"li", "e", "la", "pi", "o", "en", "anu"}
+NAMES = ["Sonja", "Kalin", "Mewi", "Tokipona", "Lisa", "kijetesantakalu"]
+ENDINGS = [".", ".", ".", ".", "!", "?", ":"]
+
+
+def load_words(path: Path = WORDS_FILE) -> list[str]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [w.strip().lower() for w in lines if w.strip() and not w.strip().startswith("#")]
+
+
+def _phrase(rng: random.Random, content: list[str]) -> str:
+    words = [rng.choice(content) for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.15:
+        words.append("pi " + " ".join(rng.choice(content) for _ in range(2)))
+    if rng.random() < 0.05:
+        words.insert(0, "jan " + rng.choice(NAMES))
+    return " ".join(words)
+
+
+def sentence(rng: random.Random, content: list[str]) -> str:
+    parts = []
+    if rng.random() < 0.2:
+        parts.append(_phrase(rng, content) + " la")
+    subject = rng.choice(["mi", "sina", "ona", None, None])
+    if subject is None:
+        parts.append(_phrase(rng, content) + " li")
+    else:
+        parts.append(subject)
+    parts.append(_phrase(rng, content))
+    if rng.random() < 0.5:
+        parts.append("e " + _phrase(rng, content))
+    text = " ".join(parts)
+    if rng.random() < 0.1:
+        text = text.replace(" e ", ", e ", 1)
+    text += rng.choice(ENDINGS)
+    roll = rng.random()
+    if roll < 0.08:
+        text = f'"{text}"'
+    elif roll < 0.12:
+        text = f"({text})"
+    elif roll < 0.14:
+        text = f"“{text}”"
+    return text
+
+
+def generate(lines: int, seed: int = 0, words: list[str] | None = None) -> list[str]:
+    """`lines` lines of text (without newlines); same seed, same corpus."""
+    rng = random.Random(seed)
+    content = [w for w in (words or load_words()) if w not in PARTICLES]
+    out: list[str] = []
+    while len(out) < lines:
+        if out and rng.random() < 0.12:
+            out.append("")  # paragraph break
+            continue
+        out.append(" ".join(sentence(rng, content) for _ in range(rng.randint(1, 3))))
+    return out
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load test for tools.http_service: keep-alive clients hammering one endpoint,
+reporting requests/s and p50/p99 latency.
+
+    python -m tools.http_service &
+    python -m benchmarks.http_load --url http://127.0.0.1:8765 --path /convert
+    python -m benchmarks.http_load --spawn        # start a service on a free port first
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SAMPLE_TEXT = "jan pona li toki e ni: mi moku e kili. sina lukin e ni?"
+
+def request_bytes(host: str, path: str, words: int) -> bytes:
+    if path.startswith("/resolve"):
+        body = {"words": SAMPLE_TEXT.replace(":", "").replace(".", "").replace("?", "").split()[:words]}
+    else:
+        body = {"text": SAMPLE_TEXT}
+    data = json.dumps(body).encode("utf-8")
+    head = f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+    return head.encode("latin-1") + data
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+async def client(host: str, port: int, req: bytes, n: int, latencies: list[float], errors: list[int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            writer.write(req)
+            await writer.drain()
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run(host: str, port: int, path: str, requests: int, concurrency: int, words: int) -> dict:
+    req = request_bytes(host, path, words)
+    latencies: list[float] = []
+    errors: list[int] = []
+    per_client = max(1, requests // concurrency)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(host, port, req, per_client, latencies, errors) for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "rps": len(latencies) / wall,
+        "p50_ms": q[49] * 1000,
+        "p99_ms": q[98] * 1000,
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--path", default="/convert", help="/resolve, /convert or /render")
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--words", type=int, default=8, help="Words per /resolve batch")
+    ap.add_argument("--spawn", action="store_true", help="Start tools.http_service on a free port for the run")
+    ap.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = ap.parse_args()
+
+    proc = None
+    url = urlsplit(args.url)
+    host, port = url.hostname or "127.0.0.1", url.port or 80
+    if args.spawn:
+        port = free_port()
+        cmd = [sys.executable, "-m", "tools.http_service", "--host", host, "--port", str(port)]
+        proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        proc.stdout.readline()  # "Serving ..." once the socket is bound
+    try:
+        result = asyncio.run(run(host, port, args.path, args.requests, args.concurrency, args.words))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"{result['path']}: {result['requests']} requests, {result['errors']} errors, "
+            f"{result['rps']:.0f} req/s, p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms "
+            f"(concurrency {result['concurrency']})"
+        )
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the hot paths: profile load, resolve, convert, render
+(and the fused toki pona -> HTML pipeline).
+
+    python -m benchmarks.suite run --out bench.json            # time everything
+    python -m benchmarks.suite compare bench.json              # vs benchmarks/baseline.json
+    python -m benchmarks.suite run --out benchmarks/baseline.json   # refresh the baseline
+
+Each case runs on a seeded synthetic corpus (benchmarks.corpus) at several
+sizes and records the best of --repeat runs. `compare` exits 1 when a case
+is slower than the baseline by more than --threshold (a fraction).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from benchmarks.corpus import generate
+from tools.convert_tp_text import LineConverter, iter_converted_lines
+from tools.emoji_to_tp import EmojiDecoder
+from tools.emojify_to_html import AssetMaterializer, iter_rendered, write_html
+from tools.profile import load_compiled_profile, load_profile, write_binary_profile
+from tools.twemoji import to_twemoji_slug
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+DEFAULT_SIZES = (1_000, 10_000, 50_000)
+RESULTS_FORMAT = 1
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_suite(profile_path: Path, sizes: list[int], repeat: int, seed: int) -> dict:
+    """{case: {"seconds", "items", "ns_per_item"}} with cases named "<bench>/<size>"."""
+    results: dict[str, dict] = {}
+
+    def record(name: str, seconds: float, items: int) -> None:
+        results[name] = {"seconds": seconds, "items": items, "ns_per_item": seconds / max(items, 1) * 1e9}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmpdir = Path(tmp)
+        binary = tmpdir / "profile.bin"
+        write_binary_profile(load_profile(profile_path), binary)
+        loads = 50
+        record("load/json", best_of(lambda: [load_compiled_profile(profile_path) for _ in range(loads)], repeat), loads)
+        record("load/binary", best_of(lambda: [load_compiled_profile(binary).close() for _ in range(loads)], repeat), loads)
+
+        profile = load_compiled_profile(profile_path)
+        # an empty PNG per profile glyph: render sees every emoji as available
+        assets_dir = tmpdir / "assets"
+        assets_dir.mkdir()
+        for glyph in set(profile.values()):
+            (assets_dir / f"{to_twemoji_slug(glyph)}.png").write_bytes(b"")
+        decoder = EmojiDecoder(load_profile(profile_path))
+
+        for size in sizes:
+            lines = generate(size, seed)
+            text = [line + "\n" for line in lines]
+            tokens = [t for line in lines for t in line.split()]
+
+            record(f"resolve/{size}", best_of(lambda: profile.resolve_many(tokens), repeat), len(tokens))
+            record(
+                f"convert/{size}",
+                best_of(lambda: sum(1 for _ in iter_converted_lines(text, profile)), repeat),
+                len(lines),
+            )
+
+            converted = [LineConverter(profile)(line) for line in lines]
+            out_html = tmpdir / "index.html"
+
+            def render() -> None:
+                assets = AssetMaterializer(assets_dir, None)
+                write_html(out_html, (h for _, h in iter_rendered(converted, profile, assets)))
+
+            record(f"render/{size}", best_of(render, repeat), len(lines))
+
+            def tp_html() -> None:
+                assets = AssetMaterializer(assets_dir, None)
+                converter = LineConverter(profile)
+                write_html(out_html, (h for _, h in iter_rendered(lines, profile, assets, converter=converter)))
+
+            record(f"tp_html/{size}", best_of(tp_html, repeat), len(lines))
+            record(f"decode/{size}", best_of(lambda: [decoder(line) for line in converted], repeat), len(lines))
+
+    return results
+
+
+def compare(current: dict, baseline: dict) -> list[tuple[str, float, float, Optional[float]]]:
+    """
+    (case, baseline ns/item, current ns/item, ratio) for cases present in
+    both, in baseline order. The ratio is None when the baseline is not
+    positive (a trivially fast or hand-edited entry).
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        b, c = base["ns_per_item"], cur["ns_per_item"]
+        rows.append((name, b, c, c / b if b > 0 else None))
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark suite for load/resolve/convert/render.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="Run the suite and write results as JSON")
+    r.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    r.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Corpus sizes in lines (comma-separated)")
+    r.add_argument("--repeat", type=int, default=5, help="Runs per case; the best one is kept")
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--out", type=Path, default=None, help="Results JSON (default: stdout)")
+
+    c = sub.add_parser("compare", help="Compare results against a baseline")
+    c.add_argument("results", type=Path)
+    c.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    c.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown as a fraction (default: 0.25)")
+    args = ap.parse_args()
+
+    if args.cmd == "run":
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        data = {
+            "format": RESULTS_FORMAT,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "seed": args.seed,
+            "results": run_suite(args.profile, sizes, args.repeat, args.seed),
+        }
+        text = json.dumps(data, indent=2) + "\n"
+        if args.out is None:
+            sys.stdout.write(text)
+        else:
+            args.out.parent.mkdir(parents=True, exist_ok=True)
+            args.out.write_text(text, encoding="utf-8")
+            for name, res in data["results"].items():
+                print(f"{name:<16} {res['ns_per_item']:12.1f} ns/item")
+        return 0
+
+    current = json.loads(args.results.read_text(encoding="utf-8"))
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    rows = compare(current, baseline)
+    regressions = 0
+    for name, base, cur, ratio in rows:
+        flag = ""
+        if ratio is not None and ratio > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        shown = "  n/a" if ratio is None else f"{ratio:5.2f}"
+        print(f"{name:<16} {base:12.1f} -> {cur:12.1f} ns/item  x{shown}{flag}")
+    if not rows:
+        print("No cases in common with the baseline")
+        return 2
+    print(f"{regressions} regression(s) over {args.threshold:.0%} (baseline: {args.baseline})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
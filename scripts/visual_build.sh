@@ -6,16 +6,19 @@ set -euo pipefail
 #   ./scripts/visual_build.sh input.txt out/visual
 #   ./scripts/visual_build.sh --fetch input.txt
 #   ./scripts/visual_build.sh --fetch --pdf input.txt
+#   ./scripts/visual_build.sh --tp book.txt        # input in toki pona: convert + render in one pass
 
 FETCH=0
 PDF=0
+TP=()
 
 while [[ $# -gt 0 ]]; do
   case "$1" in
     --fetch) FETCH=1; shift ;;
     --pdf)   PDF=1; shift ;;
+    --tp)    TP=(--tp); shift ;;
     -h|--help)
-      echo "Usage: $0 [--fetch] [--pdf] <input.txt> [outdir]"
+      echo "Usage: $0 [--fetch] [--pdf] [--tp] <input.txt> [outdir]"
       exit 0
       ;;
     *) break ;;
@@ -41,28 +44,22 @@ cd "$REPO_ROOT"
 
 if [[ $FETCH -eq 1 ]]; then
   echo "Fetching Twemoji assets (if needed)..."
-  python3 -m tools.fetch_twemoji_assets
+  python3 -m tools fetch
 fi
 
+# Incremental rebuilds: unchanged chunks are reused from the build cache
+CACHE_FILE=".cache/build/${OUTDIR//\//_}.json"
+
 echo "Exporting to HTML..."
-python3 -m tools.emojify_to_html --in "$INP" --outdir "$OUTDIR"
+python3 -m tools html ${TP[@]+"${TP[@]}"} --in "$INP" --outdir "$OUTDIR" --cache "$CACHE_FILE"
 
 echo "OK: $OUTDIR/index.html"
 
 if [[ $PDF -eq 1 ]]; then
-  # Try Chrome headless for PDF
-  CHROME_BIN="/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-  if [[ ! -x "$CHROME_BIN" ]]; then
-    echo "PDF requested, but Google Chrome not found at:"
-    echo "  $CHROME_BIN"
-    echo "Open $OUTDIR/index.html in a browser and print to PDF, or install Chrome."
-    exit 0
-  fi
-
-  FILE_URL="file://$REPO_ROOT/$OUTDIR/index.html"
+  # Built-in PDF writer: each used PNG is embedded once, pages are streamed to disk
   PDF_OUT="$OUTDIR/book.pdf"
 
-  echo "Rendering PDF via Chrome headless..."
-  "$CHROME_BIN" --headless --disable-gpu --print-to-pdf="$PDF_OUT" "$FILE_URL"
+  echo "Rendering PDF..."
+  python3 -m tools pdf ${TP[@]+"${TP[@]}"} --in "$INP" --out "$PDF_OUT"
   echo "OK: $PDF_OUT"
 fi
@@ -0,0 +1,67 @@
+from pathlib import Path
+import os
+import stat
+import subprocess
+import sys
+
+from tools.asset_store import AssetStore, write_atomic
+from tools.profile import load_profile, resolve
+from tools.twemoji import to_twemoji_slug
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_store_dedupes_across_versions_and_persists(tmp_path: Path):
+    store = AssetStore(tmp_path / "store")
+    a = store.put("16.0.0", "263a", b"png-a")
+    b = store.put("17.0.0", "263a", b"png-a")
+    store.put("17.0.0", "1f44d", b"png-b")
+    assert a == b
+    assert len(list((tmp_path / "store" / "objects").rglob("*.png"))) == 2
+    store.save()
+
+    again = AssetStore(tmp_path / "store")
+    assert again.verify("16.0.0", "263a")
+    assert again.path_for("17.0.0", "1f44d").read_bytes() == b"png-b"
+    assert not again.verify("17.0.0", "nope")
+
+def test_store_detects_corruption(tmp_path: Path):
+    store = AssetStore(tmp_path / "store")
+    path = store.put("17.0.0", "263a", b"png-a")
+    path.write_bytes(b"png")  # truncated
+    assert not store.verify("17.0.0", "263a")
+    path.write_bytes(b"png-X")  # same size, different content
+    assert store.verify("17.0.0", "263a", deep=False)
+    assert store.verify("17.0.0", "263a")  # written by this run: trusted
+    assert not store.verify("17.0.0", "263a", deep=True)
+    store.save()
+    assert not AssetStore(tmp_path / "store").verify("17.0.0", "263a")  # a later run re-hashes
+    # putting the right bytes again repairs the object
+    store.put("17.0.0", "263a", b"png-a")
+    assert store.verify("17.0.0", "263a", deep=True)
+    assert path.read_bytes() == b"png-a"
+
+def test_write_atomic_uses_umask_mode_not_mkstemp_0600(tmp_path: Path):
+    umask = os.umask(0o022)
+    os.umask(umask)
+    out = tmp_path / "a.png"
+    write_atomic(out, b"png")
+    assert stat.S_IMODE(out.stat().st_mode) == 0o666 & ~umask
+
+def test_emojify_to_html_resolves_assets_through_store(tmp_path: Path):
+    p = load_profile(PROFILE)
+    store = AssetStore(tmp_path / "store")
+    for w in ["jan", "pona"]:
+        store.put("17.0.0", to_twemoji_slug(resolve(w, p)), w.encode("utf-8"))
+    store.save()
+
+    inp = tmp_path / "in.txt"
+    inp.write_text("jan pona\n", encoding="utf-8")
+    outdir = tmp_path / "out"
+    cmd = [sys.executable, "-m", "tools.emojify_to_html", "--in", str(inp), "--outdir", str(outdir),
+           "--store", str(tmp_path / "store"), "--twemoji-version", "17.0.0"]
+    subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+
+    slug = to_twemoji_slug(resolve("jan", p))
+    assert f'src="img/{slug}.png"' in (outdir / "index.html").read_text(encoding="utf-8")
+    assert (outdir / "img" / f"{slug}.png").read_bytes() == b"jan"
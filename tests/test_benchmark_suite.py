@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.corpus import generate, load_words
+from benchmarks.suite import run_suite
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_corpus_is_seeded_and_uses_pu_words():
+    a, b = generate(200, seed=3), generate(200, seed=3)
+    assert a == b and a != generate(200, seed=4)
+    assert len(a) == 200 and "" in a
+    pu = set(load_words())
+    words = [w.strip("\"“”().,!?:").lower() for line in a for w in line.split()]
+    assert sum(w in pu for w in words) / len(words) > 0.95
+
+def test_run_suite_covers_all_cases():
+    results = run_suite(PROFILE, [20], repeat=1, seed=0)
+    assert set(results) == {"load/json", "load/binary", "resolve/20", "convert/20", "render/20", "tp_html/20", "decode/20"}
+    assert all(r["seconds"] > 0 and r["ns_per_item"] > 0 for r in results.values())
+
+def test_compare_flags_regressions(tmp_path: Path):
+    def write(name, ns):
+        path = tmp_path / name
+        path.write_text(json.dumps({"results": {"convert/10": {"ns_per_item": ns}}}), encoding="utf-8")
+        return path
+
+    base = write("base.json", 100.0)
+    cmd = [sys.executable, "-m", "benchmarks.suite", "compare", "--baseline", str(base)]
+    ok = subprocess.run(cmd + [str(write("ok.json", 120.0))], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert ok.returncode == 0
+    slow = subprocess.run(cmd + [str(write("slow.json", 130.0))], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert slow.returncode == 1 and "REGRESSION" in slow.stdout
+    loose = subprocess.run(cmd + ["--threshold", "0.5", str(tmp_path / "slow.json")], cwd=ROOT)
+    assert loose.returncode == 0
+
+def test_compare_zero_baseline_is_not_a_ratio(tmp_path: Path):
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps({"results": {"load/json": {"ns_per_item": 0}, "convert/10": {"ns_per_item": 100.0}}}), encoding="utf-8")
+    cur = tmp_path / "cur.json"
+    cur.write_text(json.dumps({"results": {"load/json": {"ns_per_item": 5.0}, "convert/10": {"ns_per_item": 100.0}}}), encoding="utf-8")
+    cmd = [sys.executable, "-m", "benchmarks.suite", "compare", "--baseline", str(base), str(cur)]
+    res = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert res.returncode == 0
+    assert "x  n/a" in res.stdout and "x 1.00" in res.stdout
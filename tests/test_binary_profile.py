@@ -0,0 +1,62 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tools.profile import (
+    MappedProfile,
+    Profile,
+    compile_profile,
+    load_compiled_profile,
+    load_profile,
+    resolve,
+    write_binary_profile,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_binary_profile_matches_resolve(tmp_path: Path):
+    p = load_profile(PROFILE)
+    out = tmp_path / "p.bin"
+    write_binary_profile(p, out)
+    with MappedProfile(out) as mp:
+        cp = compile_profile(p)
+        assert (mp.name, mp.version, mp.digest, len(mp)) == (cp.name, cp.version, cp.digest, len(cp))
+        words = list(p.entries) + list(p.aliases) + ["JAN", " pona ", "Ali", "nope", "", "\ud800", "_punct_colon"]
+        for w in words:
+            assert mp.resolve_quiet(w) == resolve(w, p), w
+        assert mp.resolve_many(["jan", "xyz"]) == [resolve("jan", p), None]
+        assert (mp.hits, mp.misses) == (1, 1)
+        assert dict(mp.items()) == dict(cp.table)
+
+def test_load_compiled_profile_detects_binary(tmp_path: Path):
+    out = tmp_path / "p.bin"
+    write_binary_profile(Profile(name="t", version="2", aliases={"ali": "ale"}, entries={"ale": "X"}), out)
+    mp = load_compiled_profile(out)
+    assert isinstance(mp, MappedProfile)
+    assert mp.resolve("ALI") == "X" and sorted(mp.values()) == ["X", "X"]
+    mp.close()
+
+def test_binary_profile_rejects_corruption(tmp_path: Path):
+    out = tmp_path / "p.bin"
+    write_binary_profile(load_profile(PROFILE), out)
+    data = bytearray(out.read_bytes())
+    data[-1] ^= 0xFF
+    out.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="checksum"):
+        MappedProfile(out)
+    out.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        MappedProfile(out)
+
+def test_compile_cli_and_lookup(tmp_path: Path):
+    out = tmp_path / "default.bin"
+    subprocess.run([sys.executable, "-m", "tools.profile", "compile", str(PROFILE), "--out", str(out)], cwd=ROOT, check=True)
+    subprocess.run([sys.executable, "-m", "tools.profile", "verify", str(out), str(PROFILE)], cwd=ROOT, check=True)
+    res = subprocess.run(
+        [sys.executable, "tools/lookup.py", "jan", "--profile", str(out)],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True,
+    )
+    assert res.stdout == "jan\t👤\n"
@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+from tools.build_cache import BuildCache, chunk_lines
+from tools.profile import load_profile, resolve
+from tools.twemoji import to_twemoji_slug
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_chunk_boundaries_resync_after_insert():
+    lines = [f"jan {i} li toki" for i in range(500)]
+    before = list(map(tuple, chunk_lines(lines)))
+    edited = lines[:250] + ["new line"] + lines[250:]
+    after = list(map(tuple, chunk_lines(edited)))
+    assert sum(len(c) for c in after) == 501
+    assert len(set(after) - set(before)) <= 2
+
+def test_map_chunks_reuses_saved_entries(tmp_path: Path):
+    calls = []
+    def render(chunk):
+        calls.append(chunk)
+        return [line.upper() for line in chunk]
+
+    lines = [f"line {i}" for i in range(50)] + [""]
+    cache = BuildCache(tmp_path / "c.json", "ctx")
+    out = [v for _, value in cache.map_chunks(lines, render) for v in value]
+    cache.save()
+    assert out == [line.upper() for line in lines]
+
+    calls.clear()
+    cache = BuildCache(tmp_path / "c.json", "ctx")
+    assert [v for _, value in cache.map_chunks(lines, render) for v in value] == out
+    assert calls == [] and cache.misses == 0
+
+    other = BuildCache(tmp_path / "c.json", "other ctx")
+    list(other.map_chunks(lines, render))
+    assert other.hits == 0
+
+def test_convert_tp_text_cache_keeps_output_identical(tmp_path: Path):
+    inp = tmp_path / "in.txt"
+    out = tmp_path / "out.txt"
+    ref = tmp_path / "ref.txt"
+    cache = tmp_path / "cache.json"
+    text = "".join(f"jan {i} li pona.\n" + ("\n" if i % 7 == 0 else "") for i in range(300))
+    for edit in [text, text.replace("jan 150 li", "mi 150 li"), text + "toki: a"]:
+        inp.write_text(edit, encoding="utf-8")
+        base = [sys.executable, "-m", "tools.convert_tp_text", "--in", str(inp)]
+        subprocess.check_call(base + ["--out", str(out), "--cache", str(cache)], stdout=subprocess.DEVNULL)
+        subprocess.check_call(base + ["--out", str(ref)])
+        assert out.read_bytes() == ref.read_bytes()
+
+def test_emojify_cache_rerenders_when_asset_appears(tmp_path: Path):
+    p = load_profile(PROFILE)
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    inp = tmp_path / "in.txt"
+    inp.write_text("jan pona\n", encoding="utf-8")
+    cmd = [sys.executable, "-m", "tools.emojify_to_html", "--in", str(inp), "--outdir", str(tmp_path / "out"),
+           "--assets", str(assets), "--cache", str(tmp_path / "cache.json")]
+
+    subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+    assert "<img" not in (tmp_path / "out" / "index.html").read_text(encoding="utf-8")
+
+    (assets / f"{to_twemoji_slug(resolve('jan', p))}.png").write_bytes(b"png")
+    subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+    assert "<img" in (tmp_path / "out" / "index.html").read_text(encoding="utf-8")
+
+def test_warm_cache_runs_report_the_same_token_counts(tmp_path: Path):
+    inp = tmp_path / "in.txt"
+    inp.write_text("".join(f"jan {i} li pona.\n\n" for i in range(40)), encoding="utf-8")
+    cmds = [
+        [sys.executable, "-m", "tools.convert_tp_text", "--in", str(inp), "--out", str(tmp_path / "out.txt"),
+         "--cache", str(tmp_path / "convert.json"), "--stats", str(tmp_path / "stats.json")],
+        [sys.executable, "-m", "tools.emojify_to_html", "--tp", "--in", str(inp), "--outdir", str(tmp_path / "html"),
+         "--assets", str(tmp_path), "--cache", str(tmp_path / "html.json"), "--stats", str(tmp_path / "stats.json")],
+    ]
+    for cmd in cmds:
+        runs = []
+        for _ in range(2):
+            subprocess.check_call(cmd, cwd=ROOT, stdout=subprocess.DEVNULL)
+            runs.append(json.loads((tmp_path / "stats.json").read_text(encoding="utf-8"))["counters"])
+        cold, warm = runs
+        assert warm["cache_misses"] == 0 and warm["cache_hits"] == cold["cache_hits"] + cold["cache_misses"]
+        assert cold["tokens"] > 0
+        assert {k: warm[k] for k in ("tokens", "resolve_hits", "resolve_misses")} == {
+            k: cold[k] for k in ("tokens", "resolve_hits", "resolve_misses")
+        }
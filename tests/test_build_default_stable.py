@@ -0,0 +1,161 @@
+import io
+import json
+import re
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from tools.build_default_stable import Source, extract_mapping, ingest, parse_source, stream_mapping
+from tools.json_stream import JsonStream
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+class Upstream(BaseHTTPRequestHandler):
+    # stand-in for raw.githubusercontent.com: one JSON document with an ETag
+    body = b""
+    etag = '"v1"'
+    log: list = []
+
+    def do_GET(self):
+        cond = self.headers.get("If-None-Match")
+        self.log.append(cond)
+        if cond == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+def upstream_doc(extra: dict) -> bytes:
+    entries = json.loads(PROFILE.read_text(encoding="utf-8"))["entries"]
+    items = [{"word": w, "emoji": e} for w, e in {**entries, **extra}.items() if not w.startswith("_")]
+    return json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+@pytest.fixture
+def upstream():
+    Upstream.body, Upstream.etag, Upstream.log = upstream_doc({}), '"v1"', []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/sitelenemoji.json"
+    server.shutdown()
+    server.server_close()
+
+def build(url, tmp_path, *extra):
+    cmd = [
+        sys.executable, "tools/build_default_stable.py", "--url", url,
+        "--dist", str(tmp_path / "dist"), "--cache-dir", str(tmp_path / "cache"), *extra,
+    ]
+    return subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+
+def test_conditional_fetch_skips_unchanged_upstream(upstream, tmp_path: Path):
+    server, url = upstream
+    out = tmp_path / "dist" / "default-stable.json"
+
+    first = build(url, tmp_path)
+    assert first.returncode == 0, first.stdout
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["entries"] == json.loads(PROFILE.read_text(encoding="utf-8"))["entries"]
+    mtime = out.stat().st_mtime_ns
+
+    second = build(url, tmp_path)
+    assert second.returncode == 0 and "revalidated" in second.stdout and "Up to date" in second.stdout
+    assert Upstream.log == [None, '"v1"']
+    assert out.stat().st_mtime_ns == mtime
+
+    # new upstream content -> regenerated
+    Upstream.body, Upstream.etag = upstream_doc({"kijetesantakalu": "🦝"}), '"v2"'
+    third = build(url, tmp_path)
+    assert third.returncode == 0 and "fetched" in third.stdout and "OK:" in third.stdout
+    assert "kijetesantakalu" in (tmp_path / "dist" / "report.md").read_text(encoding="utf-8")
+
+    # offline: cached snapshot, no request
+    server.shutdown()
+    forced = build(url, tmp_path, "--offline", "--force")
+    assert forced.returncode == 0 and "offline" in forced.stdout and "OK:" in forced.stdout
+    assert len(Upstream.log) == 3
+
+def test_offline_without_cache_fails(tmp_path: Path):
+    res = build("http://127.0.0.1:9/none.json", tmp_path, "--offline")
+    assert res.returncode == 1 and "no cached copy" in res.stdout
+
+def test_http_cache_keeps_bodies_on_disk(upstream, tmp_path: Path):
+    from tools.http_cache import HttpCache
+
+    _, url = upstream
+    cache = HttpCache(tmp_path / "cache")
+    first = cache.get(url)
+    assert (first.status, first.downloaded) == ("fetched", len(Upstream.body))
+    assert first.path.read_bytes() == Upstream.body
+
+    again = cache.get(url)
+    assert (again.status, again.downloaded, again.path, again.sha256) == ("revalidated", 0, first.path, first.sha256)
+
+    # a damaged body is not trusted: fetched again unconditionally
+    first.path.write_bytes(b"[]")
+    assert cache.get(url).status == "fetched" and Upstream.log[-1] is None
+    assert first.path.read_bytes() == Upstream.body
+
+DOCS = [
+    [{"word": "jan", "emoji": "🧑"}, {"Word": "Pona", "Emoji": "👍"}, 12345, [1, 2], {"nimi": "moku", "glyph": "🍽️"}],
+    {"a": "❗", "jan": "🧑", "n": 1.5e10, "skip": {"nested": [1, {"x": "y"}]}, "empty": " "},
+    {"meta": {"v": 1}, "words": [{"word": "kala", "emoji": "🐟"}], "data": {"toki": "🗣️"}},
+    {"data": [], "items": {"entries": [{"tp_word": "soweli", "char": "🐈"}]}, "x": "y"},
+    {"data": "not a wrapper", "words": [{"word": "x"}]},
+    [],
+    "just a string",
+]
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 1 << 16])
+@pytest.mark.parametrize("doc", DOCS)
+def test_stream_mapping_matches_extract_mapping(doc, chunk):
+    text = json.dumps(doc, ensure_ascii=False, indent=1)
+    js = JsonStream(io.StringIO(text), chunk_size=chunk)
+    assert stream_mapping(js) == extract_mapping(doc)
+    js.end()
+
+def test_ingest_jsonl_and_errors():
+    lines = '{"word": "jan", "emoji": "🧑"}\n\n{"kala": "🐟"}\n[{"word": "pona", "emoji": "👍"}]\n'
+    assert ingest(io.StringIO(lines), "jsonl") == {"jan": "🧑", "kala": "🐟", "pona": "👍"}
+    with pytest.raises(ValueError):
+        ingest(io.StringIO('[{"word": "jan", "emoji": "🧑"} {}]'), "json")
+    with pytest.raises(ValueError):
+        ingest(io.StringIO('{"jan": "🧑"} []'), "json")
+
+def test_parse_source():
+    assert parse_source("https://x.org/d/sitelen.json") == Source("sitelen", "https://x.org/d/sitelen.json", "json")
+    assert parse_source("extra=words/extra.jsonl") == Source("extra", "words/extra.jsonl", "jsonl")
+    assert parse_source("https://x.org/a.json?v=1").location == "https://x.org/a.json?v=1"
+
+def test_multiple_sources_with_precedence(upstream, tmp_path: Path):
+    _, url = upstream
+    override = tmp_path / "override.jsonl"
+    override.write_text('{"word": "jan", "emoji": "🦝"}\n{"word": "kijetesantakalu", "emoji": "🦝"}\n', encoding="utf-8")
+    res = build(url, tmp_path, "--source", f"local={override}", "--source", f"main={url}")
+    assert res.returncode == 0, res.stdout
+
+    data = json.loads((tmp_path / "dist" / "default-stable.json").read_text(encoding="utf-8"))
+    assert data["entries"]["jan"] == "🦝"
+    assert data["entries"]["pona"] == json.loads(PROFILE.read_text(encoding="utf-8"))["entries"]["pona"]
+    assert [s["name"] for s in data["sources"]] == ["local", "main"]
+
+    report = (tmp_path / "dist" / "report.md").read_text(encoding="utf-8")
+    assert "- jan: local" in report and "- pona: main" in report
+    assert re.search(r"\| local \| jsonl \| 2 \| 1 \| [\d.]+ \| [\d.]+ \|", report)
+
+    # same sources, nothing changed -> skipped; reordering changes the stamp
+    assert "Up to date" in build(url, tmp_path, "--source", f"local={override}", "--source", f"main={url}").stdout
+    swapped = build(url, tmp_path, "--source", f"main={url}", "--source", f"local={override}")
+    assert "OK:" in swapped.stdout
+    data = json.loads((tmp_path / "dist" / "default-stable.json").read_text(encoding="utf-8"))
+    assert data["entries"]["jan"] != "🦝"
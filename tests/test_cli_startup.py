@@ -0,0 +1,64 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tools.__main__ import COMMANDS
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Generous bound on the summed -X importtime self times (µs): a clean run is
+# well under 150 ms, an accidental heavy import (multiprocessing, asyncio, ...)
+# shows up as a module below long before this trips.
+MAX_IMPORT_US = 400_000
+
+# Modules the common commands must not import at startup
+HEAVY = {
+    "multiprocessing",
+    "concurrent.futures",
+    "asyncio",
+    "socketserver",
+    "urllib.request",
+    "http.client",
+    "ssl",
+    "cProfile",
+    "tools.build_cache",
+    "tools.lookup_server",
+}
+
+def imported(args: list[str]) -> dict[str, int]:
+    cmd = [sys.executable, "-X", "importtime", "-m", "tools", *args]
+    res = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = {}
+    for line in res.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = int(self_us)
+    return modules
+
+@pytest.mark.parametrize(
+    "args",
+    [["convert", "--help"], ["html", "--help"], ["decode", "--help"], ["fetch", "--help"], ["lookup", "jan"]],
+)
+def test_command_startup_imports(args):
+    modules = imported(args)
+    assert not HEAVY & set(modules), sorted(HEAVY & set(modules))
+    assert sum(modules.values()) < MAX_IMPORT_US
+
+def test_dispatcher_usage_imports_no_tools_modules():
+    modules = imported([])
+    assert not [m for m in modules if m.startswith("tools.") and m != "tools.__main__"]
+    res = subprocess.run([sys.executable, "-m", "tools", "--help"], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert res.returncode == 0 and "convert" in res.stdout
+
+def test_dispatcher_runs_command():
+    res = subprocess.run([sys.executable, "-m", "tools", "lookup", "jan"], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert res.stdout == "jan\t👤\n"
+    res = subprocess.run([sys.executable, "-m", "tools", "nope"], cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    assert res.returncode == 2 and "Unknown command" in res.stderr
+
+@pytest.mark.parametrize("command", sorted(COMMANDS))
+def test_every_command_has_help(command):
+    res = subprocess.run([sys.executable, "-m", "tools", command, "--help"], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert res.returncode == 0 and "usage" in res.stdout.lower()
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from tools.profile import Profile, compile_profile, load_profile, resolve
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_compiled_matches_resolve_for_every_key():
+    p = load_profile(PROFILE)
+    cp = compile_profile(p)
+    words = list(p.entries) + list(p.aliases) + ["JAN", " pona ", "Ali", "nope", "", "_punct_period"]
+    for w in words:
+        assert cp.resolve(w) == resolve(w, p), w
+
+def test_compiled_folds_aliases_without_own_entry():
+    p = Profile(name="t", version="0", aliases={"ali": "ale"}, entries={"ale": "X"})
+    cp = compile_profile(p)
+    assert cp.table == {"ale": "X", "ali": "X"}
+    assert cp.resolve("ALI") == "X"
+
+def test_resolve_many_counts_hits_and_misses():
+    cp = compile_profile(load_profile(PROFILE))
+    assert cp.resolve_many(["jan", "Pona", "xyz"]) == [cp.resolve_quiet("jan"), cp.resolve_quiet("pona"), None]
+    assert (cp.hits, cp.misses) == (2, 1)
+    cp.reset_counters()
+    assert (cp.hits, cp.misses) == (0, 0)
+
+def test_compile_profile_reuses_table_per_profile_object():
+    import gc
+
+    from tools.convert_tp_text import _line_converter, convert_line
+    from tools.profile import _compiled
+
+    p = load_profile(PROFILE)
+    assert compile_profile(p) is compile_profile(p)
+    assert compile_profile(load_profile(PROFILE)) is not compile_profile(p)
+
+    convert_line("jan pona", p, True, True)
+    hits = _line_converter.cache_info().hits
+    convert_line("jan pona", p, True, True)
+    assert _line_converter.cache_info().hits == hits + 1
+
+    n = len(_compiled)
+    del p
+    gc.collect()
+    assert len(_compiled) < n
@@ -0,0 +1,72 @@
+import random
+import re
+from pathlib import Path
+
+from tools.convert_tp_text import LineConverter, convert_line
+from tools.profile import load_profile, resolve
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+# Reference: the original per-token implementation of convert_line
+PUNCT_EDGE_RE = re.compile(r"^([\"'“”‘’(\[\{<]*)(.*?)([\"'“”‘’)\]\}>.,!?;:…]*)$")
+
+def reference_convert_line(line, profile, convert_dot, convert_colon):
+    if not line.strip():
+        return ""
+    out_tokens = []
+    for tok in line.split():
+        m = PUNCT_EDGE_RE.match(tok)
+        if not m:
+            out_tokens.append(tok)
+            continue
+        leading, core, trailing = m.group(1), m.group(2), m.group(3)
+        out_tokens.extend(ch for ch in leading)
+        if core:
+            mapped = resolve(core, profile)
+            out_tokens.append(mapped if mapped else core)
+        for ch in trailing:
+            if ch == "." and convert_dot:
+                p = resolve("_punct_period", profile)
+                out_tokens.append(p if p else ch)
+            elif ch == ":" and convert_colon:
+                p = resolve("_punct_colon", profile)
+                out_tokens.append(p if p else ch)
+            else:
+                out_tokens.append(ch)
+    return " ".join([t for t in out_tokens if t != ""])
+
+PUNCT = "\"'“”‘’([{<)]}>.,!?;:…-"
+SPACES = [" ", " ", " ", "  ", "\t", "　", "\x1c", "\xa0"]
+
+def random_line(rng, words):
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        kind = rng.random()
+        if kind < 0.6:
+            w = rng.choice(words)
+            w = w.upper() if rng.random() < 0.1 else w
+        elif kind < 0.8:
+            w = "".join(rng.choice("abcjklmnopstuwé-'") for _ in range(rng.randint(1, 6)))
+        else:
+            w = ""
+        lead = "".join(rng.choice(PUNCT) for _ in range(rng.choice([0, 0, 1, 2])))
+        trail = "".join(rng.choice(PUNCT) for _ in range(rng.choice([0, 0, 1, 3])))
+        parts.append(lead + w + trail)
+        parts.append(rng.choice(SPACES))
+    return "".join(parts)
+
+def test_tokenizer_matches_reference_on_random_lines():
+    p = load_profile(PROFILE)
+    words = list(p.entries)
+    rng = random.Random(1234)
+    for _ in range(3000):
+        line = random_line(rng, words)
+        for dot, colon in ((True, True), (False, True), (True, False)):
+            assert convert_line(line, p, dot, colon) == reference_convert_line(line, p, dot, colon), repr(line)
+
+def test_tokens_join_to_converted_line():
+    p = load_profile(PROFILE)
+    conv = LineConverter(p)
+    line = '("jan pona." li toki: …ala!) …'
+    assert " ".join(conv.tokens(line)) == conv(line) == reference_convert_line(line, p, True, True)
@@ -24,3 +24,56 @@ def test_convert_tp_text_basic(tmp_path: Path):
 
     got = outp.read_text(encoding="utf-8")
     assert got == f"{jan} {pona} {period}\n"
+
+def test_convert_tp_text_file_named_like_a_glob(tmp_path: Path):
+    p = load_profile(PROFILE)
+    for name in ["chapter[1].txt", "what?.txt"]:
+        inp = tmp_path / name
+        inp.write_text("jan\n", encoding="utf-8")
+        outp = tmp_path / f"out-{name}"
+        subprocess.check_call([sys.executable, "-m", "tools.convert_tp_text", "--in", str(inp), "--out", str(outp)], cwd=ROOT)
+        assert outp.read_text(encoding="utf-8") == f"{resolve('jan', p)}\n"
+
+def test_iter_converted_lines_matches_whole_file_conversion():
+    import io
+    from tools.convert_tp_text import convert_line, iter_converted_lines
+
+    p = load_profile(PROFILE)
+    for src in ["", "\n", "jan pona.", "jan pona.\n\ntoki:\n", "a\x0cb\n", "ali ale"]:
+        expected = "\n".join(convert_line(l, p, True, True) for l in src.splitlines())
+        if src.endswith("\n"):
+            expected += "\n"
+        assert "".join(iter_converted_lines(io.StringIO(src), p)) == expected
+
+def test_convert_tp_text_stdin_stdout():
+    p = load_profile(PROFILE)
+    cmd = [sys.executable, "-m", "tools.convert_tp_text", "--in", "-", "--out", "-"]
+    got = subprocess.run(cmd, input="jan pona.\n".encode("utf-8"), stdout=subprocess.PIPE, check=True).stdout
+    assert got.decode("utf-8") == f"{resolve('jan', p)} {resolve('pona', p)} {resolve('_punct_period', p)}\n"
+
+def test_convert_tp_text_batch_matches_serial(tmp_path: Path):
+    src = tmp_path / "src"
+    (src / "part2").mkdir(parents=True)
+    texts = {
+        "ch1.txt": "jan pona.\n\ntoki: ali ale\n",
+        "part2/ch2.txt": "mi moku e kili. sina lukin e ni?\n" * 500 + "no trailing newline",
+        "empty.txt": "",
+    }
+    for name, text in texts.items():
+        (src / name).write_text(text, encoding="utf-8")
+
+    serial = tmp_path / "serial"
+    for name in texts:
+        cmd = [sys.executable, "-m", "tools.convert_tp_text", "--in", str(src / name), "--out", str(serial / name)]
+        subprocess.check_call(cmd)
+
+    batch = tmp_path / "batch"
+    cmd = [
+        sys.executable, "-m", "tools.convert_tp_text", "--in", str(src), "--out", str(batch),
+        "--pattern", "**/*.txt", "--jobs", "2", "--chunk-bytes", "1000",
+    ]
+    summary = subprocess.run(cmd, stdout=subprocess.PIPE, check=True, text=True).stdout
+    assert "Converted 3 file(s)" in summary
+
+    for name in texts:
+        assert (batch / name).read_bytes() == (serial / name).read_bytes(), name
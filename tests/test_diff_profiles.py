@@ -1,6 +1,10 @@
+import json
+import subprocess
+import sys
 from pathlib import Path
 from tools.profile import load_profile
-from tools.diff_profiles import diff_entries
+from tools.diff_profiles import diff_entries, diff_many
+from tools.twemoji import to_twemoji_slug
 
 ROOT = Path(__file__).resolve().parents[1]
 P1 = ROOT / "profiles" / "default-stable.v1.json"
@@ -11,3 +15,74 @@ def test_diff_same_profile_is_empty():
     assert added == []
     assert removed == []
     assert changed == []
+
+
+def _write(tmp_path, name, entries, aliases=None):
+    path = tmp_path / f"{name}.json"
+    data = {"name": name, "version": name, "aliases": aliases or {}, "entries": entries}
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_diff_many_steps_matrix_and_glyphs(tmp_path):
+    v1 = {"a": "❗", "ale": "♾️", "ali": "♾️", "jan": "🧑"}
+    v2 = {"a": "❗", "ale": "♾", "ali": "♾", "jan": "👤", "kala": "🐟"}
+    v3 = {"ale": "♾", "ali": "♾", "jan": "👤", "kala": "🐠"}
+    paths = [_write(tmp_path, n, e) for n, e in (("v1", v1), ("v2", v2), ("v3", v3))]
+    report = diff_many([load_profile(p) for p in paths], ["v1", "v2", "v3"])
+
+    s1, s2 = report["steps"]
+    assert s1["added"] == {"kala": "🐟"}
+    changed = {c["key"]: c for c in s1["changed"]}
+    # dropping VS16 keeps the Twemoji slug, a different glyph does not
+    assert not changed["ale"]["slug_changed"]
+    assert changed["jan"]["slug_changed"]
+    assert s1["new_slugs"] == sorted({to_twemoji_slug("👤"), to_twemoji_slug("🐟")})
+    assert s2["removed"] == {"a": "❗"}
+
+    m = report["matrix"]
+    assert m["added"][0][2] == 1 and m["removed"][0][2] == 1 and m["changed"][0][2] == 3
+    assert m["changed"][2][0] == 3 and m["added"][2][0] == 1
+    assert all(m[kind][i][i] == 0 for kind in m for i in range(3))
+
+    shared = {(g["glyph"], tuple(g["words"])): g["profiles"] for g in report["shared_glyphs"]}
+    assert shared[("♾️", ("ale", "ali"))] == ["v1"]
+    assert shared[("♾", ("ale", "ali"))] == ["v2", "v3"]
+
+
+def test_cli_json_for_ci(tmp_path):
+    a = _write(tmp_path, "a", {"jan": "🧑"})
+    b = _write(tmp_path, "b", {"jan": "🧑"})
+    c = _write(tmp_path, "c", {"jan": "👤"})
+    same = subprocess.run(
+        [sys.executable, "-m", "tools.diff_profiles", str(a), str(b), "--json"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert same.returncode == 0
+    assert json.loads(same.stdout)["steps"][0]["changed"] == []
+
+    out = tmp_path / "diff.json"
+    diff = subprocess.run(
+        [sys.executable, "-m", "tools.diff_profiles", str(a), str(b), str(c), "--json", str(out)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert diff.returncode == 1
+    assert "b.json -> " in diff.stdout
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert [len(s["changed"]) for s in report["steps"]] == [0, 1]
+
+def test_cli_alias_only_change_is_a_difference(tmp_path):
+    a = _write(tmp_path, "a", {"ale": "♾️"}, {"ali": "ale"})
+    b = _write(tmp_path, "b", {"ale": "♾️"})
+    res = subprocess.run(
+        [sys.executable, "-m", "tools.diff_profiles", str(a), str(b), "--json"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert res.returncode == 1
+    assert json.loads(res.stdout)["steps"][0]["aliases"]["removed"] == ["ali"]
+    text = subprocess.run(
+        [sys.executable, "-m", "tools.diff_profiles", str(a), str(b)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert text.returncode == 1
+    assert "aliases: added 0, removed 1, changed 0" in text.stdout and "- alias ali" in text.stdout
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from tools.convert_tp_text import convert_line
+from tools.emoji_to_tp import EmojiDecoder, pick_words
+from tools.profile import Profile, load_profile
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_round_trip_restores_text():
+    p = load_profile(PROFILE)
+    decode = EmojiDecoder(p)
+    for text in [
+        "jan pona li toki e ni: \"mi moku e kili.\"",
+        "ale li pona. (jan Sonja) o lukin!",
+        "nanpa wan li tu, anu seme?",
+        "",
+    ]:
+        assert decode(convert_line(text, p, True, True)) == text
+
+def test_alias_policy_and_prefer():
+    p = load_profile(PROFILE)
+    emoji = convert_line("ali li ale", p, True, True)
+    assert EmojiDecoder(p)(emoji) == "ale li ale"
+    assert EmojiDecoder(p, policy="alias")(emoji) == "ali li ali"
+    assert pick_words(p, prefer=["ali"])["♾"] == "ali"
+
+def test_variation_selectors_zwj_and_adjacent_glyphs():
+    p = Profile(name="t", version="0", aliases={}, entries={"a": "♾️", "b": "👨", "c": "👨‍🍳", "d": "🇬🇺"})
+    decode = EmojiDecoder(p)
+    assert decode("♾ ♾️ ♾︎") == "a a a"
+    assert decode("👨👨‍🍳♾️") == "b c a"
+    # unknown ZWJ sequence / skin tone: kept whole, not split into known parts
+    assert decode("👨‍👩‍👧 👨🏽") == "👨‍👩‍👧 👨🏽"
+    assert decode("🇬🇺🇬🇺") == "d d"
+    assert decode("🇺🇬🇺🇬") == "🇺🇬🇺🇬"
+
+def test_punct_options():
+    p = load_profile(PROFILE)
+    emoji = convert_line("jan li toki: pona.", p, True, True)
+    assert EmojiDecoder(p, convert_colon=False)(emoji) == "jan li toki ➗️ pona."
+
+def test_cli_stdin_stdout():
+    cmd = [sys.executable, "-m", "tools.emoji_to_tp", "--in", "-", "--out", "-"]
+    res = subprocess.run(cmd, input="👤 👍 ➖️\n\n♾️\n".encode("utf-8"), stdout=subprocess.PIPE, cwd=ROOT, check=True)
+    assert res.stdout.decode("utf-8") == "jan pona.\n\nale\n"
+
+def test_cli_binary_profile_and_bad_profile(tmp_path: Path):
+    binary = tmp_path / "p.bin"
+    subprocess.run([sys.executable, "-m", "tools.profile", "compile", str(PROFILE), "--out", str(binary)], cwd=ROOT, check=True)
+    cmd = [sys.executable, "-m", "tools.emoji_to_tp", "--in", "-", "--out", "-", "--profile", str(binary)]
+    res = subprocess.run(cmd, input="👤 👍 ➖️\n♾️\n".encode("utf-8"), capture_output=True, cwd=ROOT, check=True)
+    assert res.stdout.decode("utf-8") == "jan pona.\nale\n"
+    res = subprocess.run(cmd + ["--policy", "alias"], input=b"", capture_output=True, cwd=ROOT)
+    assert res.returncode == 2 and b"no alias map" in res.stderr
+
+    bad = tmp_path / "bad.json"
+    bad.write_bytes(b"\xff{not json")
+    cmd[-1] = str(bad)
+    res = subprocess.run(cmd, input=b"", capture_output=True, cwd=ROOT)
+    assert res.returncode == 2 and res.stdout.startswith(b"Error: cannot load profile")
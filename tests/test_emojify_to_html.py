@@ -3,12 +3,15 @@ import subprocess
 import sys
 import pytest
 
+from tools.emojify_to_html import AssetMaterializer
+from tools.png import Image, write_png
 from tools.profile import load_profile, resolve
 from tools.twemoji import to_twemoji_slug
 
 ROOT = Path(__file__).resolve().parents[1]
 ASSETS = ROOT / "assets" / "twemoji" / "17.0.0" / "72x72"
 PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+PNG_1PX = write_png(Image(1, 1, bytearray(4)))
 
 def test_emojify_to_html_creates_index_and_images(tmp_path: Path):
     if not ASSETS.exists():
@@ -36,4 +39,85 @@ def test_emojify_to_html_creates_index_and_images(tmp_path: Path):
 
     assert 'class="emoji"' in html
     assert (outdir / "img").exists()
-    assert any(p.suffix == ".png" for p in (outdir / "img").iterdir())
\ No newline at end of file
+    assert any(p.suffix == ".png" for p in (outdir / "img").iterdir())
+@pytest.mark.parametrize("mode", ["copy", "hardlink", "symlink", "reflink"])
+def test_asset_materializer_modes_and_memo(tmp_path: Path, mode: str):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "263a.png").write_bytes(b"png")
+    img = tmp_path / "img"
+    img.mkdir()
+
+    assets = AssetMaterializer(src, img, mode)
+    assert assets("263a") and assets("263a")
+    assert not assets("nope") and not assets("nope")
+    assert assets.used == ["263a"]
+    assert sum(assets.counts.values()) == 2  # one materialization + one missing, despite repeats
+
+    dst = img / "263a.png"
+    assert dst.read_bytes() == b"png"
+    if mode == "hardlink":
+        assert dst.stat().st_ino == (src / "263a.png").stat().st_ino
+    if mode == "symlink":
+        assert dst.is_symlink()
+    assert set(assets.counts) - {"missing"} <= {mode, "copy"}
+
+def test_emojify_to_html_paginated_output(tmp_path: Path):
+    inp = tmp_path / "in.txt"
+    inp.write_text("".join(f"line {i}\n" for i in range(1, 6)), encoding="utf-8")
+    outdir = tmp_path / "out"
+    cmd = [sys.executable, "-m", "tools.emojify_to_html", "--in", str(inp), "--outdir", str(outdir),
+           "--assets", str(tmp_path), "--page-lines", "2"]
+    subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+
+    pages = sorted(p.name for p in outdir.glob("page-*.html"))
+    assert pages == ["page-0001.html", "page-0002.html", "page-0003.html"]
+    toc = (outdir / "index.html").read_text(encoding="utf-8")
+    assert all(f'href="{p}"' in toc for p in pages)
+    assert "lines 5&ndash;5" in toc
+
+    second = (outdir / "page-0002.html").read_text(encoding="utf-8")
+    assert '<link rel="stylesheet" href="style.css" />' in second
+    assert '<div class="line">line 3</div>\n<div class="line">line 4</div>' in second
+    assert 'href="page-0001.html"' in second and 'href="page-0003.html"' in second
+    # both pagers link to the next page, the last page has none
+    assert second.count('href="page-0003.html"') == 2
+    assert "next &rarr;" not in (outdir / "page-0003.html").read_text(encoding="utf-8")
+    assert (outdir / "style.css").exists()
+
+
+@pytest.mark.parametrize(
+    "extra", [[], ["--no-dot"], ["--image-mode", "datauri"], ["--page-lines", "2"], ["--page-lines", "2", "--cache", "CACHE"]]
+)
+def test_tp_mode_matches_convert_then_emojify(tmp_path: Path, extra: list[str]):
+    p = load_profile(PROFILE)
+    glyphs = sorted(set(p.entries.values()))
+    # PNGs for half of the glyphs: the rest exercise the text fallback
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    for g in glyphs[::2]:
+        (assets / f"{to_twemoji_slug(g)}.png").write_bytes(PNG_1PX)
+
+    inp = tmp_path / "in.txt"
+    inp.write_text(
+        "jan pona li toki: \"mi kama!\"\n\nJan Ali (ale) li moku. foo bar?\r\n  o pana e ni, kepeken kalama…\n",
+        encoding="utf-8",
+    )
+
+    def run(*args: str) -> None:
+        subprocess.check_call([sys.executable, "-m", *args], cwd=ROOT, stdout=subprocess.DEVNULL)
+
+    extra = [str(tmp_path / "cache.json") if a == "CACHE" else a for a in extra]
+    converted = tmp_path / "converted.txt"
+    dot = [a for a in extra if a == "--no-dot"]
+    rest = [a for a in extra if a != "--no-dot"]
+    run("tools.convert_tp_text", "--in", str(inp), "--out", str(converted), *dot)
+    run("tools.emojify_to_html", "--assets", str(assets), "--in", str(converted), "--outdir", str(tmp_path / "two"), *rest)
+    for _ in range(2):  # the second run reuses cached chunks when --cache is given
+        run("tools.emojify_to_html", "--tp", "--assets", str(assets), "--in", str(inp), "--outdir", str(tmp_path / "one"), *extra)
+
+    two = sorted(f.relative_to(tmp_path / "two") for f in (tmp_path / "two").rglob("*") if f.is_file())
+    one = sorted(f.relative_to(tmp_path / "one") for f in (tmp_path / "one").rglob("*") if f.is_file())
+    assert one == two
+    for rel in one:
+        assert (tmp_path / "one" / rel).read_bytes() == (tmp_path / "two" / rel).read_bytes(), rel
@@ -0,0 +1,101 @@
+import re
+import subprocess
+import sys
+import zlib
+from pathlib import Path
+
+from tools.emojify_to_html import AssetMaterializer, iter_tokens
+from tools.pdf import PdfWriter, text_width
+from tools.png import Image, write_png
+from tools.profile import load_compiled_profile, load_profile, resolve
+from tools.twemoji import to_twemoji_slug
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+
+def parse_pdf(data: bytes) -> dict[int, bytes]:
+    """Objects by number, checked against the xref table."""
+    start = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[start:].startswith(b"xref\n")
+    lines = data[start:].split(b"\n")
+    count = int(lines[1].split()[1])
+    objects = {}
+    for num in range(1, count):
+        off = int(lines[2 + num][:10])
+        head = f"{num} 0 obj\n".encode()
+        assert data[off:].startswith(head), num
+        objects[num] = data[off + len(head) : data.index(b"\nendobj\n", off)]
+    return objects
+
+
+def stream(body: bytes) -> bytes:
+    length = int(re.search(rb"/Length (\d+)", body).group(1))
+    data = body[body.index(b"stream\n") + 7 :]
+    assert data[length:] == b"\nendstream"
+    data = data[:length]
+    return zlib.decompress(data) if b"/FlateDecode" in body else data
+
+
+def test_pdf_writer_dedups_images_and_builds_valid_xref(tmp_path: Path):
+    opaque = write_png(Image(2, 2, bytearray([255, 0, 0, 255] * 4)))
+    clear = write_png(Image(2, 1, bytearray([0, 0, 255, 0, 0, 255, 0, 255])))
+    out = tmp_path / "t.pdf"
+    with out.open("wb") as f:
+        pdf = PdfWriter(f, "t (1)")
+        a = pdf.image("a", opaque)
+        b = pdf.image("b", clear)
+        assert pdf.image("a", b"not decoded again") == a
+        pdf.add_page(b"/%s Do /%s Do" % (a, b), {a, b})
+        pdf.add_page(b"/%s Do" % a, {a})
+        pdf.close()
+
+    objects = parse_pdf(out.read_bytes())
+    images = [body for body in objects.values() if b"/Subtype /Image" in body]
+    # a (opaque): no mask; b: RGB + soft mask
+    assert len(images) == 3
+    assert sum(b"/SMask" in body for body in images) == 1
+    assert b"/Count 2" in objects[2]
+    assert [stream(body) for body in images if b"/DeviceGray" in body] == [bytes([0, 255])]
+
+
+def test_text_width_matches_helvetica():
+    assert text_width("jan", 10) == (222 + 556 + 556) / 100
+    assert text_width("", 10) == 0
+
+
+def test_iter_tokens_marks_available_images(tmp_path: Path):
+    p = load_compiled_profile(PROFILE)
+    slug = to_twemoji_slug(p.resolve("jan"))
+    (tmp_path / f"{slug}.png").write_bytes(b"")
+    assets = AssetMaterializer(tmp_path, None)
+    lines = list(iter_tokens(["jan pona foo", ""], p, assets))
+    assert lines[0] == [(p.resolve("jan"), slug), (p.resolve("pona"), None), ("foo", None)]
+    assert lines[1] == []
+
+
+def test_cli_embeds_each_glyph_once(tmp_path: Path):
+    p = load_profile(PROFILE)
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    words = ["jan", "pona", "moku", "toki"]
+    for w in words:
+        (assets / f"{to_twemoji_slug(resolve(w, p))}.png").write_bytes(write_png(Image(4, 4, bytearray([9] * 64))))
+
+    inp = tmp_path / "in.txt"
+    inp.write_text(("jan pona li moku foo. toki pona li pona: jan li toki!\n\n" * 400), encoding="utf-8")
+    out = tmp_path / "book.pdf"
+    cmd = [sys.executable, "-m", "tools.emojify_to_pdf", "--tp", "--assets", str(assets), "--in", str(inp), "--out", str(out)]
+    res = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+    assert "4 images embedded" in res.stdout
+
+    objects = parse_pdf(out.read_bytes())
+    # one RGB image (+ its soft mask) per glyph, however often it occurs
+    assert sum(b"/DeviceRGB" in body for body in objects.values()) == 4
+    pages = [body for body in objects.values() if b"/Type /Page " in body]
+    assert len(pages) > 1
+    assert f"/Count {len(pages)}".encode() in objects[2]
+    first = stream(objects[int(re.search(rb"/Contents (\d+) 0 R", pages[0]).group(1))])
+    assert b"Do Q" in first and b"(foo) Tj" in first
+    # "li" has no PNG here: an empty box instead of unencodable text
+    assert b" re S Q" in first and b"(?" not in first
@@ -0,0 +1,203 @@
+import hashlib
+import io
+import tarfile
+import threading
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from tools.asset_store import AssetStore
+from tools.fetch_twemoji_assets import fetch_archive_assets, fetch_assets
+from tools.png import PNG_SIGNATURE
+from tools.twemoji import to_twemoji_slug
+
+EMOJIS = ["👤", "👍", "🗣️", "❗"]
+
+class FlakyHandler(SimpleHTTPRequestHandler):
+    # drop the connection on the first request for each path, then serve normally
+    seen: set = set()
+
+    def do_GET(self):
+        if self.path not in self.seen:
+            self.seen.add(self.path)
+            self.close_connection = True
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def cdn(tmp_path: Path):
+    root = tmp_path / "cdn"
+    root.mkdir()
+    for e in EMOJIS[:-1]:  # the last one is missing upstream
+        (root / f"{to_twemoji_slug(e)}.png").write_bytes(b"\x89PNG fake " + e.encode("utf-8"))
+    FlakyHandler.seen = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FlakyHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_assets_concurrent_with_retries(tmp_path: Path, cdn):
+    root, base = cdn
+    out = tmp_path / "out"
+    report = fetch_assets(EMOJIS, out, base=base, retries=3, backoff=0.01, timeout=5, concurrency=4)
+
+    assert report.requested == 4
+    assert report.downloaded == 3
+    assert [m[0] for m in report.missing] == ["❗"]
+    assert report.missing[0][2] == "HTTP 404"
+    for e in EMOJIS[:-1]:
+        name = f"{to_twemoji_slug(e)}.png"
+        assert (out / name).read_bytes() == (root / name).read_bytes()
+    assert not list(out.glob(".*.part"))
+
+    again = fetch_assets(EMOJIS, out, base=base, backoff=0.01, timeout=5, concurrency=4)
+    assert (again.downloaded, again.skipped, len(again.missing)) == (0, 3, 1)
+
+def test_fetch_assets_fetches_each_slug_once(tmp_path: Path):
+    class CountingHandler(QuietHandler):
+        paths: list = []
+
+        def do_GET(self):
+            self.paths.append(self.path)
+            super().do_GET()
+
+    root = tmp_path / "cdn"
+    root.mkdir()
+    (root / f"{to_twemoji_slug('♾️')}.png").write_bytes(b"\x89PNG inf")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        report = fetch_assets(["♾️", "♾"], tmp_path / "out", base=base, timeout=5, concurrency=4)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert report.downloaded == 1 and CountingHandler.paths == [f"/{to_twemoji_slug('♾')}.png"]
+
+def test_fetch_assets_into_store_skips_verified(tmp_path: Path, cdn):
+    root, base = cdn
+    store = AssetStore(tmp_path / "store")
+    kw = dict(base=base, backoff=0.01, timeout=5, store=store, version="17.0.0")
+    report = fetch_assets(EMOJIS, tmp_path / "unused", **kw)
+    assert report.downloaded == 3
+
+    store = AssetStore(tmp_path / "store")  # reload the saved manifest
+    kw["store"] = store
+    assert fetch_assets(EMOJIS, tmp_path / "unused", **kw).skipped == 3
+
+    store.path_for("17.0.0", to_twemoji_slug(EMOJIS[0])).write_bytes(b"x")
+    again = fetch_assets(EMOJIS, tmp_path / "unused", **kw)
+    assert (again.downloaded, again.skipped) == (1, 2)
+    assert store.verify("17.0.0", to_twemoji_slug(EMOJIS[0]), deep=True)
+
+def make_archive(path: Path, emojis: list[str], fmt: str) -> None:
+    """A release-like archive: twemoji-17.0.0/assets/{72x72,svg}/<slug>.*, plus unrelated files."""
+    files = {"twemoji-17.0.0/README.md": b"readme", "twemoji-17.0.0/assets/svg/263a.svg": b"<svg/>"}
+    for e in emojis:
+        slug = to_twemoji_slug(e)
+        files[f"twemoji-17.0.0/assets/72x72/{slug}.png"] = PNG_SIGNATURE + e.encode("utf-8")
+    if fmt == "zip":
+        with zipfile.ZipFile(path, "w") as zf:
+            for name, data in files.items():
+                zf.writestr(name, data)
+        return
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+@pytest.mark.parametrize("fmt", ["tar.gz", "zip"])
+def test_fetch_archive_assets_over_http(tmp_path: Path, fmt: str):
+    root = tmp_path / "releases"
+    root.mkdir()
+    archive = root / f"v17.0.0.{fmt}"
+    make_archive(archive, EMOJIS[:-1], fmt)  # the last one is not in the release
+    FlakyHandler.seen = set()  # the first attempt is dropped and retried
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FlakyHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # a query string hides the suffix: the format is sniffed from the content
+    url = f"http://127.0.0.1:{server.server_address[1]}/{archive.name}?download=1"
+    digest = hashlib.sha256(archive.read_bytes()).hexdigest()
+    try:
+        out = tmp_path / "out"
+        report = fetch_archive_assets(EMOJIS, out, archive=url, sha256=digest, timeout=5, retries=2, backoff=0)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert (report.downloaded, report.skipped, report.bytes) == (3, 0, archive.stat().st_size)
+    assert report.missing == [("❗", url, "not in archive")]
+    # only the needed PNGs are written, nothing else from the archive
+    assert sorted(p.name for p in out.iterdir()) == sorted(f"{to_twemoji_slug(e)}.png" for e in EMOJIS[:-1])
+    assert (out / f"{to_twemoji_slug('👤')}.png").read_bytes() == PNG_SIGNATURE + "👤".encode("utf-8")
+
+def test_fetch_archive_assets_local_file_store_and_checks(tmp_path: Path):
+    archive = tmp_path / "twemoji.tar.gz"
+    make_archive(archive, EMOJIS, "tar.gz")
+
+    with pytest.raises(ValueError, match="sha256 mismatch"):
+        fetch_archive_assets(EMOJIS, tmp_path / "out", archive=str(archive), sha256="0" * 64)
+    assert not (tmp_path / "out").exists()  # nothing written before the archive checks out
+
+    store = AssetStore(tmp_path / "store")
+    report = fetch_archive_assets(EMOJIS, tmp_path / "unused", archive=str(archive), store=store, version="17.0.0")
+    assert (report.downloaded, report.missing) == (4, [])
+    assert all(store.verify("17.0.0", to_twemoji_slug(e), deep=True) for e in EMOJIS)
+
+    # everything present: the archive is not even opened
+    again = fetch_archive_assets(EMOJIS, tmp_path / "unused", archive=str(tmp_path / "gone.tar.gz"), store=store, version="17.0.0")
+    assert (again.downloaded, again.skipped) == (0, 4)
+
+@pytest.mark.parametrize("fmt", ["tar.gz", "zip"])
+def test_corrupt_archive_is_an_archive_error(tmp_path: Path, monkeypatch, capsys, fmt: str):
+    from tools import fetch_twemoji_assets as fta
+
+    archive = tmp_path / f"twemoji.{fmt}"
+    make_archive(archive, EMOJIS, fmt)
+    data = archive.read_bytes()
+    if fmt == "zip":
+        archive.write_bytes(data[: len(data) // 2])  # truncated: no central directory
+    else:
+        archive.write_bytes(data[:20] + bytes(b ^ 0xFF for b in data[20:40]) + data[40:])  # bad deflate data
+    with pytest.raises(ValueError, match="unreadable archive"):
+        fetch_archive_assets(EMOJIS, tmp_path / "out", archive=str(archive))
+
+    argv = ["fetch", "--archive", str(archive), "--out", str(tmp_path / "out")]
+    monkeypatch.setattr("sys.argv", argv)
+    assert fta.main() == 1
+    assert "Archive error: unreadable archive" in capsys.readouterr().out
+    assert not (tmp_path / "out").exists()
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_cli_version_picks_its_own_urls(tmp_path: Path, monkeypatch, archive: bool):
+    from tools import fetch_twemoji_assets as fta
+
+    seen = {}
+
+    def fake(emojis, out_dir, **kw):
+        seen.update(kw, out_dir=out_dir)
+        return fta.FetchReport(requested=0)
+
+    monkeypatch.setattr(fta, "fetch_assets", fake)
+    monkeypatch.setattr(fta, "fetch_archive_assets", fake)
+    argv = ["fetch", "--store", str(tmp_path / "store"), "--version", "16.0.1"] + (["--archive"] if archive else [])
+    monkeypatch.setattr("sys.argv", argv)
+    assert fta.main() == 0
+    assert seen["version"] == "16.0.1"
+    assert seen["out_dir"].parts[-2:] == ("16.0.1", "72x72")
+    if archive:
+        assert seen["archive"].endswith("/v16.0.1.tar.gz")
+    else:
+        assert "@16.0.1/" in seen["base"]
@@ -0,0 +1,122 @@
+import asyncio
+import http.client
+import json
+import threading
+from pathlib import Path
+
+from tools.http_service import TranslationService, start_server
+from tools.lookup_server import ProfileHolder
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def serve(assets: Path, profile=PROFILE, service=None):
+    loop = asyncio.new_event_loop()
+    service = service or TranslationService(ProfileHolder(profile), assets)
+    server = loop.run_until_complete(start_server(service, "127.0.0.1", 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop, server, server.sockets[0].getsockname()[1]
+
+def stop(loop, server):
+    async def shutdown():
+        server.close()
+        await server.wait_closed()
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+
+def call(conn, method, path, body=None, headers=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=data, headers=headers or {})
+    resp = conn.getresponse()
+    raw = resp.read()
+    return resp.status, resp.getheader("ETag"), json.loads(raw) if raw else None
+
+def test_http_endpoints_keep_alive_and_etag(tmp_path: Path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "1f464.png").write_bytes(b"png")
+    loop, server, port = serve(assets)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        status, etag, body = call(conn, "GET", "/resolve?w=jan&w=ALI&w=nope")
+        assert status == 200 and body == {"results": ["👤", "♾️", None]}
+        assert etag
+
+        status, _, body = call(conn, "POST", "/resolve", {"words": ["pona"]})
+        assert body == {"results": ["👍"]}
+
+        status, _, body = call(conn, "POST", "/convert", {"text": "jan pona.\n", "colon": False})
+        assert body == {"text": "👤 👍 ➖️\n"}
+
+        status, _, body = call(conn, "POST", "/render", {"lines": ["jan pona"]})
+        assert 'src="img/1f464.png"' in body["html"] and "👍" in body["html"]
+
+        status, _, body = call(conn, "GET", "/profile")
+        assert body["name"] and len(body["digest"]) == 64
+
+        status, _, body = call(conn, "GET", "/resolve?w=jan", headers={"If-None-Match": etag})
+        assert status == 304 and body is None
+
+        assert call(conn, "GET", "/nope")[0] == 404
+        assert call(conn, "POST", "/convert", {"words": 1})[0] == 400
+        conn.request("POST", "/resolve", body=b"{broken")
+        resp = conn.getresponse()
+        assert resp.status == 400 and "invalid JSON" in json.loads(resp.read())["error"]
+
+        # everything above went over one keep-alive connection
+        status, _, body = call(conn, "GET", "/resolve?w=moku")
+        assert status == 200 and body["results"] == ["🍽️"]
+        conn.close()
+    finally:
+        stop(loop, server)
+
+def test_non_latin1_profile_name_and_404_before_304(tmp_path: Path):
+    house = tmp_path / "house.json"
+    house.write_text(json.dumps({"name": "house ✨", "entries": {"jan": "🧍"}}), encoding="utf-8")
+    loop, server, port = serve(tmp_path, [PROFILE, house])
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        status, etag, body = call(conn, "GET", "/resolve?w=jan")
+        assert status == 200 and body == {"results": ["🧍"]}
+        assert etag.isascii()
+        assert call(conn, "GET", "/profile")[2]["name"].endswith("+ house ✨")
+
+        assert call(conn, "GET", "/resolve?w=jan", headers={"If-None-Match": etag})[0] == 304
+        assert call(conn, "GET", "/nope", headers={"If-None-Match": etag})[0] == 404
+        conn.close()
+    finally:
+        stop(loop, server)
+
+def test_new_assets_refresh_render_and_etag(tmp_path: Path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    loop, server, port = serve(assets)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        status, etag, body = call(conn, "POST", "/render", {"lines": ["jan"]})
+        assert "img/1f464.png" not in body["html"]
+        (assets / "1f464.png").write_bytes(b"png")  # fetched after startup
+        status, etag2, body = call(conn, "POST", "/render", {"lines": ["jan"]})
+        assert 'src="img/1f464.png"' in body["html"]
+        assert etag2 != etag
+        assert call(conn, "GET", "/render?text=jan", headers={"If-None-Match": etag})[0] == 200
+        conn.close()
+    finally:
+        stop(loop, server)
+
+def test_internal_error_is_500_and_huge_headers_431(tmp_path: Path):
+    service = TranslationService(ProfileHolder(PROFILE), tmp_path)
+    def boom(params):
+        raise RuntimeError("bug")
+    service.convert = boom
+    loop, server, port = serve(tmp_path, service=service)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        status, _, body = call(conn, "POST", "/convert", {"text": "jan"})
+        assert status == 500 and body == {"error": "internal error: RuntimeError"}
+        assert call(conn, "GET", "/resolve?w=jan")[2] == {"results": ["👤"]}  # connection survives
+        conn.request("GET", "/resolve?w=jan", headers={"X-Big": "a" * (70 * 1024)})
+        assert conn.getresponse().status == 431
+        conn.close()
+    finally:
+        stop(loop, server)
@@ -0,0 +1,60 @@
+import json
+import pstats
+import subprocess
+import sys
+from pathlib import Path
+
+from tools.instrument import NullStats, Stats
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_stats_phases_and_counters():
+    st = Stats("t")
+    with st.phase("a"):
+        pass
+    with st.phase("a"):
+        pass
+    st.count("x")
+    st.update({"x": 2, "y": 1})
+    assert list(st.counting(["ab", "é"])) == ["ab", "é"]
+    rep = st.report()
+    assert rep["tool"] == "t" and set(rep["phases"]) == {"a"}
+    assert rep["counters"] == {"bytes_written": 4, "x": 3, "y": 1}
+
+    null = NullStats()
+    chunks = ["a"]
+    with null.phase("a"):
+        null.count("x")
+    assert null.counting(chunks) is chunks and null.report() == {}
+
+def test_convert_stats_report_and_profile_dump(tmp_path: Path):
+    inp = tmp_path / "in.txt"
+    inp.write_text("jan pona li toki.\nSonja\n", encoding="utf-8")
+    report, prof = tmp_path / "stats.json", tmp_path / "convert.prof"
+    cmd = [
+        sys.executable, "-m", "tools.convert_tp_text", "--in", str(inp), "--out", str(tmp_path / "out.txt"),
+        "--stats", str(report), "--profile-out", str(prof),
+    ]
+    subprocess.run(cmd, cwd=ROOT, check=True)
+    rep = json.loads(report.read_text(encoding="utf-8"))
+    assert set(rep["phases"]) >= {"load_profile", "convert"}
+    assert rep["counters"]["resolve_hits"] == 4 and rep["counters"]["resolve_misses"] == 1
+    assert rep["counters"]["bytes_written"] == (tmp_path / "out.txt").stat().st_size
+    assert pstats.Stats(str(prof)).total_calls > 0
+
+def test_emojify_stats_to_stderr(tmp_path: Path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "1f464.png").write_bytes(b"png")
+    inp = tmp_path / "in.txt"
+    inp.write_text("👤 👍\n", encoding="utf-8")
+    cmd = [
+        sys.executable, "-m", "tools.emojify_to_html", "--in", str(inp), "--outdir", str(tmp_path / "out"),
+        "--assets", str(assets), "--stats",
+    ]
+    res = subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    rep = json.loads(res.stderr)
+    assert rep["tool"] == "emojify_to_html"
+    assert rep["counters"]["assets_copy"] == 1 and rep["counters"]["assets_missing"] == 1
+    assert rep["counters"]["files_written"] == 1
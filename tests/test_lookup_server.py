@@ -0,0 +1,82 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from tools.lookup_server import ProfileHolder, handle_request, make_unix_server
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def test_serve_stdio_batch_lookup_and_convert():
+    reqs = [
+        {"id": 7, "op": "lookup", "words": ["jan", "ALI", "nope"]},
+        {"op": "convert", "lines": ["jan pona.", ""], "colon": False},
+        {"op": "frobnicate"},
+    ]
+    stdin = "\n".join(json.dumps(r) for r in reqs) + "\nnot json\n"
+    cmd = [sys.executable, "tools/lookup.py", "--serve", "--profile", str(PROFILE)]
+    out = subprocess.run(cmd, input=stdin.encode("utf-8"), stdout=subprocess.PIPE, cwd=ROOT, check=True).stdout
+    resps = [json.loads(line) for line in out.decode("utf-8").splitlines()]
+
+    assert resps[0] == {"id": 7, "results": ["👤", "♾️", None]}
+    assert resps[1] == {"lines": ["👤 👍 ➖️", ""]}
+    assert "error" in resps[2] and "error" in resps[3]
+
+def test_convert_flags_accept_strings():
+    holder = ProfileHolder(PROFILE)
+    for off in [False, 0, "false", "0", "no", "False"]:
+        assert handle_request({"op": "convert", "lines": ["pona."], "dot": off}, holder)["lines"] == ["👍 ."], off
+    for on in [True, 1, "true", "1", "yes"]:
+        assert handle_request({"op": "convert", "lines": ["pona."], "dot": on}, holder)["lines"] == ["👍 ➖️"], on
+
+def test_profile_hot_reload(tmp_path: Path):
+    prof = tmp_path / "p.json"
+    prof.write_text(json.dumps({"name": "t", "version": "1", "entries": {"jan": "A"}}), encoding="utf-8")
+    holder = ProfileHolder(prof, interval=0)
+    assert handle_request({"words": ["jan"]}, holder)["results"] == ["A"]
+
+    prof.write_text(json.dumps({"name": "t", "version": "2", "entries": {"jan": "BB"}}), encoding="utf-8")
+    st = prof.stat()
+    os.utime(prof, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert handle_request({"words": ["jan"]}, holder)["results"] == ["BB"]
+    assert handle_request({"op": "info"}, holder)["version"] == "2"
+
+    prof.write_text("{broken", encoding="utf-8")
+    os.utime(prof, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    assert handle_request({"words": ["jan"]}, holder)["results"] == ["BB"]
+
+def test_unix_socket_server(tmp_path: Path):
+    sock_path = tmp_path / "lookup.sock"
+    server = make_unix_server(sock_path, ProfileHolder(PROFILE))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(str(sock_path))
+            f = s.makefile("rwb")
+            for word in ["pona", "toki"]:
+                f.write((json.dumps({"words": [word]}) + "\n").encode("utf-8"))
+                f.flush()
+                assert json.loads(f.readline())["results"] == [{"pona": "👍", "toki": "🗣️"}[word]]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_unix_socket_replaces_only_stale_sockets(tmp_path: Path):
+    sock_path = tmp_path / "lookup.sock"
+    make_unix_server(sock_path, ProfileHolder(PROFILE)).server_close()
+    assert sock_path.exists()  # left behind, as after a crash
+    make_unix_server(sock_path, ProfileHolder(PROFILE)).server_close()
+
+    book = tmp_path / "book.txt"
+    book.write_text("jan pona\n", encoding="utf-8")
+    with pytest.raises(FileExistsError, match="not a socket"):
+        make_unix_server(book, ProfileHolder(PROFILE))
+    res = subprocess.run([sys.executable, "tools/lookup.py", "--socket", str(book)], cwd=ROOT, capture_output=True, text=True)
+    assert res.returncode == 2 and "not a socket" in res.stdout
+    assert book.read_text(encoding="utf-8") == "jan pona\n"
@@ -0,0 +1,102 @@
+from pathlib import Path
+import struct
+import subprocess
+import sys
+import zlib
+
+import pytest
+
+from tools.png import PNG_SIGNATURE, Image, read_png, write_png
+from tools.profile import load_profile, resolve
+from tools.sprite import build_sprite, sprite_css
+from tools.twemoji import to_twemoji_slug
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+def chunk(ctype, body):
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+def paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    return a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+
+def filter_row(ftype, row, prev, bpp):
+    out = bytearray()
+    for i, x in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        pred = [0, a, b, (a + b) >> 1, paeth(a, b, c)][ftype]
+        out.append((x - pred) & 0xFF)
+    return bytes([ftype]) + bytes(out)
+
+def make_png(width, height, depth, ctype, rows, plte=b"", trns=b"", bpp=1):
+    raw = b""
+    prev = bytes(len(rows[0]))
+    for y, row in enumerate(rows):
+        raw += filter_row(y % 5, row, prev, bpp)
+        prev = row
+    ihdr = struct.pack(">IIBBBBB", width, height, depth, ctype, 0, 0, 0)
+    body = chunk(b"IHDR", ihdr)
+    if plte:
+        body += chunk(b"PLTE", plte)
+    if trns:
+        body += chunk(b"tRNS", trns)
+    return PNG_SIGNATURE + body + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+def test_rgba_roundtrip_and_all_filters():
+    w, h = 7, 6
+    rgba = bytes((x * 37 + y * 11 + c * 5) & 0xFF for y in range(h) for x in range(w) for c in range(4))
+    rows = [rgba[y * w * 4 : (y + 1) * w * 4] for y in range(h)]
+    img = read_png(make_png(w, h, 8, 6, rows, bpp=4))
+    assert (img.width, img.height, bytes(img.rgba)) == (w, h, rgba)
+    assert bytes(read_png(write_png(img)).rgba) == rgba
+
+def test_palette_low_bit_depth_with_transparency():
+    plte = bytes([255, 0, 0, 0, 255, 0, 0, 0, 255])
+    # 4-bit indices, 3 pixels per row: [0, 1, 2] and [2, 1, 0]
+    rows = [bytes([0x01, 0x20]), bytes([0x21, 0x00])]
+    img = read_png(make_png(3, 2, 4, 3, rows, plte=plte, trns=bytes([0])))
+    px = [tuple(img.rgba[i : i + 4]) for i in range(0, len(img.rgba), 4)]
+    assert px == [(255, 0, 0, 0), (0, 255, 0, 255), (0, 0, 255, 255), (0, 0, 255, 255), (0, 255, 0, 255), (255, 0, 0, 0)]
+
+def test_sprite_packs_cells_and_css_positions():
+    imgs = {s: Image(2, 2, bytearray([i] * 16)) for i, s in enumerate(["a", "b", "c"], start=1)}
+    sheet = build_sprite(imgs)
+    assert (sheet.columns, sheet.rows, sheet.image.width, sheet.image.height) == (2, 2, 4, 4)
+    assert sheet.cells == {"a": (0, 0), "b": (1, 0), "c": (0, 1)}
+    assert sheet.image.rgba[(2 * 4 + 0) * 4] == 3  # "c" starts at row 2, column 0
+    css = sprite_css(sheet)
+    assert ".e-b { background-position: 100% 0%; }" in css
+    assert "background-size: 200% 200%" in css
+
+@pytest.mark.parametrize("mode", ["sprite", "datauri"])
+def test_emojify_to_html_inline_image_modes(tmp_path: Path, mode: str):
+    p = load_profile(PROFILE)
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    slugs = [to_twemoji_slug(resolve(w, p)) for w in ["jan", "pona"]]
+    for i, slug in enumerate(slugs):
+        (assets / f"{slug}.png").write_bytes(write_png(Image(72, 72, bytearray([i * 100] * 72 * 72 * 4))))
+
+    inp = tmp_path / "in.txt"
+    inp.write_text("jan pona jan\n", encoding="utf-8")
+    outdir = tmp_path / "out"
+    cmd = [sys.executable, "-m", "tools.emojify_to_html", "--in", str(inp), "--outdir", str(outdir),
+           "--assets", str(assets), "--image-mode", mode]
+    subprocess.check_call(cmd, stdout=subprocess.DEVNULL)
+
+    page = (outdir / "index.html").read_text(encoding="utf-8")
+    assert '<link rel="stylesheet" href="emoji.css" />' in page
+    assert page.count(f'class="emoji e-{slugs[0]}"') == 2
+    assert not (outdir / "img").exists()
+    css = (outdir / "emoji.css").read_text(encoding="utf-8")
+    for slug in slugs:
+        assert f".e-{slug} " in css
+    if mode == "sprite":
+        sheet = read_png((outdir / "sprite.png").read_bytes())
+        assert (sheet.width, sheet.height) == (144, 72)
+    else:
+        assert "data:image/png;base64," in css
@@ -0,0 +1,110 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tools.profile import (
+    CompiledProfile,
+    MappedProfile,
+    Profile,
+    load_profile,
+    load_profile_stack,
+    merge_profiles,
+    resolve,
+    stack_key,
+    write_binary_profile,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+
+def write(path: Path, data: dict) -> Path:
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_merge_overrides_deletes_and_inherits_aliases():
+    base = Profile("base", "1", {"ali": "ale", "oko": "lukin"}, {"ale": "♾️", "ali": "♾️", "lukin": "👀", "oko": "👁️", "jan": "👤"})
+    house = Profile("house", "", {"kin": "a"}, {"ale": "🌐", "lukin": "🔍", "jan": None})
+    merged = merge_profiles(base, [house])
+
+    assert merged.name == "base + house" and merged.version == "1"
+    assert resolve("ale", merged) == "🌐"
+    assert resolve("ali", merged) == "🌐"  # the alias copied ale's glyph, so it follows the override
+    assert resolve("oko", merged) == "👁️"  # an alias with its own glyph keeps it
+    assert resolve("jan", merged) is None
+    assert merged.aliases["kin"] == "a"
+
+    # later layers win; null deletes an alias too
+    book = Profile("", "", {"oko": None}, {"ale": "🌍"})
+    merged = merge_profiles(base, [house, book])
+    assert resolve("ali", merged) == "🌍"
+    assert "oko" not in merged.aliases
+    assert base.entries["ale"] == "♾️"  # inputs untouched
+
+
+def test_stack_is_compiled_once_and_cached(tmp_path: Path):
+    house = write(tmp_path / "house.json", {"name": "house", "entries": {"ale": "🌐", "kala": None}})
+    book = write(tmp_path / "book.json", {"entries": {"jan": "🙂"}})
+    cache = tmp_path / "cache"
+    paths = [PROFILE, house, book]
+
+    first = load_profile_stack(paths, cache)
+    assert isinstance(first, CompiledProfile)
+    assert (cache / f"{stack_key(paths)}.bin").exists()
+
+    second = load_profile_stack(paths, cache)
+    assert isinstance(second, MappedProfile)
+    assert second.digest == first.digest
+
+    merged = merge_profiles(load_profile(PROFILE), [load_profile(house), load_profile(book)])
+    for w in set(merged.entries) | set(merged.aliases) | {"kala", "ALI", "nope"}:
+        assert second.resolve(w) == resolve(w, merged), w
+    second.close()
+
+    # any changed layer -> new key, recompiled
+    write(book, {"entries": {"jan": "🧍"}})
+    assert stack_key(paths) != stack_key([PROFILE, house, write(tmp_path / "b2.json", {"entries": {"jan": "🙂"}})])
+    assert load_profile_stack(paths, cache).resolve("jan") == "🧍"
+    assert len(list(cache.glob("*.bin"))) == 2
+
+    assert isinstance(load_profile_stack([PROFILE], cache), CompiledProfile)  # single profile: no stack cache
+
+    # library calls only cache when asked to
+    fresh = write(tmp_path / "fresh.json", {"entries": {"jan": "🧑"}})
+    assert load_profile_stack([PROFILE, fresh]).resolve("jan") == "🧑"
+    assert len(list(cache.glob("*.bin"))) == 2
+
+
+def test_binary_layers_are_rejected(tmp_path: Path):
+    # a binary table has its aliases folded in: ali could not follow an ale override
+    binary = tmp_path / "base.bin"
+    write_binary_profile(CompiledProfile(load_profile(PROFILE)), binary)
+    house = write(tmp_path / "house.json", {"entries": {"ale": "X"}})
+    with pytest.raises(ValueError, match="binary profiles cannot be layered"):
+        load_profile_stack([binary, house], None)
+    with pytest.raises(ValueError):
+        load_profile_stack([PROFILE, binary], None)
+    assert load_profile_stack([PROFILE, house], None).resolve("ali") == "X"
+    assert isinstance(load_profile_stack([binary], None), MappedProfile)
+
+
+def test_cli_repeated_profile_flags(tmp_path: Path):
+    house = write(tmp_path / "house.json", {"entries": {"jan": "🧍"}})
+    inp = tmp_path / "in.txt"
+    inp.write_text("jan ali\n", encoding="utf-8")
+    out = tmp_path / "out.txt"
+    cache = tmp_path / "cache"
+    flags = ["--profile", str(PROFILE), "--profile", str(house), "--profile-cache", str(cache)]
+
+    subprocess.check_call([sys.executable, "-m", "tools.convert_tp_text", "--in", str(inp), "--out", str(out), *flags], cwd=ROOT)
+    ali = resolve("ali", load_profile(PROFILE))
+    assert out.read_text(encoding="utf-8") == f"🧍 {ali}\n"
+
+    res = subprocess.run([sys.executable, "tools/lookup.py", "jan", *flags], cwd=ROOT, capture_output=True, text=True)
+    assert res.returncode == 0 and res.stdout == "jan\t🧍\n"
+    # both runs shared one compiled stack
+    assert [p.name for p in cache.iterdir()] == [f"{stack_key([PROFILE, house])}.bin"]
@@ -1,5 +1,18 @@
-from tools.twemoji import to_twemoji_slug
+from pathlib import Path
+
+from tools.profile import load_profile
+from tools.twemoji import SlugIndex, is_probably_emoji_token, to_twemoji_slug
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE = ROOT / "profiles" / "default-stable.v1.json"
 
 def test_twemoji_slug_drops_fe0f_like_twemoji_assets():
     # Example from Twemoji discussions: ☺️ (263A FE0F) is stored as 263a
     assert to_twemoji_slug("☺️") == "263a"
+
+def test_slug_index_matches_per_token_functions():
+    glyphs = set(load_profile(PROFILE).entries.values())
+    index = SlugIndex(glyphs)
+    for t in sorted(glyphs) + ["jan", "", " ", "　", "é", "☺️", "👨‍👩‍👧"]:
+        expected = to_twemoji_slug(t) if is_probably_emoji_token(t) else None
+        assert index.emoji_slug(t) == expected, t
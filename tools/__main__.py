@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import sys
+
+# One entry point for all tools: `python -m tools <command> [args...]`.
+# Only the chosen command's module is imported, so `python -m tools --help`
+# and each command pay for their own imports and nothing else.
+
+COMMANDS = {
+    "convert": ("tools.convert_tp_text", "toki pona text -> sitelen emoji"),
+    "decode": ("tools.emoji_to_tp", "sitelen emoji text -> toki pona"),
+    "html": ("tools.emojify_to_html", "sitelen emoji text -> HTML with Twemoji PNGs"),
+    "pdf": ("tools.emojify_to_pdf", "sitelen emoji text -> PDF with Twemoji PNGs"),
+    "fetch": ("tools.fetch_twemoji_assets", "download Twemoji PNGs for a profile"),
+    "build": ("tools.build_default_stable", "build dist/default-stable.json from upstream"),
+    "diff": ("tools.diff_profiles", "compare profiles"),
+    "lookup": ("tools.lookup", "look up words (or serve lookups over stdio / a Unix socket)"),
+    "serve": ("tools.http_service", "HTTP translation service"),
+    "profile": ("tools.profile", "compile / verify binary profiles"),
+}
+
+
+def usage() -> str:
+    width = max(map(len, COMMANDS))
+    lines = ["Usage: python -m tools <command> [args...]", "", "Commands:"]
+    lines += [f"  {name:<{width}}  {help_}" for name, (_, help_) in COMMANDS.items()]
+    lines += ["", "Run `python -m tools <command> --help` for the command's options."]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0 if argv else 2
+
+    name, rest = argv[0], argv[1:]
+    entry = COMMANDS.get(name)
+    if entry is None:
+        print(f"Unknown command: {name}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    from importlib import import_module
+
+    module = import_module(entry[0])
+    sys.argv = [f"python -m tools {name}", *rest]
+    return module.main() or 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
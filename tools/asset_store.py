@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import secrets
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_STORE_DIR = ROOT / "assets" / "twemoji" / "store"
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+
+# Temp files are created with mode 0666 and the kernel applies the umask, so
+# published files get the usual permissions (mkstemp would make them 0600).
+_TMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+
+
+def _create_temp(out_path: Path) -> tuple[int, Path]:
+    while True:
+        tmp = out_path.with_name(f".{out_path.name}.{secrets.token_hex(6)}.part")
+        try:
+            return os.open(tmp, _TMP_FLAGS, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+@contextmanager
+def open_atomic(out_path: Path) -> Iterator[BinaryIO]:
+    # Write to a temp file next to the target and rename it into place, so an
+    # interrupted write never leaves a truncated file under the final name.
+    fd, tmp = _create_temp(out_path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp, out_path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_atomic(out_path: Path, data: bytes) -> None:
+    with open_atomic(out_path) as f:
+        f.write(data)
+
+
+def _intact(path: Path, digest: str, size: int) -> bool:
+    try:
+        if path.stat().st_size != size:
+            return False
+        return hashlib.sha256(path.read_bytes()).hexdigest() == digest
+    except FileNotFoundError:
+        return False
+
+
+class AssetStore:
+    """
+    Content-addressed Twemoji PNG store shared by all Twemoji versions.
+
+    Layout:
+      <root>/objects/<aa>/<sha256>.png  - one file per distinct PNG
+      <root>/manifest.json              - {"versions": {ver: {slug: {"sha256", "size"}}}}
+
+    Identical PNGs from different versions are stored once. A manifest entry
+    whose object file is missing, has the wrong size or the wrong hash is
+    treated as absent. Objects are re-hashed once per AssetStore instance
+    (i.e. per run); deep=False settles for the size check, deep=True always
+    re-hashes.
+    """
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR) -> None:
+        self.root = root
+        self.manifest_path = root / MANIFEST_NAME
+        self._lock = threading.Lock()
+        if self.manifest_path.exists():
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        else:
+            data = {}
+        self.versions: dict[str, dict[str, dict]] = data.get("versions") or {}
+        # digests whose object was written or hashed by this instance
+        self._hashed: set[str] = set()
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.png"
+
+    def entry(self, version: str, slug: str) -> Optional[dict]:
+        return self.versions.get(version, {}).get(slug)
+
+    def path_for(self, version: str, slug: str) -> Optional[Path]:
+        """Object path for slug in version (not verified), or None if unknown."""
+        e = self.entry(version, slug)
+        return self.object_path(e["sha256"]) if e else None
+
+    def verify(self, version: str, slug: str, deep: Optional[bool] = None) -> bool:
+        e = self.entry(version, slug)
+        if not e:
+            return False
+        path = self.object_path(e["sha256"])
+        try:
+            if path.stat().st_size != e["size"]:
+                return False
+        except FileNotFoundError:
+            return False
+        if deep is False or (deep is None and e["sha256"] in self._hashed):
+            return True
+        if hashlib.sha256(path.read_bytes()).hexdigest() != e["sha256"]:
+            return False
+        with self._lock:
+            self._hashed.add(e["sha256"])
+        return True
+
+    def put(self, version: str, slug: str, data: bytes) -> Path:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not _intact(path, digest, len(data)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, data)
+        with self._lock:
+            self._hashed.add(digest)
+            self.versions.setdefault(version, {})[slug] = {"sha256": digest, "size": len(data)}
+        return path
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                "format": MANIFEST_FORMAT,
+                "versions": {v: dict(sorted(slugs.items())) for v, slugs in sorted(self.versions.items())},
+            }
+            text = json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+        self.root.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.manifest_path, text.encode("utf-8"))
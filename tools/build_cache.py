@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from tools.asset_store import write_atomic
+
+# Bump when the cached value layout or the renderers change output.
+CACHE_FORMAT = 2
+
+# Chunking: a chunk ends at a blank line, at a content-defined boundary
+# (crc32 of the line), or at MAX_CHUNK_LINES. Content-defined cuts keep the
+# boundaries stable after an insertion, so one edit only dirties its chunk.
+BOUNDARY_MASK = 0xF
+MAX_CHUNK_LINES = 128
+
+
+def chunk_lines(lines: Iterable[str]) -> Iterator[list[str]]:
+    chunk: list[str] = []
+    for line in lines:
+        chunk.append(line)
+        if (
+            not line.strip()
+            or zlib.crc32(line.encode("utf-8")) & BOUNDARY_MASK == 0
+            or len(chunk) >= MAX_CHUNK_LINES
+        ):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BuildCache:
+    """
+    On-disk cache of rendered chunks for incremental rebuilds.
+
+    Keys are sha256(context + chunk text), where the context describes
+    everything else the output depends on (profile digest, asset version,
+    options). save() keeps only the entries used by the current build, so the
+    file tracks one book and does not grow across edits.
+    """
+
+    def __init__(self, path: Path, context: str) -> None:
+        self.path = path
+        self.context = f"{CACHE_FORMAT}\0{context}\0"
+        self.hits = 0
+        self.misses = 0
+        self._old: dict[str, Any] = {}
+        self._new: dict[str, Any] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("format") == CACHE_FORMAT:
+                self._old = data.get("entries") or {}
+
+    def key(self, chunk: list[str]) -> str:
+        return hashlib.sha256((self.context + "\n".join(chunk)).encode("utf-8")).hexdigest()
+
+    def map_chunks(
+        self,
+        lines: Iterable[str],
+        render: Callable[[list[str]], Any],
+        valid: Optional[Callable[[Any], bool]] = None,
+    ) -> Iterator[tuple[list[str], Any]]:
+        """
+        Yield (chunk, value) for each chunk of lines. value is taken from the
+        cache when present (and valid(value) agrees), otherwise render(chunk)
+        is called and stored. Values must be JSON-serializable.
+        """
+        for chunk in chunk_lines(lines):
+            key = self.key(chunk)
+            value = self._new.get(key)
+            if value is None:
+                value = self._old.get(key)
+            if value is not None and (valid is None or valid(value)):
+                self.hits += 1
+            else:
+                self.misses += 1
+                value = render(chunk)
+            self._new[key] = value
+            yield chunk, value
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"format": CACHE_FORMAT, "entries": self._new}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
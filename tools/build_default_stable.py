@@ -1,16 +1,35 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
 import json
 import re
 import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from urllib.request import urlopen, Request
 
 ROOT = Path(__file__).resolve().parents[1]
+# Run as a script, tools/ is first on sys.path and tools/profile.py would
+# shadow the stdlib `profile` module that cProfile (--profile-out) imports.
+if sys.path and Path(sys.path[0]).resolve() == ROOT / "tools":
+    sys.path[0] = str(ROOT)
+else:
+    sys.path.append(str(ROOT))
+
+from tools.http_cache import DEFAULT_HTTP_CACHE_DIR, HttpCache
+from tools.instrument import add_arguments, instrumented
+from tools.json_stream import JsonStream
+
 WORDS_FILE = ROOT / "words" / "nimi_pu.txt"
 ALIASES_FILE = ROOT / "words" / "aliases.json"
 DIST_DIR = ROOT / "dist"
 DIST_DIR.mkdir(exist_ok=True)
+# Hashes of the last build's inputs; an unchanged stamp skips regeneration
+STAMP_NAME = ".build-stamp.json"
+OUTPUTS = ("default-stable.json", "report.md")
+# Bump when the generated files change for the same inputs
+BUILD_FORMAT = 2
 
 UPSTREAM_URL = "https://raw.githubusercontent.com/devbali/desktop-sitelen-emoji/master/sitelenemoji.json"
 
@@ -20,14 +39,25 @@ def load_lines(path: Path):
 def load_json(path: Path):
     return json.loads(path.read_text(encoding="utf-8"))
 
-def fetch_json(url: str):
-    req = Request(url, headers={"User-Agent": "sitelen-emoji-truth/0.1"})
-    with urlopen(req) as r:
-        return json.loads(r.read().decode("utf-8"))
-
 def normalize_word(w: str) -> str:
     return w.strip().lower()
 
+def pick_fields(obj: dict):
+    # ищем ключи без учёта регистра
+    lk = {k.lower(): k for k in obj.keys()}
+    w_key = lk.get("word") or lk.get("nimi") or lk.get("tp_word")
+    e_key = lk.get("emoji") or lk.get("glyph") or lk.get("char")
+    if not w_key or not e_key:
+        return None
+    w = obj.get(w_key)
+    e = obj.get(e_key)
+    if isinstance(w, str) and isinstance(e, str) and w.strip() and e.strip():
+        return normalize_word(w), e
+    return None
+
+# Ключи-обёртки, в порядке приоритета: {"data":[...]}, {"words":[...]}, ...
+WRAPPER_KEYS = ("data", "words", "items", "entries", "dictionary")
+
 def extract_mapping(upstream) -> dict[str, str]:
     """
     Пытается вытянуть word->emoji из нескольких распространённых форматов:
@@ -36,23 +66,10 @@ def extract_mapping(upstream) -> dict[str, str]:
     - list: [{"word":"a","emoji":"❗", ...}, ...]
     - dict с вложением: {"data":[...]} или {"words":[...]} и т.п.
     """
-    def pick_fields(obj: dict):
-        # ищем ключи без учёта регистра
-        lk = {k.lower(): k for k in obj.keys()}
-        w_key = lk.get("word") or lk.get("nimi") or lk.get("tp_word")
-        e_key = lk.get("emoji") or lk.get("glyph") or lk.get("char")
-        if not w_key or not e_key:
-            return None
-        w = obj.get(w_key)
-        e = obj.get(e_key)
-        if isinstance(w, str) and isinstance(e, str) and w.strip() and e.strip():
-            return normalize_word(w), e
-        return None
-
     # 1) прямой dict word->emoji
     if isinstance(upstream, dict):
         # если это “обёртка”, попробуем найти в ней список
-        for k in ("data", "words", "items", "entries", "dictionary"):
+        for k in WRAPPER_KEYS:
             if k in upstream and isinstance(upstream[k], (list, dict)):
                 try_map = extract_mapping(upstream[k])
                 if try_map:
@@ -81,30 +98,206 @@ def extract_mapping(upstream) -> dict[str, str]:
 
     return {}
 
+def stream_mapping(js: JsonStream) -> dict[str, str]:
+    """
+    extract_mapping() over a JsonStream, without building the document:
+    list elements are decoded one at a time, wrapper values are walked
+    recursively and other values are skipped. Same result as
+    extract_mapping(json.load(...)).
+    """
+    c = js.peek()
+    if c == "[":
+        out = {}
+        for _ in js.items():
+            item = js.value()
+            if isinstance(item, dict):
+                pair = pick_fields(item)
+                if pair:
+                    out[pair[0]] = pair[1]
+        return out
+    if c == "{":
+        direct = {}
+        wrapped = {}
+        for key in js.members():
+            c = js.peek()
+            if key in WRAPPER_KEYS and c in "[{":
+                wrapped[key] = stream_mapping(js)
+                continue
+            v = js.value()
+            if isinstance(v, str) and v.strip():
+                direct[normalize_word(key)] = v
+        # обёртки важнее прямых пар, как в extract_mapping()
+        for k in WRAPPER_KEYS:
+            if wrapped.get(k):
+                return wrapped[k]
+        return direct
+    js.value()
+    return {}
+
+def jsonl_mapping(lines) -> dict[str, str]:
+    """word->emoji from JSON Lines: one {"word":..,"emoji":..} object (or any extract_mapping() shape) per line."""
+    out = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        pair = pick_fields(obj) if isinstance(obj, dict) else None
+        if pair:
+            out[pair[0]] = pair[1]
+        else:
+            out.update(extract_mapping(obj))
+    return out
+
+def ingest(f, fmt: str) -> dict[str, str]:
+    """Incrementally read a text stream in the given format ("json" or "jsonl")."""
+    if fmt == "jsonl":
+        return jsonl_mapping(f)
+    js = JsonStream(f)
+    mapping = stream_mapping(js)
+    js.end()
+    return mapping
+
 def strip_variation_selectors(s: str) -> str:
     # на всякий случай нормализуем VS16/VS15, если нужно
     return s
 
+@dataclass
+class Source:
+    name: str
+    # URL (fetched through the HTTP cache) or local file path
+    location: str
+    fmt: str
+
+    @property
+    def is_url(self) -> bool:
+        return "://" in self.location
+
+def parse_source(spec: str) -> Source:
+    """[NAME=]URL_OR_PATH; the format comes from the extension (.jsonl/.ndjson, else JSON)."""
+    m = re.match(r"^([\w.-]+)=(.+)$", spec)
+    name, location = (m.group(1), m.group(2)) if m else (None, spec)
+    stem = location.rstrip("/").rsplit("/", 1)[-1].split("?", 1)[0]
+    fmt = "jsonl" if stem.endswith((".jsonl", ".ndjson")) else "json"
+    return Source(name or stem.rsplit(".", 1)[0] or location, location, fmt)
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def build_stamp(sources: list) -> dict:
+    """sources: [(Source, sha256)] in precedence order."""
+    h = hashlib.sha256()
+    for path in (WORDS_FILE, ALIASES_FILE):
+        h.update(path.read_bytes())
+    return {
+        "format": BUILD_FORMAT,
+        "sources": [{"name": s.name, "location": s.location, "fmt": s.fmt, "sha256": digest} for s, digest in sources],
+        "inputs_sha256": h.hexdigest(),
+    }
+
+def read_stamp(dist_dir: Path):
+    try:
+        return json.loads((dist_dir / STAMP_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
 def main():
-    pu_words = [normalize_word(w) for w in load_lines(WORDS_FILE)]
-    aliases = {normalize_word(k): normalize_word(v) for k, v in load_json(ALIASES_FILE).items()}
+    ap = argparse.ArgumentParser(description="Build dist/default-stable.json from the upstream mapping.")
+    ap.add_argument("--url", default=UPSTREAM_URL, help="Upstream sitelen emoji JSON (used when no --source is given)")
+    ap.add_argument(
+        "--source",
+        action="append",
+        default=[],
+        metavar="[NAME=]URL_OR_PATH",
+        help="Upstream JSON/JSONL dictionary (URL or local file); repeatable, earlier sources win",
+    )
+    ap.add_argument("--dist", type=Path, default=DIST_DIR, help="Output directory (default: dist/)")
+    ap.add_argument("--cache-dir", type=Path, default=DEFAULT_HTTP_CACHE_DIR, help="HTTP cache for the upstream download")
+    ap.add_argument("--offline", action="store_true", help="Build from the cached upstream snapshot, no network")
+    ap.add_argument("--force", action="store_true", help="Regenerate even if upstream and inputs are unchanged")
+    add_arguments(ap)
+    args = ap.parse_args()
 
-    upstream = fetch_json(UPSTREAM_URL)
-    mapping = extract_mapping(upstream)
+    sources = [parse_source(spec) for spec in args.source or [f"upstream={args.url}"]]
+    names = [s.name for s in sources]
+    if len(set(names)) != len(names):
+        ap.error(f"source names must be unique: {', '.join(names)} (use NAME=URL_OR_PATH)")
+
+    with instrumented("build_default_stable", args.stats, args.profile_out) as stats:
+        return build(stats, sources, args.dist, HttpCache(args.cache_dir), args.offline, args.force)
+
+def build(stats, sources, dist_dir, cache, offline=False, force=False):
+    # Источники в порядке приоритета: первый, у кого есть слово, побеждает
+    fetched = []  # (Source, sha256, path of the document on disk, fetch seconds)
+    with stats.phase("fetch_upstream"):
+        for src in sources:
+            t0 = time.perf_counter()
+            if src.is_url:
+                try:
+                    resp = cache.get(src.location, offline=offline)
+                except FileNotFoundError as e:
+                    print(f"Error: {e}")
+                    return 1
+                print(f"Source {src.name}: {resp.status} (sha256 {resp.sha256[:16]})")
+                stats.count("bytes_downloaded", resp.downloaded)
+                # only the digest is kept: the body is parsed from the cache file, one source at a time
+                fetched.append((src, resp.sha256, resp.path, time.perf_counter() - t0))
+            else:
+                path = Path(src.location)
+                if not path.is_file():
+                    print(f"Error: source {src.name}: no such file: {path}")
+                    return 1
+                digest = file_sha256(path)
+                print(f"Source {src.name}: local (sha256 {digest[:16]})")
+                fetched.append((src, digest, path, time.perf_counter() - t0))
+
+    # Upstream и входные файлы не изменились — dist/ уже актуален
+    stamp = build_stamp([(src, digest) for src, digest, _, _ in fetched])
+    old = read_stamp(dist_dir)
+    if not force and old and {k: old.get(k) for k in stamp} == stamp and all((dist_dir / n).exists() for n in OUTPUTS):
+        stats.count("skipped")
+        print(f"Up to date: {dist_dir / OUTPUTS[0]} (upstream unchanged)")
+        if old.get("missing"):
+            print("Build finished with missing words:", ", ".join(old["missing"]))
+            return 2
+        return 0
+
+    with stats.phase("load_words"):
+        pu_words = [normalize_word(w) for w in load_lines(WORDS_FILE)]
+        aliases = {normalize_word(k): normalize_word(v) for k, v in load_json(ALIASES_FILE).items()}
+
+    # (Source, mapping, fetch seconds, parse seconds)
+    ingested = []
+    with stats.phase("extract"):
+        for src, _, path, fetch_s in fetched:
+            t0 = time.perf_counter()
+            with open(path, encoding="utf-8") as f:
+                mapping = ingest(f, src.fmt)
+            parse_s = time.perf_counter() - t0
+            stats.update({f"keys:{src.name}": len(mapping)})
+            ingested.append((src, mapping, fetch_s, parse_s))
 
     # В stable добавляем: 120 слов + алиасы
     required = set(pu_words) | set(aliases.keys())
 
     missing = []
     entries = {}
+    winners = {}  # word -> source name
 
     for w in sorted(required):
         base = aliases.get(w, w)
-        emoji = mapping.get(w) or mapping.get(base)
-        if not emoji:
+        for src, mapping, _, _ in ingested:
+            emoji = mapping.get(w) or mapping.get(base)
+            if emoji:
+                entries[w] = strip_variation_selectors(emoji)
+                winners[w] = src.name
+                break
+        else:
             missing.append(w)
-            continue
-        entries[w] = strip_variation_selectors(emoji)
 
     # Добавим рекомендованную пунктуацию как отдельные “служебные” записи
     # (это не слова toki pona, но полезно для книг/экспорта)
@@ -116,34 +309,64 @@ def main():
         "version": "0.1.0",
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "sources": [
-            {"type": "upstream_json", "url": UPSTREAM_URL}
+            {"type": f"upstream_{src.fmt}", "name": src.name, "url": src.location} for src in sources
         ],
         "aliases": aliases,
         "entries": entries
     }
 
-    (DIST_DIR / "default-stable.json").write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    with stats.phase("write"):
+        dist_dir.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(out, ensure_ascii=False, indent=2)
+        (dist_dir / "default-stable.json").write_text(text, encoding="utf-8")
 
-    # отчёт
-    extras = sorted(set(mapping.keys()) - required)
-    report = []
-    report.append(f"# Build report\n")
-    report.append(f"- required words (pu+aliases): {len(required)}")
-    report.append(f"- entries produced (incl. punct): {len(entries)}")
-    report.append(f"- missing: {len(missing)}")
-    if missing:
-        report.append("\n## Missing\n")
-        report.extend([f"- {w}" for w in missing])
-    report.append(f"\n## Upstream extra keys (first 50)\n")
-    for w in extras[:50]:
-        report.append(f"- {w}")
-    (DIST_DIR / "report.md").write_text("\n".join(report), encoding="utf-8")
+        # отчёт
+        all_keys = set().union(*(m for _, m, _, _ in ingested))
+        extras = sorted(all_keys - required)
+        report = []
+        report.append(f"# Build report\n")
+        report.append(f"- required words (pu+aliases): {len(required)}")
+        report.append(f"- entries produced (incl. punct): {len(entries)}")
+        report.append(f"- missing: {len(missing)}")
+        if missing:
+            report.append("\n## Missing\n")
+            report.extend([f"- {w}" for w in missing])
+        report.append("\n## Sources (in precedence order)\n")
+        report.append("| source | format | keys | entries won | fetch s | parse s | sha256 |")
+        report.append("|---|---|---|---|---|---|---|")
+        won = {}
+        for name in winners.values():
+            won[name] = won.get(name, 0) + 1
+        for (src, mapping, fetch_s, parse_s), (_, digest, _, _) in zip(ingested, fetched):
+            report.append(
+                f"| {src.name} | {src.fmt} | {len(mapping)} | {won.get(src.name, 0)} "
+                f"| {fetch_s:.3f} | {parse_s:.3f} | {digest[:16]} |"
+            )
+        report.append("\n## Entry sources\n")
+        report.extend([f"- {w}: {winners[w]}" for w in sorted(winners)])
+        report.append(f"\n## Upstream extra keys (first 50)\n")
+        for w in extras[:50]:
+            report.append(f"- {w}")
+        (dist_dir / "report.md").write_text("\n".join(report), encoding="utf-8")
+        stamp["missing"] = missing
+        (dist_dir / STAMP_NAME).write_text(json.dumps(stamp, indent=2), encoding="utf-8")
+
+    stats.update(
+        {
+            "upstream_keys": len(all_keys),
+            "required": len(required),
+            "entries": len(entries),
+            "missing": len(missing),
+            "bytes_written": len(text.encode("utf-8")),
+        }
+    )
 
     if missing:
         print("Build finished with missing words:", ", ".join(missing))
-        sys.exit(2)
+        return 2
 
-    print("OK: dist/default-stable.json generated")
+    print(f"OK: {dist_dir / 'default-stable.json'} generated")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -2,99 +2,405 @@
 from __future__ import annotations
 
 import argparse
+import glob
+import io
+import os
 import re
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, TextIO
 
-from tools.profile import load_profile, resolve
+from tools.instrument import AnyStats, add_arguments, instrumented
+from tools.profile import DEFAULT_STACK_CACHE_DIR, AnyProfile, LookupProfile, compile_profile, load_profile_stack
+
+if TYPE_CHECKING:
+    from tools.build_cache import BuildCache
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
 
+# Batch mode: files larger than this are split (on line boundaries) into
+# several chunks converted in parallel.
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
 # Leading/trailing punctuation we peel off tokens.
 # We keep internal hyphens/apostrophes inside the core.
-PUNCT_EDGE_RE = re.compile(r"^([\"'“”‘’(\[\{<]*)(.*?)([\"'“”‘’)\]\}>.,!?;:…]*)$")
+LEADING_PUNCT = "\"'“”‘’([{<"
+TRAILING_PUNCT = "\"'“”‘’)]}>.,!?;:…"
+
+# One scan per line, one match per whitespace-separated token:
+#   (leading*) (core) (trailing*)
+# The core is written as (TRAILING* non-TRAILING)* so it always ends on the
+# last non-trailing char without the lazy-match backtracking of the old
+# per-token ^(lead*)(.*?)(trail*)$ pattern.
+_L = re.escape(LEADING_PUNCT)
+_T = re.escape(TRAILING_PUNCT)
+TOKEN_RE = re.compile(rf"(?=\S)([{_L}]*)((?:[{_T}]*[^\s{_T}])*)([{_T}]*)")
+
+
+class LineConverter:
+    """
+    Converts lines of toki pona with a fixed profile and punctuation options.
+
+    Punctuation emoji are resolved once, when the converter is built;
+    trailing punctuation is then mapped with str.translate().
+    """
+
+    def __init__(self, profile: AnyProfile, convert_dot: bool = True, convert_colon: bool = True) -> None:
+        self.profile = compile_profile(profile)
+        self.convert_dot = convert_dot
+        self.convert_colon = convert_colon
+        punct: dict[int, str] = {}
+        for ch, key, enabled in ((".", "_punct_period", convert_dot), (":", "_punct_colon", convert_colon)):
+            p = self.profile.resolve_quiet(key) if enabled else None
+            if p:
+                punct[ord(ch)] = p
+        self._punct = punct
+
+    def tokens(self, line: str) -> list[str]:
+        """Output tokens for line, one per punctuation char / word."""
+        resolve = self.profile.resolve
+        punct = self._punct
+        out: list[str] = []
+        for leading, core, trailing in TOKEN_RE.findall(line):
+            if leading:
+                out.extend(leading)
+            if core:
+                out.append(resolve(core) or core)
+            if trailing:
+                out.extend(ch.translate(punct) for ch in trailing)
+        return out
+
+    def __call__(self, line: str) -> str:
+        resolve = self.profile.resolve
+        punct = self._punct
+        parts: list[str] = []
+        append = parts.append
+        for leading, core, trailing in TOKEN_RE.findall(line):
+            if leading:
+                append(" ".join(leading))
+            if core:
+                append(resolve(core) or core)
+            if trailing:
+                append(" ".join(trailing).translate(punct))
+        return " ".join(parts)
+
+
+@lru_cache(maxsize=16)
+def _line_converter(profile: LookupProfile, convert_dot: bool, convert_colon: bool) -> LineConverter:
+    return LineConverter(profile, convert_dot, convert_colon)
+
+
+def convert_line(line: str, profile: AnyProfile, convert_dot: bool, convert_colon: bool) -> str:
+    return _line_converter(compile_profile(profile), convert_dot, convert_colon)(line)
+
+
+def cache_context(profile: LookupProfile, convert_dot: bool, convert_colon: bool) -> str:
+    return f"convert_tp_text\0{profile.name}\0{profile.version}\0{profile.digest}\0{convert_dot}\0{convert_colon}"
+
+
+def _cached_lines(cache: BuildCache, lines: Iterable[str], convert: LineConverter) -> Iterator[str]:
+    # Each chunk also stores its lookup counts; a reused chunk replays them
+    # into the profile counters so --stats counts its tokens too.
+    counters = convert.profile
+    fresh = False
+
+    def render(chunk: list[str]) -> dict:
+        nonlocal fresh
+        fresh = True
+        hits, misses = counters.hits, counters.misses
+        out = [convert(line) for line in chunk]
+        return {"lines": out, "lookups": [counters.hits - hits, counters.misses - misses]}
+
+    for _, value in cache.map_chunks(lines, render):
+        if not fresh:
+            counters.hits += value["lookups"][0]
+            counters.misses += value["lookups"][1]
+        fresh = False
+        yield from value["lines"]
+
+
+def iter_converted_lines(
+    src: Iterable[str],
+    profile: AnyProfile,
+    convert_dot: bool = True,
+    convert_colon: bool = True,
+    cache: Optional[BuildCache] = None,
+) -> Iterator[str]:
+    """
+    Lazily convert src (a text file object or any iterable of lines).
 
+    Yields output chunks ready to be written: lines are joined with "\n" and
+    the trailing newline is kept only if the input ended with one, so the
+    concatenation equals the whole-file conversion. With a cache (built with
+    cache_context()), unchanged chunks of lines are reused from it.
+    """
+    convert = LineConverter(profile, convert_dot, convert_colon)
+    last = ""
 
-def convert_trailing_punct(trailing: str, profile, convert_dot: bool, convert_colon: bool) -> list[str]:
-    out: list[str] = []
-    for ch in trailing:
-        if ch == "." and convert_dot:
-            p = resolve("_punct_period", profile)
-            out.append(p if p else ch)
-        elif ch == ":" and convert_colon:
-            p = resolve("_punct_colon", profile)
-            out.append(p if p else ch)
-        else:
-            out.append(ch)
-    return out
+    def logical_lines() -> Iterator[str]:
+        nonlocal last
+        for raw in src:
+            last = raw
+            # splitlines() per physical line keeps str.splitlines() semantics
+            # for the rarer separators (\v, \f, \u2028, ...)
+            yield from raw.splitlines()
 
+    if cache is None:
+        converted: Iterable[str] = map(convert, logical_lines())
+    else:
+        converted = _cached_lines(cache, logical_lines(), convert)
 
-def convert_line(line: str, profile, convert_dot: bool, convert_colon: bool) -> str:
-    # Preserve empty lines
-    if not line.strip():
-        return ""
+    pending = None
+    for out in converted:
+        if pending is not None:
+            yield pending + "\n"
+        pending = out
+    if pending is not None:
+        # Preserve trailing newline if present
+        yield pending + "\n" if last.endswith("\n") else pending
 
-    tokens = line.split()
-    out_tokens: list[str] = []
 
-    for tok in tokens:
-        m = PUNCT_EDGE_RE.match(tok)
-        if not m:
-            out_tokens.append(tok)
-            continue
+def convert_stream(
+    src: Iterable[str],
+    dst: TextIO,
+    profile: AnyProfile,
+    convert_dot: bool = True,
+    convert_colon: bool = True,
+    cache: Optional[BuildCache] = None,
+) -> None:
+    dst.writelines(iter_converted_lines(src, profile, convert_dot, convert_colon, cache))
 
-        leading, core, trailing = m.group(1), m.group(2), m.group(3)
 
-        # leading punctuation: split into individual chars as separate tokens
-        for ch in leading:
-            if ch:
-                out_tokens.append(ch)
+@contextmanager
+def open_text(path: Path, mode: str) -> Iterator[TextIO]:
+    """Open a UTF-8 text file; "-" means stdin (mode "r") or stdout (mode "w")."""
+    if str(path) == "-":
+        std = sys.stdin if mode == "r" else sys.stdout
+        f = io.TextIOWrapper(std.buffer, encoding="utf-8")
+        try:
+            yield f
+        finally:
+            f.flush()
+            f.detach()
+        return
 
-        if core:
-            mapped = resolve(core, profile)
-            out_tokens.append(mapped if mapped else core)
-        else:
-            # token was only punctuation
-            pass
+    if mode == "w":
+        path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open(mode, encoding="utf-8") as f:
+        yield f
 
-        # trailing punctuation: convert . and : if enabled
-        out_tokens.extend(convert_trailing_punct(trailing, profile, convert_dot, convert_colon))
 
-    return " ".join([t for t in out_tokens if t != ""])
+@dataclass
+class BatchResult:
+    src: Path
+    dst: Path
+    bytes_in: int
+    bytes_out: int
+    chunks: int
+    seconds: float
+
+
+# Profile loaded once per worker process by _init_worker()
+_worker_profile = None
+
+
+def _init_worker(profile_paths: list[Path], profile_cache: Optional[Path]) -> None:
+    global _worker_profile
+    _worker_profile = load_profile_stack(profile_paths, profile_cache)
+
+
+def _convert_range(src: Path, start: int, end: int, convert_dot: bool, convert_colon: bool) -> tuple[str, float]:
+    t0 = time.perf_counter()
+    with src.open("rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    out = "".join(iter_converted_lines(text, _worker_profile, convert_dot, convert_colon))
+    return out, time.perf_counter() - t0
+
+
+def split_line_chunks(path: Path, chunk_bytes: int) -> list[tuple[int, int]]:
+    """
+    Split a file into byte ranges of roughly chunk_bytes, each ending right
+    after a b"\n" (or at EOF). Every chunk but the last then converts to
+    newline-terminated lines, so the chunk outputs concatenate to exactly the
+    whole-file output.
+    """
+    size = path.stat().st_size
+    ranges: list[tuple[int, int]] = []
+    start = 0
+    with path.open("rb") as f:
+        while start < size:
+            f.seek(start + max(chunk_bytes, 1) - 1)
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges or [(0, 0)]
+
+
+def _glob_base(pattern: str) -> Path:
+    parts = Path(pattern).parts
+    base = []
+    for part in parts:
+        if glob.has_magic(part):
+            break
+        base.append(part)
+    return Path(*base) if base else Path(".")
+
+
+def collect_batch(inp: str, outdir: Path, pattern: str) -> list[tuple[Path, Path]]:
+    """Map a directory (files matching pattern) or a glob to (src, dst) pairs under outdir."""
+    if Path(inp).is_dir():
+        base = Path(inp)
+        srcs = sorted(p for p in base.glob(pattern) if p.is_file())
+    else:
+        base = _glob_base(inp)
+        srcs = sorted(Path(p) for p in glob.glob(inp, recursive=True) if Path(p).is_file())
+    return [(src, outdir / src.relative_to(base)) for src in srcs]
+
+
+def convert_batch(
+    jobs: list[tuple[Path, Path]],
+    profile_paths: list[Path],
+    workers: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    convert_dot: bool = True,
+    convert_colon: bool = True,
+    profile_cache: Optional[Path] = None,
+) -> list[BatchResult]:
+    """
+    Convert many files on a process pool. Each worker loads the profile once;
+    large files are split into line chunks. Outputs are written in order and
+    are byte-identical to converting each file on its own.
+    """
+    from concurrent.futures import ProcessPoolExecutor  # batch mode only: keeps multiprocessing off startup
+
+    results: list[BatchResult] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(profile_paths, profile_cache)) as pool:
+        pending = []
+        for src, dst in jobs:
+            futures = [
+                pool.submit(_convert_range, src, a, b, convert_dot, convert_colon)
+                for a, b in split_line_chunks(src, chunk_bytes)
+            ]
+            pending.append((src, dst, futures))
+
+        for src, dst, futures in pending:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            seconds = 0.0
+            with dst.open("w", encoding="utf-8") as f:
+                for fut in futures:
+                    out, elapsed = fut.result()
+                    f.write(out)
+                    seconds += elapsed
+            results.append(BatchResult(src, dst, src.stat().st_size, dst.stat().st_size, len(futures), seconds))
+    return results
+
+
+def print_batch_summary(results: list[BatchResult], wall: float) -> None:
+    def mbps(n: int, secs: float) -> float:
+        return n / secs / 1e6 if secs > 0 else 0.0
+
+    for r in results:
+        print(f"{r.src}\t{r.bytes_in} B\t{r.chunks} chunk(s)\t{r.seconds:.3f}s\t{mbps(r.bytes_in, r.seconds):.2f} MB/s")
+    total = sum(r.bytes_in for r in results)
+    print(f"Converted {len(results)} file(s), {total} B in {wall:.3f}s ({mbps(total, wall):.2f} MB/s wall)")
 
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Convert toki pona text into sitelen emoji tokens using a frozen profile.")
-    ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE, help="Profile JSON (default: frozen v1)")
-    ap.add_argument("--in", dest="inp", type=Path, required=True, help="Input .txt/.md file in toki pona")
-    ap.add_argument("--out", dest="outp", type=Path, required=True, help="Output file (sitelen emoji tokens)")
+    ap.add_argument(
+        "--profile",
+        type=Path,
+        action="append",
+        default=None,
+        help="Profile JSON (default: frozen v1); repeat to layer overlays on top of it, later ones win",
+    )
+    ap.add_argument("--in", dest="inp", type=Path, required=True, help="Input .txt/.md file in toki pona ('-' for stdin), or a directory/glob for batch mode")
+    ap.add_argument("--out", dest="outp", type=Path, required=True, help="Output file (sitelen emoji tokens, '-' for stdout), or a directory in batch mode")
     ap.add_argument("--no-dot", action="store_true", help="Do not convert '.' to _punct_period emoji")
     ap.add_argument("--no-colon", action="store_true", help="Do not convert ':' to _punct_colon emoji")
+    ap.add_argument("--cache", type=Path, default=None, help="Build cache file: reuse unchanged chunks from the last run")
+    ap.add_argument(
+        "--profile-cache",
+        type=Path,
+        default=DEFAULT_STACK_CACHE_DIR,
+        help="Directory for compiled overlay stacks (default: .cache/profiles)",
+    )
+    ap.add_argument(
+        "--pattern", default="*.txt", help="Batch mode: files to pick when --in is a directory (default: *.txt)"
+    )
+    ap.add_argument("--jobs", type=int, default=0, help="Batch mode: worker processes (0=CPU count)")
+    ap.add_argument(
+        "--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES, help="Batch mode: split files larger than this"
+    )
+    add_arguments(ap)
     args = ap.parse_args()
+    args.profile = args.profile or [DEFAULT_PROFILE]
 
-    profile = load_profile(args.profile)
+    with instrumented("convert_tp_text", args.stats, args.profile_out) as stats:
+        return run(args, stats)
 
-    src = args.inp.read_text(encoding="utf-8")
-    lines = src.splitlines()
 
-    out_lines: list[str] = []
-    for line in lines:
-        out_lines.append(
-            convert_line(
-                line,
-                profile,
+def run(args: argparse.Namespace, stats: AnyStats) -> int:
+    # Batch mode: --in is a directory or a glob, --out is the output directory.
+    # An existing file is always taken as-is, even if its name looks like a glob (chapter[1].txt).
+    inp = str(args.inp)
+    if args.inp.is_dir() or (inp != "-" and glob.has_magic(inp) and not args.inp.is_file()):
+        jobs = collect_batch(inp, args.outp, args.pattern)
+        if not jobs:
+            print(f"No input files matched: {inp}")
+            return 1
+        if len(args.profile) > 1:
+            load_profile_stack(args.profile, args.profile_cache)  # compile the stack once; workers map the cached file
+        t0 = time.perf_counter()
+        with stats.phase("batch"):
+            results = convert_batch(
+                jobs,
+                args.profile,
+                workers=args.jobs or os.cpu_count(),
+                chunk_bytes=args.chunk_bytes,
                 convert_dot=not args.no_dot,
                 convert_colon=not args.no_colon,
+                profile_cache=args.profile_cache,
             )
+        print_batch_summary(results, time.perf_counter() - t0)
+        stats.update(
+            {
+                "files": len(results),
+                "chunks": sum(r.chunks for r in results),
+                "bytes_read": sum(r.bytes_in for r in results),
+                "bytes_written": sum(r.bytes_out for r in results),
+            }
         )
+        return 0
+
+    with stats.phase("load_profile"):
+        profile = load_profile_stack(args.profile, args.profile_cache)
+    convert_dot, convert_colon = not args.no_dot, not args.no_colon
+    cache = None
+    if args.cache:
+        from tools.build_cache import BuildCache
+
+        cache = BuildCache(args.cache, cache_context(profile, convert_dot, convert_colon))
 
-    # Preserve trailing newline if present
-    out_text = "\n".join(out_lines)
-    if src.endswith("\n"):
-        out_text += "\n"
+    with stats.phase("convert"), open_text(args.inp, "r") as src, open_text(args.outp, "w") as dst:
+        chunks = iter_converted_lines(src, profile, convert_dot, convert_colon, cache)
+        dst.writelines(stats.counting(chunks))
+    stats.update({"tokens": profile.hits + profile.misses, "resolve_hits": profile.hits, "resolve_misses": profile.misses})
 
-    args.outp.parent.mkdir(parents=True, exist_ok=True)
-    args.outp.write_text(out_text, encoding="utf-8")
+    if cache is not None:
+        with stats.phase("cache_save"):
+            cache.save()
+        stats.update({"cache_hits": cache.hits, "cache_misses": cache.misses})
+        if str(args.outp) != "-":
+            print(f"Cache: {cache.hits} chunk(s) reused, {cache.misses} converted")
 
     return 0
 
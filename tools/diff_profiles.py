@@ -2,16 +2,17 @@
 from __future__ import annotations
 
 import argparse
+import json
 from pathlib import Path
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 
 import sys
-from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
 
-from tools.profile import load_profile
+from tools.profile import Profile, load_profile
+from tools.twemoji import to_twemoji_slug
 DEFAULT_OLD = ROOT / "profiles" / "default-stable.v1.json"
 DEFAULT_NEW = ROOT / "dist" / "default-stable.json"
 
@@ -31,12 +32,207 @@ def diff_entries(old: Dict[str, str], new: Dict[str, str]) -> Tuple[List[str], L
     return added, removed, changed
 
 
+def merged_index(entries: List[Dict[str, str]]) -> Dict[str, List[Optional[str]]]:
+    """key -> [value in profile 0, value in profile 1, ...] (None where absent), in one pass over all entries."""
+    n = len(entries)
+    index: Dict[str, List[Optional[str]]] = {}
+    for i, e in enumerate(entries):
+        for k, v in e.items():
+            row = index.get(k)
+            if row is None:
+                row = index[k] = [None] * n
+            row[i] = v
+    return index
+
+
+def _pattern(row: List[Optional[str]]) -> Tuple[int, ...]:
+    # Value classes per profile: -1 = absent, otherwise the first profile index with the same value
+    first: Dict[str, int] = {}
+    return tuple(-1 if v is None else first.setdefault(v, i) for i, v in enumerate(row))
+
+
+def change_matrix(index: Dict[str, List[Optional[str]]], n: int) -> Dict[str, List[List[int]]]:
+    """
+    Counts of added/removed/changed keys for every ordered pair (i -> j).
+
+    Keys are grouped by their value pattern across profiles first; only
+    distinct patterns (few, since most keys never change) are expanded into
+    the N x N matrix, so the cost follows the entry count, not pairs x entries.
+    """
+    patterns: Dict[Tuple[int, ...], int] = {}
+    for row in index.values():
+        p = _pattern(row)
+        patterns[p] = patterns.get(p, 0) + 1
+
+    added = [[0] * n for _ in range(n)]
+    removed = [[0] * n for _ in range(n)]
+    changed = [[0] * n for _ in range(n)]
+    for p, count in patterns.items():
+        if len(set(p)) == 1:
+            continue  # same value (or absent) everywhere
+        for i in range(n):
+            for j in range(n):
+                a, b = p[i], p[j]
+                if a == b:
+                    continue
+                if a == -1:
+                    added[i][j] += count
+                elif b == -1:
+                    removed[i][j] += count
+                else:
+                    changed[i][j] += count
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def glyph_index(profiles: List[Profile], labels: List[str]) -> List[dict]:
+    """Emoji shared by several words, with the profiles where that group occurs."""
+    groups: Dict[Tuple[str, Tuple[str, ...]], List[str]] = {}
+    for p, label in zip(profiles, labels):
+        by_glyph: Dict[str, List[str]] = {}
+        for w, e in p.entries.items():
+            by_glyph.setdefault(e, []).append(w)
+        for e, words in by_glyph.items():
+            if len(words) > 1:
+                groups.setdefault((e, tuple(sorted(words))), []).append(label)
+    return [
+        {"glyph": e, "slug": to_twemoji_slug(e), "words": list(words), "profiles": where}
+        for (e, words), where in sorted(groups.items())
+    ]
+
+
+def diff_many(profiles: List[Profile], labels: List[str]) -> dict:
+    """
+    Diff N profiles in one pass: consecutive steps (added/removed/changed
+    keys, alias changes, emoji whose Twemoji slug changed and the slugs that
+    need new assets), the full change-count matrix and the shared-glyph index.
+    """
+    entries = [p.entries for p in profiles]
+    index = merged_index(entries)
+    slugs: Dict[str, str] = {}
+
+    def slug(e: str) -> str:
+        s = slugs.get(e)
+        if s is None:
+            s = slugs[e] = to_twemoji_slug(e)
+        return s
+
+    steps = []
+    for i in range(len(profiles) - 1):
+        added, removed, changed = [], [], []
+        for k, row in index.items():
+            a, b = row[i], row[i + 1]
+            if a == b:
+                continue
+            if a is None:
+                added.append(k)
+            elif b is None:
+                removed.append(k)
+            else:
+                changed.append((k, a, b))
+        added.sort()
+        removed.sort()
+        changed.sort()
+        a_added, a_removed, a_changed = diff_entries(profiles[i].aliases, profiles[i + 1].aliases)
+        old_slugs = {slug(e) for e in entries[i].values()}
+        steps.append(
+            {
+                "from": labels[i],
+                "to": labels[i + 1],
+                "added": {k: entries[i + 1][k] for k in added},
+                "removed": {k: entries[i][k] for k in removed},
+                "changed": [
+                    {"key": k, "from": a, "to": b, "from_slug": slug(a), "to_slug": slug(b), "slug_changed": slug(a) != slug(b)}
+                    for k, a, b in changed
+                ],
+                "aliases": {
+                    "added": a_added,
+                    "removed": a_removed,
+                    "changed": [list(c) for c in a_changed],
+                },
+                "new_slugs": sorted({slug(e) for e in entries[i + 1].values()} - old_slugs),
+            }
+        )
+
+    return {
+        "profiles": [
+            {"label": label, "name": p.name, "version": p.version, "entries": len(p.entries)}
+            for p, label in zip(profiles, labels)
+        ],
+        "keys": len(index),
+        "steps": steps,
+        "matrix": change_matrix(index, len(profiles)),
+        "shared_glyphs": glyph_index(profiles, labels),
+    }
+
+
+def print_many(report: dict) -> None:
+    labels = [p["label"] for p in report["profiles"]]
+    for i, p in enumerate(report["profiles"]):
+        print(f"[{i}] {p['label']}  ({p['name']} {p['version']}, {p['entries']} entries)")
+    print()
+
+    for step in report["steps"]:
+        print(f"## {step['from']} -> {step['to']}")
+        print(f"added {len(step['added'])}, removed {len(step['removed'])}, changed {len(step['changed'])}")
+        for k, v in step["added"].items():
+            print(f"+ {k}\t{v}")
+        for k, v in step["removed"].items():
+            print(f"- {k}\t{v}")
+        for c in step["changed"]:
+            note = f"\t(slug {c['from_slug']} -> {c['to_slug']})" if c["slug_changed"] else ""
+            print(f"* {c['key']}\t{c['from']}\t=>\t{c['to']}{note}")
+        al = step["aliases"]
+        if any(al.values()):
+            print(f"aliases: added {len(al['added'])}, removed {len(al['removed'])}, changed {len(al['changed'])}")
+            for k in al["added"]:
+                print(f"+ alias {k}")
+            for k in al["removed"]:
+                print(f"- alias {k}")
+            for k, a, b in al["changed"]:
+                print(f"* alias {k}\t{a}\t=>\t{b}")
+        if step["new_slugs"]:
+            print(f"new assets needed: {', '.join(step['new_slugs'])}")
+        print()
+
+    print("## Change matrix (added/removed/changed, row -> column)")
+    m = report["matrix"]
+    print("\t" + "\t".join(f"[{j}]" for j in range(len(labels))))
+    for i in range(len(labels)):
+        cells = [f"{m['added'][i][j]}/{m['removed'][i][j]}/{m['changed'][i][j]}" for j in range(len(labels))]
+        print(f"[{i}]\t" + "\t".join(cells))
+    print()
+
+    if report["shared_glyphs"]:
+        print("## Shared glyphs")
+        for g in report["shared_glyphs"]:
+            print(f"{g['glyph']}\t{', '.join(g['words'])}\t({len(g['profiles'])} profile(s))")
+
+
 def main() -> int:
-    ap = argparse.ArgumentParser(description="Diff two sitelen-emoji-truth profiles")
+    ap = argparse.ArgumentParser(description="Diff sitelen-emoji-truth profiles")
+    ap.add_argument("profiles", nargs="*", type=Path, help="Two or more profile JSONs, oldest first (multi-profile diff)")
     ap.add_argument("--old", type=Path, default=DEFAULT_OLD, help="Old (frozen) profile JSON")
     ap.add_argument("--new", type=Path, default=DEFAULT_NEW, help="New (built) profile JSON")
+    ap.add_argument("--json", nargs="?", const="-", default=None, metavar="PATH", help="Write the diff as JSON (stdout, or PATH)")
     args = ap.parse_args()
 
+    if len(args.profiles) == 1:
+        ap.error("give at least two profiles (or use --old/--new)")
+
+    if args.profiles or args.json is not None:
+        paths = args.profiles or [args.old, args.new]
+        report = diff_many([load_profile(p) for p in paths], [str(p) for p in paths])
+        if args.json == "-":
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            if args.json is not None:
+                Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+            print_many(report)
+        differs = any(
+            s["added"] or s["removed"] or s["changed"] or any(s["aliases"].values()) for s in report["steps"]
+        )
+        return 1 if differs else 0
+
     old_p = load_profile(args.old)
     new_p = load_profile(args.new)
 
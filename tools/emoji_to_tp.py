@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from tools.convert_tp_text import LEADING_PUNCT, TRAILING_PUNCT, open_text
+from tools.profile import MappedProfile, Profile, is_binary_profile, load_profile, resolve
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+# Which word wins when several map to the same glyph (ali/ale -> ♾️):
+#   canonical - a word that is not an alias (ale)
+#   alias     - the alias form (ali)
+# Ties inside the preferred group go to the alphabetically first word.
+POLICIES = ("canonical", "alias")
+
+# Service entries that decode back to punctuation
+PUNCT_KEYS = {"_punct_period": ".", "_punct_colon": ":"}
+
+VS15, VS16 = "\ufe0e", "\ufe0f"
+ZWJ = "\u200d"
+KEYCAP = "\u20e3"
+
+# Trie node: {codepoint char: child node}; the decoded word sits under _WORD
+_WORD = ""
+
+# Spacing when joining decoded tokens (the converter puts a space between
+# every punctuation char and word): openers stick to the next token,
+# closers to the previous one, straight quotes alternate.
+OPENERS = frozenset(set(LEADING_PUNCT) - set(TRAILING_PUNCT)) | {"“", "‘"}
+CLOSERS = frozenset(set(TRAILING_PUNCT) - set(LEADING_PUNCT)) | {"”", "’"}
+TOGGLES = frozenset({'"', "'"})
+
+
+def _is_extender(ch: str) -> bool:
+    """Chars that continue the emoji before them (so a shorter match would split a glyph)."""
+    cp = ord(ch)
+    return (
+        ch == ZWJ
+        or ch == KEYCAP
+        or 0x1F3FB <= cp <= 0x1F3FF  # skin tones
+        or 0xE0020 <= cp <= 0xE007F  # tag sequences (subdivision flags)
+    )
+
+
+def _is_regional(ch: str) -> bool:
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+
+def pick_words(profile: Profile, policy: str = "canonical", prefer: Iterable[str] = ()) -> dict[str, str]:
+    """glyph (without variation selectors) -> decoded word, by policy."""
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy: {policy!r} (expected one of {', '.join(POLICIES)})")
+    candidates: dict[str, list[str]] = {}
+    for w in sorted(set(profile.entries) | set(profile.aliases)):
+        e = resolve(w, profile)
+        if not e or (w.startswith("_") and w not in PUNCT_KEYS):
+            continue
+        candidates.setdefault(e.replace(VS15, "").replace(VS16, ""), []).append(w)
+
+    preferred = set(prefer)
+    out: dict[str, str] = {}
+    for glyph, words in candidates.items():
+        def rank(w: str) -> tuple[bool, bool, str]:
+            is_alias = w in profile.aliases
+            return (w not in preferred, is_alias if policy == "canonical" else not is_alias, w)
+
+        best = min(words, key=rank)
+        out[glyph] = PUNCT_KEYS.get(best, best)
+    return out
+
+
+class EmojiDecoder:
+    """
+    Sitelen emoji -> toki pona, the inverse of convert_tp_text.
+
+    Glyphs are matched longest-first on a codepoint trie built from the
+    profile. Variation selectors are ignored on both sides; a match that would
+    end inside a larger sequence (ZWJ, skin tone, keycap, tags, the second half
+    of a flag) is not taken and the whole sequence is kept as-is. Each position
+    is visited a bounded number of times (trie depth), so decoding is linear.
+    """
+
+    def __init__(
+        self,
+        profile: Profile,
+        policy: str = "canonical",
+        prefer: Iterable[str] = (),
+        convert_dot: bool = True,
+        convert_colon: bool = True,
+    ) -> None:
+        words = pick_words(profile, policy, prefer)
+        keep = {".": convert_dot, ":": convert_colon}
+        self.words = {g: w for g, w in words.items() if keep.get(w, True)}
+        self.trie: dict = {}
+        for glyph, word in self.words.items():
+            node = self.trie
+            for ch in glyph:
+                node = node.setdefault(ch, {})
+            node[_WORD] = word
+        self._ascii_glyphs = any(g.isascii() for g in self.words)
+
+    def _cluster_end(self, s: str, i: int) -> int:
+        """End of the emoji sequence starting at s[i] (kept verbatim when unknown)."""
+        n = len(s)
+        j = i + 2 if _is_regional(s[i]) and i + 1 < n and _is_regional(s[i + 1]) else i + 1
+        while j < n:
+            ch = s[j]
+            if ch == VS15 or ch == VS16 or (ch != ZWJ and _is_extender(ch)):
+                j += 1
+            elif ch == ZWJ:
+                j += 2 if j + 1 < n else 1
+            else:
+                break
+        return j
+
+    def split(self, chunk: str) -> list[str]:
+        """Decode one whitespace-free chunk into tokens (decoded words and literal runs)."""
+        word = self.words.get(chunk)
+        if word is None and not chunk.isascii():
+            word = self.words.get(chunk.replace(VS16, "").replace(VS15, ""))
+        if word is not None:
+            return [word]
+        if chunk.isascii() and not self._ascii_glyphs:
+            return [chunk]
+
+        trie = self.trie
+        out: list[str] = []
+        literal_start = 0
+        i, n = 0, len(chunk)
+        while i < n:
+            node = trie.get(chunk[i])
+            if node is None:
+                i = self._cluster_end(chunk, i) if not chunk[i].isascii() else i + 1
+                continue
+            # longest match from i; variation selectors in the input are skipped
+            match, match_end = None, i
+            j = i + 1
+            while True:
+                while j < n and (chunk[j] == VS16 or chunk[j] == VS15):
+                    j += 1
+                if _WORD in node:
+                    match, match_end = node[_WORD], j
+                if j >= n:
+                    break
+                nxt = node.get(chunk[j])
+                if nxt is None:
+                    break
+                node = nxt
+                j += 1
+            if match is not None and (match_end >= n or not _is_extender(chunk[match_end])):
+                if literal_start < i:
+                    out.append(chunk[literal_start:i])
+                out.append(match)
+                i = literal_start = match_end
+            else:
+                i = self._cluster_end(chunk, i) if not chunk[i].isascii() else i + 1
+        if literal_start < n:
+            out.append(chunk[literal_start:])
+        return out
+
+    def tokens(self, line: str) -> list[str]:
+        out: list[str] = []
+        for chunk in line.split():
+            out.extend(self.split(chunk))
+        return out
+
+    def __call__(self, line: str) -> str:
+        parts: list[str] = []
+        glue = False  # previous token was an opener
+        open_quotes: set[str] = set()
+        for tok in self.tokens(line):
+            if tok in TOGGLES:
+                closing = tok in open_quotes
+                open_quotes ^= {tok}
+            else:
+                closing = tok in CLOSERS
+            if parts and not glue and not closing:
+                parts.append(" ")
+            parts.append(tok)
+            glue = tok in OPENERS or (tok in TOGGLES and not closing)
+        return "".join(parts)
+
+
+def iter_decoded_lines(src: Iterable[str], decoder: EmojiDecoder) -> Iterator[str]:
+    """Decode src line by line, keeping line endings."""
+    for raw in src:
+        line = raw.rstrip("\r\n")
+        yield decoder(line) + raw[len(line) :]
+
+
+def load_decoding_profile(path: Path) -> Profile:
+    """
+    JSON or binary profile. The binary format keeps only the alias-folded
+    table, so every word in it counts as canonical (ties go alphabetically).
+    """
+    if is_binary_profile(path):
+        with MappedProfile(path) as mp:
+            return Profile(mp.name, mp.version, {}, dict(mp.items()))
+    return load_profile(path)
+
+
+def decode_stream(src: Iterable[str], dst: TextIO, decoder: EmojiDecoder) -> None:
+    dst.writelines(iter_decoded_lines(src, decoder))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Convert sitelen emoji text back into toki pona using a frozen profile.")
+    ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE, help="Profile JSON or .bin (default: frozen v1)")
+    ap.add_argument("--in", dest="inp", type=Path, required=True, help="Input file in sitelen emoji ('-' for stdin)")
+    ap.add_argument("--out", dest="outp", type=Path, required=True, help="Output file in toki pona ('-' for stdout)")
+    ap.add_argument(
+        "--policy",
+        choices=POLICIES,
+        default="canonical",
+        help="Word to emit when several share a glyph, e.g. ale vs ali (default: canonical)",
+    )
+    ap.add_argument("--prefer", action="append", default=[], metavar="WORD", help="Always emit WORD for its glyph (repeatable)")
+    ap.add_argument("--no-dot", action="store_true", help="Keep _punct_period emoji as-is")
+    ap.add_argument("--no-colon", action="store_true", help="Keep _punct_colon emoji as-is")
+    args = ap.parse_args()
+
+    try:
+        profile = load_decoding_profile(args.profile)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot load profile {args.profile}: {e}")
+        return 2
+    if args.policy == "alias" and is_binary_profile(args.profile):
+        ap.error("--policy alias needs the JSON profile (a binary one has no alias map)")
+    decoder = EmojiDecoder(profile, args.policy, args.prefer, not args.no_dot, not args.no_colon)
+    with open_text(args.inp, "r") as src, open_text(args.outp, "w") as dst:
+        decode_stream(src, dst, decoder)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
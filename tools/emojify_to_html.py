@@ -3,11 +3,23 @@ from __future__ import annotations
 
 import argparse
 import html
+import os
 import shutil
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-from tools.profile import load_profile, resolve
-from tools.twemoji import to_twemoji_slug, is_probably_emoji_token
+from tools.convert_tp_text import LineConverter
+from tools.instrument import AnyStats, add_arguments, instrumented
+from tools.profile import DEFAULT_STACK_CACHE_DIR, LookupProfile, load_profile_stack
+from tools.sprite import CSS_NAME, css_class, write_inline_assets
+from tools.twemoji import SlugIndex
+
+# Only needed with --store / --cache (imported in run())
+if TYPE_CHECKING:
+    from tools.asset_store import AssetStore
+    from tools.build_cache import BuildCache
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
@@ -16,86 +28,521 @@ DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
 DEFAULT_TWEMOJI_VERSION = "17.0.0"
 DEFAULT_ASSETS_DIR = ROOT / "assets" / "twemoji" / DEFAULT_TWEMOJI_VERSION / "72x72"
 
+BASE_CSS = """  body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; font-size: 20px; line-height: 1.6; padding: 24px; }
+  .emoji { width: 1.15em; height: 1.15em; vertical-align: -0.15em; }
+  .line { margin: 0.25em 0; }
+  .note { margin-top: 1.5em; font-size: 14px; opacity: 0.8; }
+"""
+
+# Paginated output: shared style.css for every page
+PAGE_CSS = BASE_CSS + """  .pager { font-size: 14px; margin: 0.5em 0; }
+  .pager a { margin-right: 1em; }
+  .toc li { margin: 0.25em 0; }
+"""
+STYLE_NAME = "style.css"
+
+NOTE_HTML = """<div class="note">
+Rendered with Twemoji PNG assets. Ensure proper attribution for Twemoji (CC BY 4.0) in your published work.
+</div>"""
+
 HTML_TEMPLATE = """<!doctype html>
 <html>
 <head>
 <meta charset="utf-8" />
-<title>sitelen emoji visual export</title>
-<style>
-  body {{ font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; font-size: 20px; line-height: 1.6; padding: 24px; }}
-  .emoji {{ width: 1.15em; height: 1.15em; vertical-align: -0.15em; }}
-  .line {{ margin: 0.25em 0; }}
-  .note {{ margin-top: 1.5em; font-size: 14px; opacity: 0.8; }}
-</style>
+<title>{title}</title>
+{style}{head}
 </head>
 <body>
 {body}
-<div class="note">
-Rendered with Twemoji PNG assets. Ensure proper attribution for Twemoji (CC BY 4.0) in your published work.
-</div>
+{note}
 </body>
 </html>
 """
 
+DEFAULT_TITLE = "sitelen emoji visual export"
+
+# Split point for writing the template around a streamed body
+_BODY_MARK = "\x00body\x00"
+
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
-def copy_asset(slug: str, src_assets: Path, dst_img: Path) -> Path:
-    src = src_assets / f"{slug}.png"
-    if not src.exists():
-        raise FileNotFoundError(f"Missing asset: {src}")
-    dst = dst_img / f"{slug}.png"
-    if not dst.exists():
-        shutil.copy2(src, dst)
-    return dst
+ASSET_MODES = ("copy", "hardlink", "symlink", "reflink")
+
+# Linux FICLONE ioctl: the copy shares the source's blocks (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+def reflink(src: Path, dst: Path) -> None:
+    import fcntl  # POSIX only; ImportError falls back to copying
+
+    try:
+        with src.open("rb") as s, dst.open("wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+    except BaseException:
+        dst.unlink(missing_ok=True)
+        raise
+
+def place_asset(src: Path, dst: Path, mode: str = "copy") -> str:
+    """Create dst from src with the given mode, falling back to a copy. Returns the mode used."""
+    if mode not in ASSET_MODES:
+        raise ValueError(f"Unknown asset mode: {mode}")
+    try:
+        if mode == "hardlink":
+            os.link(src, dst)
+            return mode
+        if mode == "symlink":
+            os.symlink(src.resolve(), dst)
+            return mode
+        if mode == "reflink":
+            reflink(src, dst)
+            return mode
+    except (OSError, ImportError):
+        # cross-device link, no link/clone support on this filesystem, ...
+        pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+class AssetMaterializer:
+    """
+    Puts the PNG for each used slug into the output img/ folder.
+
+    Each slug is looked up, stat'ed and materialized at most once per run;
+    later tokens with the same slug only hit the memo. With dst_img=None
+    nothing is written; the found PNGs are collected in `sources` (for the
+    sprite / data URI image modes).
+    """
+
+    def __init__(
+        self,
+        src_assets: Path,
+        dst_img: Path | None,
+        mode: str = "copy",
+        store: AssetStore | None = None,
+        version: str = DEFAULT_TWEMOJI_VERSION,
+    ) -> None:
+        self.src_assets = src_assets
+        self.dst_img = dst_img
+        self.mode = mode
+        self.store = store
+        self.version = version
+        self.counts: Counter[str] = Counter()
+        # slug -> source PNG, filled instead of copying when dst_img is None
+        self.sources: dict[str, Path] = {}
+        self._seen: dict[str, bool] = {}
+
+    def source(self, slug: str) -> Path | None:
+        # With a store, the PNG is looked up through its manifest instead of src_assets
+        if self.store is not None:
+            return self.store.path_for(self.version, slug)
+        return self.src_assets / f"{slug}.png"
+
+    def __call__(self, slug: str) -> bool:
+        """Materialize slug.png if needed; False if the asset is missing."""
+        ok = self._seen.get(slug)
+        if ok is None:
+            ok = self._seen[slug] = self._materialize(slug)
+        return ok
+
+    @property
+    def used(self) -> list[str]:
+        return sorted(slug for slug, ok in self._seen.items() if ok)
+
+    def _materialize(self, slug: str) -> bool:
+        src = self.source(slug)
+        if src is None or not src.exists():
+            self.counts["missing"] += 1
+            return False
+        if self.dst_img is None:
+            # inline image modes: only remember where the PNG is
+            self.sources[slug] = src
+            self.counts["inline"] += 1
+            return True
+        dst = self.dst_img / f"{slug}.png"
+        if dst.exists():
+            self.counts["existing"] += 1
+        else:
+            if dst.is_symlink():  # dangling link from an earlier run
+                dst.unlink()
+            self.counts[place_asset(src, dst, self.mode)] += 1
+        return True
+
+IMAGE_MODES = ("files", "sprite", "datauri")
+
+def emoji_html(token: str, slug: str, image_mode: str = "files") -> str:
+    if image_mode == "files":
+        return f'<img class="emoji" alt="{html.escape(token)}" src="img/{slug}.png"/>'
+    return f'<span class="emoji {css_class(slug)}" role="img" aria-label="{html.escape(token)}"></span>'
+
+@lru_cache(maxsize=16)
+def slug_index(profile: LookupProfile) -> SlugIndex:
+    return SlugIndex(profile.values())
+
+def render_line(
+    raw_line: str,
+    profile: LookupProfile,
+    assets: AssetMaterializer,
+    image_mode: str = "files",
+    slugs: set[str] | None = None,
+) -> str:
+    """Render one input line; slugs (if given) collects every emoji slug looked up."""
+    emoji_slug = slug_index(profile).emoji_slug
+    tokens = [t for t in raw_line.split(" ") if t != ""]
+    rendered = []
+    for t, maybe in zip(tokens, profile.resolve_many(tokens)):
+        # если это слово toki pona — резолвим в emoji
+        if maybe:
+            t = maybe
+
+        slug = emoji_slug(t)
+        if slug is not None:
+            if slugs is not None:
+                slugs.add(slug)
+            if assets(slug):
+                rendered.append(emoji_html(t, slug, image_mode))
+            else:
+                # если PNG не нашли — оставим символ как fallback
+                rendered.append(html.escape(t))
+        else:
+            rendered.append(html.escape(t))
+
+    return f'<div class="line">{" ".join(rendered)}</div>'
+
+class TpLineRenderer:
+    """
+    Fused toki pona -> HTML: renders a line of toki pona directly, with the
+    same output as convert_tp_text followed by render_line().
+
+    Each token is resolved once (by the converter's tokenizer) and each
+    distinct output token is slugged, checked against the assets and escaped
+    once per run; later occurrences are a single dict probe.
+    """
+
+    def __init__(self, converter: LineConverter, assets: AssetMaterializer, image_mode: str = "files") -> None:
+        self.converter = converter
+        self.assets = assets
+        self.image_mode = image_mode
+        self._emoji_slug = slug_index(converter.profile).emoji_slug
+        # output token -> (slug or None, HTML fragment)
+        self._memo: dict[str, tuple[str | None, str]] = {}
+
+    def _fragment(self, t: str) -> tuple[str | None, str]:
+        slug = self._emoji_slug(t)
+        if slug is not None and self.assets(slug):
+            return slug, emoji_html(t, slug, self.image_mode)
+        return slug, html.escape(t)
+
+    def __call__(self, raw_line: str, slugs: set[str] | None = None) -> tuple[str, str]:
+        """(converted line, rendered line); the converted text is what convert_tp_text would write."""
+        memo = self._memo
+        tokens = self.converter.tokens(raw_line)
+        rendered = []
+        for t in tokens:
+            item = memo.get(t)
+            if item is None:
+                item = memo[t] = self._fragment(t)
+            if slugs is not None and item[0] is not None:
+                slugs.add(item[0])
+            rendered.append(item[1])
+        return " ".join(tokens), f'<div class="line">{" ".join(rendered)}</div>'
+
+def cache_context(
+    profile: LookupProfile, assets: AssetMaterializer, image_mode: str, converter: LineConverter | None = None
+) -> str:
+    source = f"store:{assets.store.root}" if assets.store else f"dir:{assets.src_assets.resolve()}"
+    parts = ["emojify_to_html", profile.name, profile.version, profile.digest, assets.version, source, image_mode]
+    if converter is not None:
+        parts.append(f"tp:{converter.convert_dot}:{converter.convert_colon}")
+    return "\0".join(parts)
+
+def iter_rendered(
+    lines: Iterable[str],
+    profile: LookupProfile,
+    assets: AssetMaterializer,
+    image_mode: str = "files",
+    cache: BuildCache | None = None,
+    converter: LineConverter | None = None,
+) -> Iterator[tuple[str, str]]:
+    """
+    (raw line, rendered line) pairs. With a cache, unchanged chunks are reused;
+    their slugs still go through `assets`, so PNGs get materialized and a chunk
+    is re-rendered if any of its assets appeared or disappeared since.
+    With a converter, lines are toki pona and go through TpLineRenderer; the
+    pairs then carry the converted line in place of the raw one.
+    """
+    if converter is not None:
+        render_one = TpLineRenderer(converter, assets, image_mode)
+    else:
+        def render_one(raw: str, slugs: set[str] | None = None) -> tuple[str, str]:
+            return raw, render_line(raw, profile, assets, image_mode, slugs)
+
+    if cache is None:
+        for raw in lines:
+            yield render_one(raw)
+        return
+
+    # As in convert_tp_text: reused chunks replay their lookup counts for --stats
+    counters = converter.profile if converter is not None else profile
+    fresh = False
+
+    def render(chunk: list[str]) -> dict:
+        nonlocal fresh
+        fresh = True
+        hits, misses = counters.hits, counters.misses
+        slugs: set[str] = set()
+        out = [render_one(raw, slugs) for raw in chunk]
+        value = {
+            "lines": [rendered for _, rendered in out],
+            "images": sorted(s for s in slugs if assets(s)),
+            "missing": sorted(s for s in slugs if not assets(s)),
+            "lookups": [counters.hits - hits, counters.misses - misses],
+        }
+        if converter is not None:
+            value["text"] = [text for text, _ in out]
+        return value
+
+    def valid(value: dict) -> bool:
+        return all(assets(s) for s in value["images"]) and not any(assets(s) for s in value["missing"])
+
+    for chunk, value in cache.map_chunks(lines, render, valid):
+        if not fresh:
+            counters.hits += value["lookups"][0]
+            counters.misses += value["lookups"][1]
+        fresh = False
+        yield from zip(value.get("text", chunk), value["lines"])
+
+def iter_tokens(
+    lines: Iterable[str],
+    profile: LookupProfile,
+    assets: AssetMaterializer,
+    converter: LineConverter | None = None,
+) -> Iterator[list[tuple[str, str | None]]]:
+    """
+    The token stream behind render_line(), for non-HTML backends: per line,
+    (output token, slug) pairs where slug is set only if its PNG is available.
+    With a converter, lines are toki pona (as in TpLineRenderer).
+    """
+    emoji_slug = slug_index(profile).emoji_slug
+    memo: dict[str, str | None] = {}
+
+    def image(t: str) -> str | None:
+        slug = emoji_slug(t)
+        return slug if slug is not None and assets(slug) else None
+
+    for raw in lines:
+        if converter is not None:
+            tokens = converter.tokens(raw)
+        else:
+            tokens = [t for t in raw.split(" ") if t != ""]
+            tokens = [maybe or t for t, maybe in zip(tokens, profile.resolve_many(tokens))]
+        items = []
+        for t in tokens:
+            if t in memo:
+                items.append((t, memo[t]))
+            else:
+                items.append((t, memo.setdefault(t, image(t))))
+        yield items
+
+def iter_lines(src: Iterable[str]) -> Iterator[str]:
+    """Lines of a text stream, split like str.splitlines() on the whole text."""
+    for raw in src:
+        yield from raw.splitlines()
+
+def template_parts(title: str = DEFAULT_TITLE, head: str = "", stylesheet: str | None = None) -> tuple[str, str]:
+    """Page header and footer around the body; CSS inline, or linked when stylesheet is given."""
+    if stylesheet is None:
+        style = f"<style>\n{BASE_CSS}</style>"
+    else:
+        style = f'<link rel="stylesheet" href="{stylesheet}" />'
+    page = HTML_TEMPLATE.format(title=html.escape(title), style=style, head=head, body=_BODY_MARK, note=NOTE_HTML)
+    header, footer = page.split(_BODY_MARK)
+    return header, footer
+
+def write_html(path: Path, body_lines: Iterable[str], head: str = "") -> int:
+    """Stream one page: header, body lines joined with newlines, footer. Returns the line count."""
+    header, footer = template_parts(head=head)
+    n = 0
+    with path.open("w", encoding="utf-8") as f:
+        f.write(header)
+        for line in body_lines:
+            if n:
+                f.write("\n")
+            f.write(line)
+            n += 1
+        f.write(footer)
+    return n
+
+def page_name(number: int) -> str:
+    return f"page-{number:04d}.html"
+
+def _pager(number: int, has_next: bool) -> str:
+    links = []
+    if number > 1:
+        links.append(f'<a href="{page_name(number - 1)}">&larr; previous</a>')
+    links.append('<a href="index.html">contents</a>')
+    if has_next:
+        links.append(f'<a href="{page_name(number + 1)}">next &rarr;</a>')
+    return f'<nav class="pager">{" ".join(links)}</nav>'
+
+def write_paginated(outdir: Path, lines: Iterable[tuple[str, str]], page_lines: int, head: str = "") -> list[Path]:
+    """
+    Stream (raw line, rendered line) pairs into page-NNNN.html files of
+    page_lines lines each, plus style.css and an index.html table of contents.
+    Pages are written as they fill up, holding one page (plus one line of
+    lookahead, so both pagers know whether a next page exists); only the
+    TOC entries are kept.
+    """
+    (outdir / STYLE_NAME).write_text(PAGE_CSS, encoding="utf-8")
+
+    toc: list[tuple[int, int, int, str]] = []  # (page, first line, last line, preview)
+    pages: list[Path] = []
+    it = iter(lines)
+    nxt = next(it, None)
+    line_no = 0
+    while nxt is not None:
+        page: list[tuple[str, str]] = []
+        while nxt is not None and len(page) < page_lines:
+            page.append(nxt)
+            nxt = next(it, None)
+        number = len(pages) + 1
+        header, footer = template_parts(f"{DEFAULT_TITLE} - page {number}", head, STYLE_NAME)
+        pager = _pager(number, has_next=nxt is not None)
+        path = outdir / page_name(number)
+        with path.open("w", encoding="utf-8") as f:
+            f.write(header)
+            f.write(pager + "\n")
+            f.write("\n".join(rendered for _, rendered in page))
+            f.write("\n" + pager)
+            f.write(footer)
+        preview = next((raw.strip() for raw, _ in page if raw.strip()), "")
+        toc.append((number, line_no + 1, line_no + len(page), preview))
+        line_no += len(page)
+        pages.append(path)
+
+    items = []
+    for number, first, last, preview in toc:
+        if len(preview) > 60:
+            preview = preview[:60] + "…"
+        label = f"Page {number} (lines {first}&ndash;{last})"
+        snippet = f" &mdash; {html.escape(preview)}" if preview else ""
+        items.append(f'<li><a href="{page_name(number)}">{label}</a>{snippet}</li>')
+    body = "<h1>Contents</h1>\n<ol class=\"toc\">\n" + "\n".join(items) + "\n</ol>"
+    header, footer = template_parts(f"{DEFAULT_TITLE} - contents", head, STYLE_NAME)
+    index = outdir / "index.html"
+    index.write_text(header + body + footer, encoding="utf-8")
+    return [index] + pages
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    ap.add_argument(
+        "--profile",
+        type=Path,
+        action="append",
+        default=None,
+        help="Profile JSON (default: frozen v1); repeat to layer overlays on top of it, later ones win",
+    )
     ap.add_argument("--assets", type=Path, default=DEFAULT_ASSETS_DIR, help="Twemoji 72x72 PNG directory")
+    ap.add_argument("--store", type=Path, default=None, help="Resolve PNGs through a content-addressed asset store (see fetch_twemoji_assets --store)")
+    ap.add_argument("--twemoji-version", default=DEFAULT_TWEMOJI_VERSION, help="Twemoji version to use from --store")
+    ap.add_argument(
+        "--asset-mode",
+        choices=ASSET_MODES,
+        default="copy",
+        help="How PNGs get into img/: copy, hardlink, symlink or reflink (falls back to copy when unsupported)",
+    )
+    ap.add_argument(
+        "--image-mode",
+        choices=IMAGE_MODES,
+        default="files",
+        help="files: one img/<slug>.png per emoji; sprite: one sprite.png + emoji.css; datauri: one emoji.css with base64 PNGs",
+    )
+    ap.add_argument(
+        "--page-lines",
+        type=int,
+        default=0,
+        help="Split output into page-NNNN.html files of N lines with an index.html table of contents (0=single page)",
+    )
+    ap.add_argument("--cache", type=Path, default=None, help="Build cache file: reuse unchanged chunks from the last run")
+    ap.add_argument(
+        "--profile-cache",
+        type=Path,
+        default=DEFAULT_STACK_CACHE_DIR,
+        help="Directory for compiled overlay stacks (default: .cache/profiles)",
+    )
+    ap.add_argument(
+        "--tp",
+        action="store_true",
+        help="Input is toki pona: convert and render in one pass (same output as convert_tp_text + emojify_to_html)",
+    )
+    ap.add_argument("--no-dot", action="store_true", help="With --tp: do not convert '.' to _punct_period emoji")
+    ap.add_argument("--no-colon", action="store_true", help="With --tp: do not convert ':' to _punct_colon emoji")
     ap.add_argument("--in", dest="inp", type=Path, required=True, help="Input text file (space-separated tokens)")
     ap.add_argument("--outdir", type=Path, required=True, help="Output directory (will contain index.html and img/)")
+    add_arguments(ap)
     args = ap.parse_args()
+    args.profile = args.profile or [DEFAULT_PROFILE]
 
-    profile = load_profile(args.profile)
+    with instrumented("emojify_to_html", args.stats, args.profile_out) as stats:
+        return run(args, stats)
+
+def run(args: argparse.Namespace, stats: AnyStats) -> int:
+    with stats.phase("load_profile"):
+        profile = load_profile_stack(args.profile, args.profile_cache)
+    store = None
+    if args.store:
+        from tools.asset_store import AssetStore
+
+        store = AssetStore(args.store)
 
     outdir: Path = args.outdir
-    imgdir = outdir / "img"
-    ensure_dir(imgdir)
+    if args.image_mode == "files":
+        imgdir = outdir / "img"
+        ensure_dir(imgdir)
+        head = ""
+    else:
+        imgdir = None
+        ensure_dir(outdir)
+        head = f'\n<link rel="stylesheet" href="{CSS_NAME}" />'
 
-    text = args.inp.read_text(encoding="utf-8")
-    used_slugs: set[str] = set()
+    assets = AssetMaterializer(args.assets, imgdir, args.asset_mode, store, args.twemoji_version)
+    converter = LineConverter(profile, not args.no_dot, not args.no_colon) if args.tp else None
 
-    lines_html = []
-    for raw_line in text.splitlines():
-        tokens = [t for t in raw_line.split(" ") if t != ""]
-        rendered = []
-        for t in tokens:
-            # если это слово toki pona — резолвим в emoji
-            maybe = resolve(t, profile)
-            if maybe:
-                t = maybe
-
-            if is_probably_emoji_token(t):
-                slug = to_twemoji_slug(t)
-                try:
-                    copy_asset(slug, args.assets, imgdir)
-                    used_slugs.add(slug)
-                    rendered.append(f'<img class="emoji" alt="{html.escape(t)}" src="img/{slug}.png"/>')
-                except FileNotFoundError:
-                    # если PNG не нашли — оставим символ как fallback
-                    rendered.append(html.escape(t))
-            else:
-                rendered.append(html.escape(t))
+    cache = None
+    if args.cache:
+        from tools.build_cache import BuildCache
+
+        cache = BuildCache(args.cache, cache_context(profile, assets, args.image_mode, converter))
+
+    # PNGs are materialized while rendering, so "render" includes asset I/O
+    with stats.phase("render"), args.inp.open("r", encoding="utf-8") as src:
+        pairs = iter_rendered(iter_lines(src), profile, assets, args.image_mode, cache, converter)
+        if args.page_lines > 0:
+            written = write_paginated(outdir, pairs, args.page_lines, head)
+            print(f"Exported: {written[0]} ({len(written) - 1} pages)")
+        else:
+            written = [outdir / "index.html"]
+            write_html(written[0], (rendered for _, rendered in pairs), head)
+            print(f"Exported: {outdir / 'index.html'}")
 
-        lines_html.append(f'<div class="line">{" ".join(rendered)}</div>')
+    if cache is not None:
+        with stats.phase("cache_save"):
+            cache.save()
+        stats.update({"cache_hits": cache.hits, "cache_misses": cache.misses})
+        print(f"Cache: {cache.hits} chunk(s) reused, {cache.misses} rendered")
 
-    out_html = HTML_TEMPLATE.format(body="\n".join(lines_html))
-    ensure_dir(outdir)
-    (outdir / "index.html").write_text(out_html, encoding="utf-8")
+    if imgdir is None:
+        with stats.phase("inline_assets"):
+            inline = write_inline_assets(outdir, assets.sources, args.image_mode)
+        written += inline
+        print(f"Images inlined: {len(assets.used)} -> {', '.join(str(p) for p in inline)}")
+    else:
+        modes = ", ".join(f"{k}={v}" for k, v in sorted(assets.counts.items()))
+        print(f"Images copied: {len(assets.used)} -> {imgdir}" + (f" ({modes})" if modes else ""))
 
-    print(f"Exported: {outdir / 'index.html'}")
-    print(f"Images copied: {len(used_slugs)} -> {imgdir}")
+    if stats.enabled:
+        stats.update({"tokens": profile.hits + profile.misses, "resolve_hits": profile.hits, "resolve_misses": profile.misses})
+        stats.update({f"assets_{k}": v for k, v in assets.counts.items()})
+        stats.update({"files_written": len(written), "bytes_written": sum(p.stat().st_size for p in written)})
     return 0
 
 if __name__ == "__main__":
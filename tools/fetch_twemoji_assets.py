@@ -2,12 +2,18 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+from typing import BinaryIO, Callable, TypeVar
+from urllib.error import HTTPError
 
+from tools.asset_store import DEFAULT_STORE_DIR, AssetStore, write_atomic
+from tools.instrument import add_arguments, instrumented
+from tools.png import PNG_SIGNATURE
 from tools.twemoji import to_twemoji_slug
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -15,32 +21,38 @@ DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
 
 # Pin a specific Twemoji release for reproducible book builds
 DEFAULT_TWEMOJI_VERSION = "17.0.0"
-DEFAULT_BASE = f"https://cdn.jsdelivr.net/gh/jdecked/twemoji@{DEFAULT_TWEMOJI_VERSION}/assets/72x72"
+
+
+def base_url(version: str) -> str:
+    return f"https://cdn.jsdelivr.net/gh/jdecked/twemoji@{version}/assets/72x72"
+
+
+# The same release as one archive: a single download instead of one per emoji
+def archive_url(version: str) -> str:
+    return f"https://github.com/jdecked/twemoji/archive/refs/tags/v{version}.tar.gz"
+
+
+DEFAULT_BASE = base_url(DEFAULT_TWEMOJI_VERSION)
+DEFAULT_ARCHIVE = archive_url(DEFAULT_TWEMOJI_VERSION)
+# PNGs inside the archive: <top dir>/assets/72x72/<slug>.png
+ARCHIVE_ASSET_DIR = "assets/72x72"
+
+T = TypeVar("T")
 
 
 def load_profile(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def download(url: str, out_path: Path, timeout: float, retries: int, backoff: float) -> None:
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
+def with_retries(call: Callable[[], T], retries: int, backoff: float) -> T:
+    """call(), retried with linear backoff on any error except an HTTP error status."""
     last_exc: Exception | None = None
     for attempt in range(1, retries + 1):
         try:
-            req = Request(url, headers={"User-Agent": "sitelen-emoji-truth/0.1"})
-            with urlopen(req, timeout=timeout) as r:
-                out_path.write_bytes(r.read())
-            return
+            return call()
         except HTTPError:
             # 404/403 и прочие HTTP ошибки — не лечатся ретраями
             raise
-        except (URLError, TimeoutError) as e:
-            last_exc = e
-            if attempt < retries:
-                time.sleep(backoff * attempt)
-            else:
-                raise
         except Exception as e:
             last_exc = e
             if attempt < retries:
@@ -50,55 +62,392 @@ def download(url: str, out_path: Path, timeout: float, retries: int, backoff: fl
 
     if last_exc:
         raise last_exc
+    raise ValueError(f"retries must be >= 1, got {retries}")
+
+
+def open_url(url: str, timeout: float) -> BinaryIO:
+    from urllib.request import Request, urlopen  # ~10 ms of imports, only paid when downloading
+
+    return urlopen(Request(url, headers={"User-Agent": "sitelen-emoji-truth/0.1"}), timeout=timeout)
+
+
+def fetch_bytes(url: str, timeout: float, retries: int, backoff: float) -> bytes:
+    def fetch() -> bytes:
+        with open_url(url, timeout) as r:
+            return r.read()
+
+    return with_retries(fetch, retries, backoff)
+
+
+def download(url: str, out_path: Path, timeout: float, retries: int, backoff: float) -> int:
+    data = fetch_bytes(url, timeout, retries, backoff)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(out_path, data)
+    return len(data)
+
+
+@dataclass
+class FetchReport:
+    requested: int = 0
+    downloaded: int = 0
+    skipped: int = 0
+    bytes: int = 0
+    # (emoji, url, reason), in request order
+    missing: list[tuple[str, str, str]] = field(default_factory=list)
+
+
+def fetch_assets(
+    emojis: list[str],
+    out_dir: Path,
+    base: str = DEFAULT_BASE,
+    overwrite: bool = False,
+    timeout: float = 15.0,
+    retries: int = 3,
+    backoff: float = 0.5,
+    concurrency: int = 8,
+    progress_every: int = 25,
+    store: AssetStore | None = None,
+    version: str = DEFAULT_TWEMOJI_VERSION,
+    verify: bool = False,
+) -> FetchReport:
+    """
+    Download the Twemoji PNG for each emoji on a bounded thread pool. Each
+    request keeps its own retry/backoff; files are written atomically.
+
+    Without a store, PNGs go to out_dir/<slug>.png. With a store, they go to
+    the content-addressed store under `version` (out_dir is unused), and an
+    entry is skipped only if it verifies (hashed once per run; every time with verify).
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    report = FetchReport(requested=len(emojis))
+
+    # slug -> (index, emoji, url, out path); emoji that share a slug (♾️ / ♾) are fetched once
+    todo: dict[str, tuple[int, str, str, Path]] = {}
+    for idx, emoji in enumerate(emojis, start=1):
+        slug = to_twemoji_slug(emoji)
+        filename = f"{slug}.png"
+        out_path = out_dir / filename
+        if not overwrite:
+            present = store.verify(version, slug, deep=verify or None) if store else out_path.exists()
+            if present:
+                report.skipped += 1
+                continue
+        todo.setdefault(slug, (idx, emoji, f"{base}/{filename}", out_path))
+
+    def fetch_one(url: str, out_path: Path) -> int:
+        if store is None:
+            return download(url, out_path, timeout, retries, backoff)
+        data = fetch_bytes(url, timeout, retries, backoff)
+        store.put(version, out_path.stem, data)
+        return len(data)
+
+    missing: list[tuple[int, str, str, str]] = []
+    total = len(emojis)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(fetch_one, url, out_path): (idx, emoji, url)
+            for idx, emoji, url, out_path in todo.values()
+        }
+        for fut in as_completed(futures):
+            idx, emoji, url = futures[fut]
+            try:
+                report.bytes += fut.result()
+            except HTTPError as e:
+                missing.append((idx, emoji, url, f"HTTP {getattr(e, 'code', '?')}"))
+                continue
+            except Exception as e:
+                missing.append((idx, emoji, url, f"{type(e).__name__}: {e}"))
+                continue
+            report.downloaded += 1
+            if progress_every and report.downloaded % progress_every == 0:
+                print(
+                    f"[{report.downloaded + report.skipped + len(missing)}/{total}] "
+                    f"downloaded={report.downloaded} skipped={report.skipped} missing={len(missing)}"
+                )
+
+    if store is not None and report.downloaded:
+        store.save()
+
+    report.missing = [(emoji, url, reason) for _, emoji, url, reason in sorted(missing)]
+    return report
+
+
+class HashingReader:
+    """Read-through wrapper that hashes and counts everything read from f."""
+
+    def __init__(self, f: BinaryIO) -> None:
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+        self._head = b""  # peeked, not yet returned by read()
+
+    def _read(self, n: int) -> bytes:
+        data = self.f.read(n)
+        self.sha256.update(data)
+        self.bytes += len(data)
+        return data
+
+    def peek(self, n: int) -> bytes:
+        """The next n bytes (fewer at the end), still returned by the next read()."""
+        if len(self._head) < n:
+            self._head += self._read(n - len(self._head))
+        return self._head[:n]
+
+    def read(self, n: int = -1) -> bytes:
+        head = self._head
+        if not head:
+            return self._read(n)
+        if 0 <= n <= len(head):
+            self._head = head[n:]
+            return head[:n]
+        self._head = b""
+        return head + self._read(-1 if n < 0 else n - len(head))
+
+    def drain(self) -> None:
+        while self.read(1 << 16):
+            pass
+
+
+def _asset_slug(name: str, asset_dir: str) -> str | None:
+    """Slug for an archive member <anything>/<asset_dir>/<slug>.png, else None."""
+    parent, _, filename = name.rpartition("/")
+    if not filename.endswith(".png") or not (parent == asset_dir or parent.endswith("/" + asset_dir)):
+        return None
+    return filename[: -len(".png")]
+
+
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+def extract_archive(reader: HashingReader, wanted: set[str], asset_dir: str = ARCHIVE_ASSET_DIR) -> dict[str, bytes]:
+    """
+    slug -> PNG bytes for the wanted slugs found in the archive. The format
+    is sniffed from the first bytes, not the name. A tar (any compression)
+    is read as a stream, member by member, and only the wanted PNGs are kept
+    in memory; a zip needs random access, so a download is spooled to a
+    temporary file first (a local file is read in place). The reader is
+    drained so its hash covers the whole archive. A truncated or corrupt
+    archive raises ValueError.
+    """
+    import tarfile
+    import zipfile
+    import zlib
+
+    try:
+        return _extract(reader, reader.peek(len(ZIP_MAGIC)) == ZIP_MAGIC, wanted, asset_dir)
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, zlib.error) as e:
+        raise ValueError(f"unreadable archive: {e}") from e
+
+
+def _extract(reader: HashingReader, is_zip: bool, wanted: set[str], asset_dir: str) -> dict[str, bytes]:
+    import tarfile
+    import tempfile
+    import zipfile
+
+    found: dict[str, bytes] = {}
+    if is_zip:
+        # a local file can be read in place; only a download needs the copy
+        seekable = reader.f.seekable()
+        with nullcontext(reader.f) if seekable else tempfile.TemporaryFile() as src:
+            while True:
+                block = reader.read(1 << 16)
+                if not block:
+                    break
+                if not seekable:
+                    src.write(block)
+            with zipfile.ZipFile(src) as zf:
+                for info in zf.infolist():
+                    slug = _asset_slug(info.filename, asset_dir)
+                    if slug in wanted and slug not in found:
+                        found[slug] = zf.read(info)
+        return found
+
+    with tarfile.open(fileobj=reader, mode="r|*") as tar:
+        for member in tar:
+            slug = _asset_slug(member.name, asset_dir)
+            if member.isfile() and slug in wanted and slug not in found:
+                f = tar.extractfile(member)
+                if f is not None:
+                    found[slug] = f.read()
+    reader.drain()
+    return found
+
+
+def fetch_archive_assets(
+    emojis: list[str],
+    out_dir: Path,
+    archive: str = DEFAULT_ARCHIVE,
+    sha256: str | None = None,
+    overwrite: bool = False,
+    timeout: float = 60.0,
+    store: AssetStore | None = None,
+    version: str = DEFAULT_TWEMOJI_VERSION,
+    verify: bool = False,
+    asset_dir: str = ARCHIVE_ASSET_DIR,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> FetchReport:
+    """
+    Get the PNGs for emojis from one release archive (a URL, or a local file
+    for offline hosts) instead of one request per emoji. Only the needed
+    slugs are extracted, nothing else is unpacked. The expected slug list is
+    checked before anything is written: each slug must be in the archive and
+    be a PNG, and with sha256 the archive itself must match. A mismatch
+    raises ValueError. Output and skipping work as in fetch_assets(); a URL
+    that fails mid-download is fetched again from the start, like fetch_bytes().
+    """
+    report = FetchReport(requested=len(emojis))
+    todo: dict[str, str] = {}  # slug -> emoji
+    for emoji in emojis:
+        slug = to_twemoji_slug(emoji)
+        if not overwrite:
+            present = store.verify(version, slug, deep=verify or None) if store else (out_dir / f"{slug}.png").exists()
+            if present:
+                report.skipped += 1
+                continue
+        todo.setdefault(slug, emoji)
+    if not todo:
+        return report
+
+    if "://" in archive:
+        def fetch() -> tuple[HashingReader, dict[str, bytes]]:
+            with open_url(archive, timeout) as r:
+                reader = HashingReader(r)
+                return reader, extract_archive(reader, set(todo), asset_dir)
+
+        reader, found = with_retries(fetch, retries, backoff)
+    else:
+        with open(archive, "rb") as f:
+            reader = HashingReader(f)
+            found = extract_archive(reader, set(todo), asset_dir)
+    report.bytes = reader.bytes
+
+    digest = reader.sha256.hexdigest()
+    if sha256 and digest != sha256.lower():
+        raise ValueError(f"archive sha256 mismatch for {archive}: expected {sha256}, got {digest}")
+
+    for slug, emoji in todo.items():
+        data = found.get(slug)
+        if data is None:
+            report.missing.append((emoji, archive, "not in archive"))
+            continue
+        if not data.startswith(PNG_SIGNATURE):
+            report.missing.append((emoji, archive, "not a PNG"))
+            continue
+        if store is None:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            write_atomic(out_dir / f"{slug}.png", data)
+        else:
+            store.put(version, slug, data)
+        report.downloaded += 1
+
+    if store is not None and report.downloaded:
+        store.save()
+    return report
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
-    ap.add_argument("--out", type=Path, default=ROOT / "assets" / "twemoji" / DEFAULT_TWEMOJI_VERSION / "72x72")
-    ap.add_argument("--base", type=str, default=DEFAULT_BASE)
+    ap.add_argument("--out", type=Path, default=None, help="Output directory (default: assets/twemoji/<version>/72x72)")
+    ap.add_argument("--base", type=str, default=None, help="Asset base URL (default: the jsDelivr CDN for --version)")
     ap.add_argument("--overwrite", action="store_true")
     ap.add_argument("--timeout", type=float, default=15.0, help="Per-request timeout (seconds)")
     ap.add_argument("--retries", type=int, default=3, help="Retries for network errors/timeouts")
     ap.add_argument("--backoff", type=float, default=0.5, help="Backoff base (seconds)")
     ap.add_argument("--max", type=int, default=0, help="Limit number of unique emoji to fetch (0=all)")
     ap.add_argument("--progress-every", type=int, default=25, help="Print progress every N downloads")
+    ap.add_argument("--concurrency", type=int, default=8, help="Parallel downloads (1 = one at a time)")
+    ap.add_argument(
+        "--store",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_STORE_DIR,
+        default=None,
+        help=f"Fetch into the content-addressed store (default: {DEFAULT_STORE_DIR}) instead of --out",
+    )
+    ap.add_argument(
+        "--version",
+        default=DEFAULT_TWEMOJI_VERSION,
+        help="Twemoji release to fetch: picks the default --out, --base and --archive, and labels the store manifest",
+    )
+    ap.add_argument("--verify", action="store_true", help="With --store: re-hash every stored file, even ones already checked in this run")
+    ap.add_argument(
+        "--archive",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="URL_OR_PATH",
+        help="Extract the PNGs from one release archive (.tar.gz or .zip; URL or local file) "
+        "instead of one request per emoji (default: the GitHub release archive for --version)",
+    )
+    ap.add_argument("--archive-sha256", default=None, metavar="HEX", help="With --archive: expected sha256 of the archive")
+    add_arguments(ap)
     args = ap.parse_args()
+    # a version without its own URLs would file one release's PNGs under another's name
+    args.out = args.out or ROOT / "assets" / "twemoji" / args.version / "72x72"
+    args.base = args.base or base_url(args.version)
+    if args.archive == "":
+        args.archive = archive_url(args.version)
 
-    prof = load_profile(args.profile)
-    entries: dict[str, str] = prof.get("entries", {})
+    with instrumented("fetch_twemoji_assets", args.stats, args.profile_out) as stats:
+        with stats.phase("load_profile"):
+            prof = load_profile(args.profile)
+        entries: dict[str, str] = prof.get("entries", {})
 
-    unique = sorted(set(entries.values()))
-    if args.max and args.max > 0:
-        unique = unique[: args.max]
+        unique = sorted(set(entries.values()))
+        if args.max and args.max > 0:
+            unique = unique[: args.max]
 
-    missing: list[tuple[str, str, str]] = []
-    downloaded = 0
-    skipped = 0
-
-    total = len(unique)
-    for idx, emoji in enumerate(unique, start=1):
-        slug = to_twemoji_slug(emoji)
-        filename = f"{slug}.png"
-        url = f"{args.base}/{filename}"
-        out_path = args.out / filename
-
-        if out_path.exists() and not args.overwrite:
-            skipped += 1
-            continue
-
-        try:
-            download(url, out_path, timeout=args.timeout, retries=args.retries, backoff=args.backoff)
-            downloaded += 1
-            if downloaded % args.progress_every == 0:
-                print(f"[{idx}/{total}] downloaded={downloaded} skipped={skipped} missing={len(missing)}")
-        except HTTPError as e:
-            missing.append((emoji, url, f"HTTP {getattr(e, 'code', '?')}"))
-        except Exception as e:
-            missing.append((emoji, url, f"{type(e).__name__}: {e}"))
+        store = AssetStore(args.store) if args.store else None
+        with stats.phase("fetch"):
+            if args.archive:
+                try:
+                    report = fetch_archive_assets(
+                        unique,
+                        args.out,
+                        archive=args.archive,
+                        sha256=args.archive_sha256,
+                        overwrite=args.overwrite,
+                        timeout=args.timeout,
+                        store=store,
+                        version=args.version,
+                        verify=args.verify,
+                        retries=args.retries,
+                        backoff=args.backoff,
+                    )
+                except (OSError, ValueError) as e:
+                    print(f"Archive error: {e}")
+                    return 1
+            else:
+                report = fetch_assets(
+                    unique,
+                    args.out,
+                    base=args.base,
+                    overwrite=args.overwrite,
+                    timeout=args.timeout,
+                    retries=args.retries,
+                    backoff=args.backoff,
+                    concurrency=args.concurrency,
+                    progress_every=args.progress_every,
+                    store=store,
+                    version=args.version,
+                    verify=args.verify,
+                )
+        missing = report.missing
+        stats.update(
+            {
+                "requested": report.requested,
+                "downloaded": report.downloaded,
+                "skipped": report.skipped,
+                "missing": len(missing),
+                "bytes_downloaded": report.bytes,
+            }
+        )
 
-    print(f"Requested: {total}")
-    print(f"Downloaded: {downloaded}, skipped: {skipped}, missing: {len(missing)}")
+    print(f"Requested: {report.requested}")
+    print(f"Downloaded: {report.downloaded}, skipped: {report.skipped}, missing: {len(missing)}")
 
     if missing:
         print("\nMissing assets (first 50):")
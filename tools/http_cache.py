@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from tools.asset_store import open_atomic, write_atomic
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_HTTP_CACHE_DIR = ROOT / ".cache" / "http"
+
+USER_AGENT = "sitelen-emoji-truth/0.1"
+
+
+BLOCK_SIZE = 1 << 20
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    # the body stays on disk: read or stream it from here
+    path: Path
+    sha256: str
+    # "fetched" (200), "revalidated" (304, cached body reused) or "offline"
+    status: str
+    # bytes transferred over the network (0 unless fetched)
+    downloaded: int = 0
+
+
+class HttpCache:
+    """
+    On-disk cache for GET requests, revalidated with ETag / Last-Modified.
+
+    Each URL is stored as <root>/<sha256(url)[:32]>.body plus a .json
+    sidecar with its validators and the body's sha256. Bodies are streamed
+    to and hashed from disk, never held in memory whole.
+    """
+
+    def __init__(self, root: Path = DEFAULT_HTTP_CACHE_DIR) -> None:
+        self.root = root
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return self.root / f"{key}.body", self.root / f"{key}.json"
+
+    def cached(self, url: str) -> Optional[tuple[dict, Path]]:
+        """(meta, body path) of the stored response, if present and intact."""
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("url") != url or _file_sha256(body_path) != meta.get("sha256"):
+                return None
+        except (OSError, ValueError):
+            return None
+        return meta, body_path
+
+    def _store(self, url: str, src: BinaryIO, etag: Optional[str], last_modified: Optional[str]) -> tuple[str, int]:
+        h = hashlib.sha256()
+        size = 0
+        body_path, meta_path = self._paths(url)
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open_atomic(body_path) as f:
+            for block in iter(lambda: src.read(BLOCK_SIZE), b""):
+                h.update(block)
+                size += len(block)
+                f.write(block)
+        digest = h.hexdigest()
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": digest,
+            "fetched_at": time.time(),
+        }
+        write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+        return digest, size
+
+    def get(self, url: str, offline: bool = False, timeout: float = 30.0) -> CachedResponse:
+        """
+        Return the cached body for url. A cached copy is revalidated with a
+        conditional request; offline=True uses it without any network access
+        (and raises FileNotFoundError if there is none).
+        """
+        cached = self.cached(url)
+        if offline:
+            if cached is None:
+                raise FileNotFoundError(f"offline and no cached copy of {url} in {self.root}")
+            meta, body_path = cached
+            return CachedResponse(body_path, meta["sha256"], "offline")
+
+        headers = {"User-Agent": USER_AGENT}
+        if cached is not None:
+            meta, _ = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            with urlopen(Request(url, headers=headers), timeout=timeout) as r:
+                etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+                digest, size = self._store(url, r, etag, last_modified)
+        except HTTPError as e:
+            if e.code == 304 and cached is not None:
+                meta, body_path = cached
+                return CachedResponse(body_path, meta["sha256"], "revalidated")
+            raise
+        return CachedResponse(self._paths(url)[0], digest, "fetched", size)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from tools.convert_tp_text import convert_line
+from tools.emojify_to_html import DEFAULT_ASSETS_DIR, AssetMaterializer, render_line
+from tools.lookup_server import ProfileHolder, request_flag
+from tools.profile import LookupProfile
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
+
+# Stdlib-only HTTP/1.1 translation service (keep-alive, JSON in/out):
+#
+#   GET  /profile                                  -> {"name", "version", "digest"}
+#   GET  /resolve?w=jan&w=pona    POST {"words": [...]}  -> {"results": [...]}
+#   GET  /convert?text=...        POST {"text": ...} | {"lines": [...]}
+#   GET  /render?text=...         POST {"text": ...} | {"lines": [...]}
+#
+# /convert maps toki pona to sitelen emoji like convert_tp_text ("dot"/"colon"
+# options), /render returns the emojify_to_html line markup for toki pona
+# input ("input": "emoji" skips the conversion step). Routed responses carry
+# an ETag derived from the profile and the asset directory, and GETs honor
+# If-None-Match.
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def profile_etag(profile: LookupProfile, assets_stamp: int = 0) -> str:
+    # hex only: headers are Latin-1 and profile names (stacks: "base + house ✨") need not be
+    key = f"{profile.name}\0{profile.version}\0{profile.digest}\0{assets_stamp}".encode("utf-8")
+    return f'"{hashlib.sha256(key).hexdigest()[:32]}"'
+
+
+def _dir_stamp(path: Path) -> int:
+    # adding, removing or renaming a PNG bumps the directory mtime
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class TranslationService:
+    def __init__(self, holder: ProfileHolder, assets_dir: Path = DEFAULT_ASSETS_DIR) -> None:
+        self.holder = holder
+        self.assets_dir = assets_dir
+        self.profile = holder.get()
+        self._assets_stamp = _dir_stamp(assets_dir)
+        # Only checks which PNGs exist (dst_img=None): nothing is copied
+        self.assets = AssetMaterializer(assets_dir, None)
+
+    def refresh(self) -> str:
+        """
+        Pick up a changed profile or asset directory and return the current
+        ETag. Blocking (it may reload the profile): run it off the event loop.
+        """
+        profile = self.holder.get()
+        stamp = _dir_stamp(self.assets_dir)
+        if stamp != self._assets_stamp:
+            # the existence memo is only valid for one generation of the directory
+            self.assets = AssetMaterializer(self.assets_dir, None)
+            self._assets_stamp = stamp
+        self.profile = profile
+        return profile_etag(profile, stamp)
+
+    def route(self, method: str, target: str) -> Callable[[dict], dict]:
+        """Handler for a request, or HttpError 405 / 404."""
+        if method not in ("GET", "POST"):
+            raise HttpError(405, f"method not allowed: {method}")
+        path = urlsplit(target).path.rstrip("/") or "/"
+        handler = {
+            "/profile": self.profile_info,
+            "/resolve": self.resolve,
+            "/convert": self.convert,
+            "/render": self.render,
+        }.get(path)
+        if handler is None:
+            raise HttpError(404, f"no such endpoint: {path}")
+        return handler
+
+    def dispatch(self, method: str, target: str, body: bytes) -> dict:
+        handler = self.route(method, target)
+        url = urlsplit(target)
+        if method == "GET":
+            params: dict[str, Any] = {k: v if k in ("w", "lines") else v[-1] for k, v in parse_qs(url.query).items()}
+            if "w" in params:
+                params["words"] = params.pop("w")
+        else:
+            try:
+                params = json.loads(body or b"{}")
+            except ValueError as e:
+                raise HttpError(400, f"invalid JSON: {e}")
+            if not isinstance(params, dict):
+                raise HttpError(400, "request body must be a JSON object")
+        return handler(params)
+
+    def profile_info(self, params: dict) -> dict:
+        p = self.profile
+        return {"name": p.name, "version": p.version, "digest": p.digest}
+
+    def resolve(self, params: dict) -> dict:
+        words = params.get("words")
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            raise HttpError(400, "resolve needs 'words': [str, ...] (or ?w=...&w=...)")
+        return {"results": self.profile.resolve_many(words)}
+
+    @staticmethod
+    def _lines(params: dict) -> tuple[list[str], bool]:
+        text = params.get("text")
+        if isinstance(text, str):
+            return text.splitlines(), True
+        lines = params.get("lines")
+        if isinstance(lines, list) and all(isinstance(line, str) for line in lines):
+            return lines, False
+        raise HttpError(400, "expected 'text': str or 'lines': [str, ...]")
+
+    def convert(self, params: dict) -> dict:
+        lines, as_text = self._lines(params)
+        profile = self.profile
+        dot, colon = request_flag(params, "dot"), request_flag(params, "colon")
+        out = [convert_line(line, profile, dot, colon) for line in lines]
+        if as_text:
+            text = "\n".join(out)
+            return {"text": text + "\n" if params["text"].endswith("\n") else text}
+        return {"lines": out}
+
+    def render(self, params: dict) -> dict:
+        lines, _ = self._lines(params)
+        profile = self.profile
+        if params.get("input", "tp") != "emoji":
+            dot, colon = request_flag(params, "dot"), request_flag(params, "colon")
+            lines = [convert_line(line, profile, dot, colon) for line in lines]
+        return {"html": "\n".join(render_line(line, profile, self.assets) for line in lines)}
+
+
+def _response(status: int, body: bytes, etag: Optional[str], keep_alive: bool) -> bytes:
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    if status != 304:
+        head.append("Content-Type: application/json; charset=utf-8")
+    head.append(f"Content-Length: {len(body)}")
+    if etag:
+        head.append(f"ETag: {etag}")
+    head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def handle_connection(service: TranslationService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                raw = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                writer.write(_response(431, b'{"error": "headers too large"}', None, False))
+                return
+
+            lines = raw.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+            except ValueError:
+                writer.write(_response(400, b'{"error": "bad request line"}', None, False))
+                return
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+
+            conn = headers.get("connection", "").lower()
+            keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+            body = b""
+            status, payload = 200, None
+            if "transfer-encoding" in headers:
+                status, payload = 411, {"error": "chunked request bodies are not supported"}
+                keep_alive = False
+            else:
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    writer.write(_response(400, b'{"error": "bad Content-Length"}', None, False))
+                    return
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "request body too large"}
+                    keep_alive = False
+                elif length:
+                    try:
+                        body = await reader.readexactly(length)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        return
+
+            etag = None
+            if status == 200:
+                try:
+                    etag = await loop.run_in_executor(None, service.refresh)
+                    # unknown routes are 404 even when the ETag matches
+                    service.route(method, target)
+                    if method == "GET" and headers.get("if-none-match") == etag:
+                        status = 304
+                    else:
+                        payload = service.dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"internal error: {type(e).__name__}"}
+
+            data = b"" if status == 304 else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            writer.write(_response(status, data, etag, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(service: TranslationService, host: str, port: int) -> asyncio.base_events.Server:
+    return await asyncio.start_server(
+        lambda r, w: handle_connection(service, r, w), host, port, limit=MAX_HEADER_BYTES
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Serve profile lookups and conversions over HTTP.")
+    ap.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    ap.add_argument("--assets", type=Path, default=DEFAULT_ASSETS_DIR, help="Twemoji 72x72 PNG directory (for /render)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    service = TranslationService(ProfileHolder(args.profile), args.assets)
+
+    async def run() -> None:
+        server = await start_server(service, args.host, args.port)
+        addr = server.sockets[0].getsockname()
+        print(f"Serving {args.profile} on http://{addr[0]}:{addr[1]}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+# Phase timers and counters for the CLIs (--stats), plus an optional cProfile
+# dump (--profile-out). Nothing is timed or counted per token: tools record
+# whole phases and copy the counters they already keep (profile hits/misses,
+# asset counts, ...) once at the end. With --stats off every hook is a no-op
+# on NullStats, so the hot loops run unchanged.
+
+
+class Stats:
+    enabled = True
+
+    def __init__(self, tool: str) -> None:
+        self.tool = tool
+        self.phases: dict[str, float] = {}
+        self.counters: Counter[str] = Counter()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def update(self, counters: dict[str, int]) -> None:
+        self.counters.update(counters)
+
+    def counting(self, chunks: Iterable[str], name: str = "bytes_written") -> Iterator[str]:
+        """Pass text chunks through, adding their UTF-8 size to a counter."""
+        n = 0
+        try:
+            for chunk in chunks:
+                n += len(chunk.encode("utf-8"))
+                yield chunk
+        finally:
+            self.counters[name] += n
+
+    def report(self) -> dict:
+        return {
+            "tool": self.tool,
+            "total_seconds": round(time.perf_counter() - self._t0, 6),
+            "phases": {k: round(v, 6) for k, v in self.phases.items()},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+class NullStats:
+    """Stand-in used when --stats is off: every call is a no-op."""
+
+    enabled = False
+    tool = ""
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        yield
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def update(self, counters: dict[str, int]) -> None:
+        pass
+
+    def counting(self, chunks: Iterable[str], name: str = "bytes_written") -> Iterable[str]:
+        return chunks
+
+    def report(self) -> dict:
+        return {}
+
+
+AnyStats = Union[Stats, NullStats]
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--stats",
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="PATH",
+        help="Write a JSON report of phase timings and counters (to stderr, or to PATH)",
+    )
+    ap.add_argument("--profile-out", type=Path, default=None, metavar="PATH", help="Write a cProfile dump (pstats format)")
+
+
+def write_report(report: dict, dest: str) -> None:
+    text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if dest == "-":
+        sys.stderr.write(text)
+    else:
+        path = Path(dest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+
+@contextmanager
+def instrumented(tool: str, stats: Optional[str] = None, profile_out: Optional[Path] = None) -> Iterator[AnyStats]:
+    """
+    Run a CLI body with instrumentation: yields a Stats (NullStats when stats
+    is None), writes the report on exit, and profiles the body when
+    profile_out is set.
+    """
+    st: AnyStats = Stats(tool) if stats is not None else NullStats()
+    prof = None
+    if profile_out is not None:
+        import cProfile  # only when asked: keeps the import off the default path
+
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        yield st
+    finally:
+        if prof is not None:
+            prof.disable()
+            profile_out.parent.mkdir(parents=True, exist_ok=True)
+            prof.dump_stats(str(profile_out))
+        if stats is not None:
+            write_report(st.report(), stats)
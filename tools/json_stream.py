@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Iterator, TextIO
+
+# Incremental JSON reading for large documents: containers are walked one
+# element / member at a time over a sliding text window, and only the values
+# the caller asks for are decoded (by the C json decoder, via raw_decode).
+# Memory is bounded by the largest single value decoded, not the document.
+
+_WS = " \t\n\r"
+_NUMBER = frozenset("0123456789+-.eE")
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class JsonStream:
+    """
+    Pull parser over a text stream.
+
+        js = JsonStream(f)
+        for _ in js.items():          # top-level array
+            if js.peek() == "{":
+                obj = js.value()      # one element
+            else:
+                js.value()            # skip it
+
+    items() / members() yield once per element / member; the caller must
+    consume exactly one value each time (value(), or a nested items() /
+    members() walk).
+    """
+
+    def __init__(self, f: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # chars dropped from the front of buf (for error offsets)
+        self.offset = 0
+        self._decode = json.JSONDecoder().raw_decode
+
+    def _more(self, at_least: int = 0) -> bool:
+        if self.eof:
+            return False
+        if self.pos > self.chunk_size:
+            self.offset += self.pos
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        data = self.f.read(max(self.chunk_size, at_least))
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def _error(self, what: str) -> ValueError:
+        return ValueError(f"{what} at offset {self.offset + self.pos}")
+
+    def peek(self) -> str:
+        """Next non-whitespace char ("" at the end of input), not consumed."""
+        while True:
+            buf, pos, n = self.buf, self.pos, len(self.buf)
+            while pos < n and buf[pos] in _WS:
+                pos += 1
+            self.pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._more():
+                return ""
+
+    def take(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise self._error(f"expected {ch!r}, got {self.peek() or 'end of input'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value."""
+        c = self.peek()
+        if not c:
+            raise self._error("unexpected end of input")
+        if c in _NUMBER:
+            # raw_decode accepts a number cut at the end of the window ("1" of "1.5")
+            while True:
+                i, n = self.pos, len(self.buf)
+                while i < n and self.buf[i] in _NUMBER:
+                    i += 1
+                if i < n or not self._more():
+                    break
+        while True:
+            try:
+                obj, end = self._decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # incomplete value: read at least as much again (amortized linear)
+                if not self._more(len(self.buf) - self.pos):
+                    raise
+                continue
+            self.pos = end
+            return obj
+
+    def end(self) -> None:
+        """Check that only whitespace is left."""
+        if self.peek():
+            raise self._error("trailing data after the JSON document")
+
+    def items(self) -> Iterator[None]:
+        """Walk an array: yields before each element."""
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            c = self.peek()
+            self.pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                self.pos -= 1
+                raise self._error(f"expected ',' or ']', got {c or 'end of input'!r}")
+
+    def members(self) -> Iterator[str]:
+        """Walk an object: yields each key, positioned at its value."""
+        self.take("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error("expected an object key")
+            key = self.value()
+            self.take(":")
+            yield key
+            c = self.peek()
+            self.pos += 1
+            if c == "}":
+                return
+            if c != ",":
+                self.pos -= 1
+                raise self._error(f"expected ',' or '}}', got {c or 'end of input'!r}")
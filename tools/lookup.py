@@ -1,36 +1,96 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import io
 import sys
 from pathlib import Path
 
-from profile import load_profile, resolve
-
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from tools.profile import DEFAULT_STACK_CACHE_DIR, load_profile_stack
 DEFAULT_PROFILE = ROOT / "profiles" / "default-stable.v1.json"
 
 
+USAGE = """Usage: python tools/lookup.py <word> [<word> ...] [--profile PATH ...]
+       python tools/lookup.py -h | --help
+       python tools/lookup.py --serve [--profile PATH ...]          (JSON lines on stdin/stdout)
+       python tools/lookup.py --socket PATH [--profile PATH ...]    (JSON lines on a Unix socket)
+
+Repeat --profile to layer overlays on the base profile (later ones win).
+Compiled stacks are kept in --profile-cache DIR (default: .cache/profiles)."""
+
+
+def serve(profile_paths: list[Path], socket_path: Path | None, profile_cache: Path) -> int:
+    # imported here so plain one-shot lookups don't pay for the server modules
+    from tools.lookup_server import ProfileHolder, make_unix_server, serve_stream
+
+    holder = ProfileHolder(profile_paths, cache_dir=profile_cache)
+    if socket_path is None:
+        src = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+        dst = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+        serve_stream(src, dst, holder)
+        return 0
+
+    try:
+        server = make_unix_server(socket_path, holder)
+    except FileExistsError as e:
+        print(f"Error: {e}")
+        return 2
+    print(f"Serving {' + '.join(map(str, profile_paths))} on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+    return 0
+
+
 def main() -> int:
     if len(sys.argv) < 2:
-        print("Usage: python tools/lookup.py <word> [<word> ...] [--profile PATH]")
+        print(USAGE)
         return 2
 
     args = sys.argv[1:]
-    profile_path = DEFAULT_PROFILE
+    if "-h" in args or "--help" in args:
+        print(USAGE)
+        return 0
+    profile_paths: list[Path] = []
 
-    if "--profile" in args:
+    while "--profile" in args:
         i = args.index("--profile")
         if i == len(args) - 1:
             print("Error: --profile requires a path")
             return 2
-        profile_path = Path(args[i + 1])
+        profile_paths.append(Path(args[i + 1]))
+        del args[i : i + 2]
+    profile_paths = profile_paths or [DEFAULT_PROFILE]
+
+    profile_cache = DEFAULT_STACK_CACHE_DIR
+    if "--profile-cache" in args:
+        i = args.index("--profile-cache")
+        if i == len(args) - 1:
+            print("Error: --profile-cache requires a path")
+            return 2
+        profile_cache = Path(args[i + 1])
         del args[i : i + 2]
 
-    profile = load_profile(profile_path)
+    if "--socket" in args:
+        i = args.index("--socket")
+        if i == len(args) - 1:
+            print("Error: --socket requires a path")
+            return 2
+        return serve(profile_paths, Path(args[i + 1]), profile_cache)
+
+    if "--serve" in args:
+        return serve(profile_paths, None, profile_cache)
+
+    profile = load_profile_stack(profile_paths, profile_cache)
 
     rc = 0
-    for w in args:
-        e = resolve(w, profile)
+    for w, e in zip(args, profile.resolve_many(args)):
         if e is None:
             print(f"{w}\t<missing>")
             rc = 1
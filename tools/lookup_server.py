@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence, TextIO
+
+from tools.convert_tp_text import convert_line
+from tools.profile import LookupProfile, load_profile_stack
+
+# Long-running lookup service: one JSON request per line in, one JSON
+# response per line out, over stdin/stdout or a Unix socket.
+#
+#   {"op": "lookup", "words": ["jan", "ali"]}        -> {"results": ["👤", "♾️"]}
+#   {"op": "convert", "lines": ["jan pona."],
+#    "dot": true, "colon": true}                      -> {"lines": ["👤 👍 ➖️"]}
+#   {"op": "info"}                                    -> {"name": ..., "version": ..., "digest": ...}
+#
+# An "id" field in the request is echoed back. Errors come back as
+# {"error": "..."} and do not end the session.
+
+
+class ProfileHolder:
+    """
+    Keeps a compiled profile in memory and reloads it when the file changes
+    (mtime or size), checking at most once per `interval` seconds. A profile
+    that fails to load keeps the previous one in service. Given several
+    paths, it serves the overlay stack and reloads when any layer changes.
+    """
+
+    def __init__(self, path: Path | Sequence[Path], interval: float = 1.0, cache_dir: Optional[Path] = None) -> None:
+        self.paths = [path] if isinstance(path, Path) else list(path)
+        self.path = self.paths[0]
+        self.interval = interval
+        self.cache_dir = cache_dir
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        self._profile = load_profile_stack(self.paths, self.cache_dir)
+        self._checked = time.monotonic()
+
+    def _file_stamp(self) -> tuple[tuple[int, int], ...]:
+        return tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, self.paths))
+
+    def get(self) -> LookupProfile:
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return self._profile
+        with self._lock:
+            self._checked = now
+            try:
+                stamp = self._file_stamp()
+                if stamp != self._stamp:
+                    self._profile = load_profile_stack(self.paths, self.cache_dir)
+                    self._stamp = stamp
+                    self.reloads += 1
+            except (OSError, ValueError):
+                pass
+        return self._profile
+
+
+def request_flag(params: dict, key: str, default: bool = True) -> bool:
+    """A boolean option from JSON or a query string: "0", "false" and "no" are false."""
+    v = params.get(key, default)
+    return v.lower() not in ("0", "false", "no") if isinstance(v, str) else bool(v)
+
+
+def handle_request(req: Any, holder: ProfileHolder) -> dict:
+    if not isinstance(req, dict):
+        return {"error": "request must be a JSON object"}
+    resp: dict[str, Any] = {}
+    if "id" in req:
+        resp["id"] = req["id"]
+
+    profile = holder.get()
+    op = req.get("op", "lookup")
+    if op == "lookup":
+        words = req.get("words")
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            resp["error"] = "lookup needs 'words': [str, ...]"
+        else:
+            resp["results"] = profile.resolve_many(words)
+    elif op == "convert":
+        lines = req.get("lines")
+        if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+            resp["error"] = "convert needs 'lines': [str, ...]"
+        else:
+            dot = request_flag(req, "dot")
+            colon = request_flag(req, "colon")
+            resp["lines"] = [convert_line(line, profile, dot, colon) for line in lines]
+    elif op == "info":
+        resp.update(name=profile.name, version=profile.version, digest=profile.digest, reloads=holder.reloads)
+    else:
+        resp["error"] = f"unknown op: {op!r}"
+    return resp
+
+
+def handle_line(line: str, holder: ProfileHolder) -> str:
+    try:
+        req = json.loads(line)
+    except ValueError as e:
+        resp = {"error": f"invalid JSON: {e}"}
+    else:
+        resp = handle_request(req, holder)
+    return json.dumps(resp, ensure_ascii=False)
+
+
+def serve_stream(src: TextIO, dst: TextIO, holder: ProfileHolder) -> None:
+    for line in src:
+        if not line.strip():
+            continue
+        dst.write(handle_line(line, holder) + "\n")
+        dst.flush()
+
+
+def make_unix_server(socket_path: Path, holder: ProfileHolder) -> socketserver.ThreadingUnixStreamServer:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw in self.rfile:
+                line = raw.decode("utf-8", errors="replace")
+                if not line.strip():
+                    continue
+                self.wfile.write((handle_line(line, holder) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    # only a stale socket from an earlier run is removed, never a regular file (--socket book.txt)
+    try:
+        st = os.lstat(socket_path)
+    except FileNotFoundError:
+        pass
+    else:
+        if not stat.S_ISSOCK(st.st_mode):
+            raise FileExistsError(f"{socket_path} exists and is not a socket")
+        socket_path.unlink()
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), Handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import zlib
+from typing import BinaryIO, Iterable, Optional
+
+from tools.png import read_png
+
+# Minimal stdlib-only PDF writer: pages of Helvetica text and PNG images.
+# Objects are written to the file as soon as they are complete (each image
+# once, on first use; each page when it is finished), so memory holds one
+# page of content plus the object offsets, not the document.
+
+PAGE_SIZES = {"a4": (595.0, 842.0), "letter": (612.0, 792.0)}
+
+FONT_NAME = "F1"
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126, from the standard AFM
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_DEFAULT_WIDTH = 556
+
+
+def text_width(text: str, size: float) -> float:
+    """Width of text set in Helvetica at size points."""
+    w = 0
+    for ch in text:
+        cp = ord(ch)
+        w += _HELVETICA[cp - 32] if 32 <= cp <= 126 else _DEFAULT_WIDTH
+    return w * size / 1000
+
+
+def pdf_string(text: str) -> bytes:
+    """A literal string in WinAnsiEncoding; chars outside it become '?'."""
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _num(v: float) -> bytes:
+    return (f"{v:.2f}".rstrip("0").rstrip(".") or "0").encode("ascii")
+
+
+def png_xobject(png: bytes) -> tuple[int, int, bytes, Optional[bytes]]:
+    """(width, height, Flate RGB samples, Flate alpha samples or None if opaque) for a PNG."""
+    img = read_png(png)
+    n = img.width * img.height
+    rgba = img.rgba
+    rgb = bytearray(n * 3)
+    rgb[0::3] = rgba[0::4]
+    rgb[1::3] = rgba[1::4]
+    rgb[2::3] = rgba[2::4]
+    alpha = bytes(rgba[3::4])
+    opaque = alpha.count(255) == n
+    return img.width, img.height, zlib.compress(bytes(rgb)), None if opaque else zlib.compress(alpha)
+
+
+class PdfWriter:
+    """
+    Streams a PDF to a binary file.
+
+        with path.open("wb") as f:
+            pdf = PdfWriter(f, title="...")
+            name = pdf.image("263a", png_bytes)     # XObject written once per key
+            pdf.add_page(b"q ... /" + name + b" Do Q", {name})
+            pdf.close()
+
+    Object 1 is the catalog and object 2 the page tree, which is written
+    last (its kids are only known then).
+    """
+
+    def __init__(self, f: BinaryIO, title: str = "", page_size: tuple[float, float] = PAGE_SIZES["a4"]) -> None:
+        self.f = f
+        self.page_size = page_size
+        self.offsets: dict[int, int] = {}
+        self.pages: list[int] = []
+        # image key -> resource name ("Im1", ...)
+        self.images: dict[str, bytes] = {}
+        self._image_objs: dict[bytes, int] = {}
+        self._next = 5
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._object(4, b"<< /Producer " + pdf_string("sitelen-emoji-truth") + b" /Title " + pdf_string(title) + b" >>")
+
+    def _alloc(self) -> int:
+        n = self._next
+        self._next += 1
+        return n
+
+    def _object(self, num: int, body: bytes) -> None:
+        self.offsets[num] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    def _stream(self, num: int, data: bytes, entries: bytes = b"") -> None:
+        self._object(num, b"<< /Length %d%s >>\nstream\n" % (len(data), entries) + data + b"\nendstream")
+
+    def image(self, key: str, png: bytes) -> bytes:
+        """Resource name of the image for key, writing its XObject (and soft mask) on first use."""
+        name = self.images.get(key)
+        if name is not None:
+            return name
+        width, height, rgb, alpha = png_xobject(png)
+        smask = b""
+        if alpha is not None:
+            mask = self._alloc()
+            self._stream(
+                mask,
+                alpha,
+                b" /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray"
+                b" /BitsPerComponent 8 /Filter /FlateDecode" % (width, height),
+            )
+            smask = b" /SMask %d 0 R" % mask
+        num = self._alloc()
+        self._stream(
+            num,
+            rgb,
+            b" /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB"
+            b" /BitsPerComponent 8 /Filter /FlateDecode%s" % (width, height, smask),
+        )
+        name = self.images[key] = b"Im%d" % (len(self.images) + 1)
+        self._image_objs[name] = num
+        return name
+
+    def add_page(self, content: bytes, images: Iterable[bytes] = ()) -> None:
+        """Write one page: its content stream and the images (resource names) it draws."""
+        contents = self._alloc()
+        self._stream(contents, zlib.compress(content), b" /Filter /FlateDecode")
+        xobjects = b"".join(b"/%s %d 0 R " % (name, self._image_objs[name]) for name in sorted(set(images)))
+        resources = b"<< /Font << /%s 3 0 R >>%s >>" % (
+            FONT_NAME.encode("ascii"),
+            b" /XObject << " + xobjects + b">>" if xobjects else b"",
+        )
+        w, h = self.page_size
+        page = self._alloc()
+        self._object(
+            page,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %s %s] /Resources %s /Contents %d 0 R >>"
+            % (_num(w), _num(h), resources, contents),
+        )
+        self.pages.append(page)
+
+    def close(self) -> None:
+        """Write the page tree, cross-reference table and trailer."""
+        kids = b" ".join(b"%d 0 R" % p for p in self.pages)
+        self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        size = self._next
+        xref = self.f.tell()
+        out = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for num in range(1, size):
+            out.append(b"%010d 00000 n \n" % self.offsets[num])
+        out.append(b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+        self.f.write(b"".join(out))
+
+
+def text_op(text: str, x: float, y: float, size: float) -> bytes:
+    return b"BT /%s %s Tf %s %s Td %s Tj ET\n" % (
+        FONT_NAME.encode("ascii"), _num(size), _num(x), _num(y), pdf_string(text)
+    )
+
+
+def box_op(x: float, y: float, w: float, h: float) -> bytes:
+    """An outlined box, drawn for glyphs the font cannot show."""
+    return b"q 0.5 w %s %s %s %s re S Q\n" % (_num(x), _num(y), _num(w), _num(h))
+
+
+def encodable(text: str) -> bool:
+    """True if text can be set in the WinAnsi-encoded base font."""
+    try:
+        text.encode("cp1252")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def image_op(name: bytes, x: float, y: float, w: float, h: float) -> bytes:
+    return b"q %s 0 0 %s %s %s cm /%s Do Q\n" % (_num(w), _num(h), _num(x), _num(y), name)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from dataclasses import dataclass
+
+# Minimal stdlib-only PNG codec: enough to decode Twemoji PNGs (any
+# non-interlaced color type / bit depth) into RGBA and to write RGBA images.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# color type -> channels
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+@dataclass
+class Image:
+    width: int
+    height: int
+    # 8-bit RGBA, row-major, no padding
+    rgba: bytearray
+
+
+def iter_chunks(data: bytes):
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos : pos + 8])
+        body = data[pos + 8 : pos + 8 + length]
+        crc = data[pos + 8 + length : pos + 12 + length]
+        if len(body) != length or len(crc) != 4:
+            raise ValueError("Truncated PNG")
+        if zlib.crc32(ctype + body) != struct.unpack(">I", crc)[0]:
+            raise ValueError(f"Bad CRC in {ctype!r} chunk")
+        yield ctype, body
+        pos += 12 + length
+        if ctype == b"IEND":
+            return
+    raise ValueError("Truncated PNG (no IEND)")
+
+
+def _unfilter(raw: bytes, height: int, stride: int, bpp: int) -> bytearray:
+    out = bytearray(height * stride)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        ftype = raw[pos]
+        line = bytearray(raw[pos + 1 : pos + 1 + stride])
+        pos += 1 + stride
+        if ftype == 1:  # Sub
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i - bpp]) & 0xFF
+        elif ftype == 2:  # Up
+            for i in range(stride):
+                line[i] = (line[i] + prev[i]) & 0xFF
+        elif ftype == 3:  # Average
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif ftype == 4:  # Paeth
+            for i in range(stride):
+                a = line[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    pred = a
+                elif pb <= pc:
+                    pred = b
+                else:
+                    pred = c
+                line[i] = (line[i] + pred) & 0xFF
+        elif ftype != 0:
+            raise ValueError(f"Bad PNG filter type {ftype}")
+        out[y * stride : (y + 1) * stride] = line
+        prev = line
+    return out
+
+
+def _samples(row: bytes, count: int, depth: int) -> list[int]:
+    # Unpack `count` samples of `depth` bits (1, 2, 4, 8 or 16; 16 keeps the high byte)
+    if depth == 8:
+        return list(row[:count])
+    if depth == 16:
+        return list(row[0 : 2 * count : 2])
+    per_byte = 8 // depth
+    mask = (1 << depth) - 1
+    out = []
+    for b in row:
+        for k in range(per_byte - 1, -1, -1):
+            out.append((b >> (k * depth)) & mask)
+    return out[:count]
+
+
+def read_png(data: bytes) -> Image:
+    header = None
+    palette = b""
+    trns = b""
+    idat = []
+    for ctype, body in iter_chunks(data):
+        if ctype == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif ctype == b"PLTE":
+            palette = body
+        elif ctype == b"tRNS":
+            trns = body
+        elif ctype == b"IDAT":
+            idat.append(body)
+    if header is None:
+        raise ValueError("PNG without IHDR")
+
+    width, height, depth, ctype, _, _, interlace = header
+    if interlace:
+        raise ValueError("Interlaced PNG is not supported")
+    if ctype not in _CHANNELS:
+        raise ValueError(f"Bad PNG color type {ctype}")
+    channels = _CHANNELS[ctype]
+    stride = (width * channels * depth + 7) // 8
+    bpp = max(1, channels * depth // 8)
+    pixels = _unfilter(zlib.decompress(b"".join(idat)), height, stride, bpp)
+
+    # Single transparent color for gray / RGB images (tRNS holds 16-bit values)
+    key = None
+    if ctype in (0, 2) and trns:
+        key = tuple(v >> 8 if depth == 16 else v for v in struct.unpack(f">{len(trns) // 2}H", trns))
+
+    rgba = bytearray(width * height * 4)
+    scale = 255 // ((1 << depth) - 1) if depth < 8 else 1
+    o = 0
+    for y in range(height):
+        s = _samples(pixels[y * stride : (y + 1) * stride], width * channels, depth)
+        if ctype == 6:
+            rgba[o : o + width * 4] = bytes(s)
+            o += width * 4
+            continue
+        for x in range(width):
+            if ctype == 3:
+                i = s[x]
+                r, g, b = palette[3 * i : 3 * i + 3]
+                a = trns[i] if i < len(trns) else 255
+            elif ctype == 2:
+                r, g, b = s[3 * x : 3 * x + 3]
+                a = 0 if key == (r, g, b) else 255
+            elif ctype == 0:
+                v = s[x]
+                a = 0 if key == (v,) else 255
+                r = g = b = v * scale
+            else:  # 4: gray + alpha
+                r = g = b = s[2 * x]
+                a = s[2 * x + 1]
+            rgba[o : o + 4] = bytes((r, g, b, a))
+            o += 4
+    return Image(width, height, rgba)
+
+
+def _chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+
+def write_png(img: Image, level: int = 9) -> bytes:
+    stride = img.width * 4
+    raw = bytearray()
+    for y in range(img.height):
+        raw.append(0)  # filter: None
+        raw += img.rgba[y * stride : (y + 1) * stride]
+    ihdr = struct.pack(">IIBBBBB", img.width, img.height, 8, 6, 0, 0, 0)
+    return PNG_SIGNATURE + _chunk(b"IHDR", ihdr) + _chunk(b"IDAT", zlib.compress(bytes(raw), level)) + _chunk(b"IEND", b"")
@@ -1,17 +1,32 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import mmap
+import struct
+import sys
+import weakref
+import zlib
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping, Optional, Sequence, Union
+
+ROOT = Path(__file__).resolve().parents[1]
+# Compiled overlay stacks (see load_profile_stack), keyed by their inputs' hashes;
+# the CLIs use this by default (--profile-cache), library calls only when asked
+DEFAULT_STACK_CACHE_DIR = ROOT / ".cache" / "profiles"
+# Bump when merge_profiles() semantics change for the same inputs
+STACK_FORMAT = 1
 
 
 @dataclass(frozen=True)
 class Profile:
     name: str
     version: str
-    aliases: dict[str, str]
-    entries: dict[str, str]
+    # None only in overlay layers, where it deletes the key (see merge_profiles)
+    aliases: dict[str, Optional[str]]
+    entries: dict[str, Optional[str]]
 
 
 def load_profile(path: Path) -> Profile:
@@ -19,7 +34,8 @@ def load_profile(path: Path) -> Profile:
     return Profile(
         name=data.get("name", ""),
         version=data.get("version", ""),
-        aliases={k.lower(): v.lower() for k, v in (data.get("aliases") or {}).items()},
+        # null values are kept: in an overlay they delete the key (see merge_profiles)
+        aliases={k.lower(): v.lower() if v is not None else None for k, v in (data.get("aliases") or {}).items()},
         entries={k.lower(): v for k, v in (data.get("entries") or {}).items()},
     )
 
@@ -28,3 +44,449 @@ def resolve(word: str, profile: Profile) -> Optional[str]:
     w = word.strip().lower()
     base = profile.aliases.get(w, w)
     return profile.entries.get(w) or profile.entries.get(base)
+
+
+class CompiledProfile:
+    """
+    Read-only lookup table built from a Profile.
+
+    Aliases are folded in at compile time, so a lookup is a single dict probe
+    with the same result as resolve(word, profile). Only keys that resolve()
+    can actually reach (already stripped + lowercased) are kept, which lets
+    the hot path skip normalization for tokens that hit as-is.
+    """
+
+    __slots__ = ("name", "version", "table", "digest", "hits", "misses")
+
+    def __init__(self, profile: Profile) -> None:
+        table: dict[str, str] = {}
+        for w in set(profile.entries) | set(profile.aliases):
+            if w.strip().lower() != w:
+                continue
+            e = resolve(w, profile)
+            if e is not None:
+                table[w] = e
+        self.name = profile.name
+        self.version = profile.version
+        self.table: Mapping[str, str] = MappingProxyType(table)
+        # Content hash of the folded table: changes whenever any lookup result would
+        self.digest = hashlib.sha256(
+            json.dumps(sorted(table.items()), ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __contains__(self, word: str) -> bool:
+        return self.resolve_quiet(word) is not None
+
+    def resolve_quiet(self, word: str) -> Optional[str]:
+        """Same as resolve(), but does not touch the hit/miss counters."""
+        table = self.table
+        e = table.get(word)
+        if e is None:
+            e = table.get(word.strip().lower())
+        return e
+
+    def resolve(self, word: str) -> Optional[str]:
+        table = self.table
+        e = table.get(word)
+        if e is None:
+            e = table.get(word.strip().lower())
+        if e is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return e
+
+    def resolve_many(self, tokens: Iterable[str]) -> list[Optional[str]]:
+        table = self.table
+        get = table.get
+        out: list[Optional[str]] = []
+        append = out.append
+        misses = 0
+        for t in tokens:
+            e = get(t)
+            if e is None:
+                e = get(t.strip().lower())
+                if e is None:
+                    misses += 1
+            append(e)
+        self.misses += misses
+        self.hits += len(out) - misses
+        return out
+
+    def reset_counters(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def values(self) -> Iterable[str]:
+        return self.table.values()
+
+
+# Binary profile (*.bin next to the JSON), written by `python -m tools.profile compile`:
+#
+#   header   magic, format, crc32 of everything after the header, sha256
+#            digest (== CompiledProfile.digest), counts and offsets
+#   slots    open-addressing hash index: power-of-two x entry number
+#            (EMPTY_SLOT if free), probed linearly from crc32(key)
+#   keys     count x (key_off, key_len, value_off, value_len), sorted by the
+#            UTF-8 bytes of the key
+#   pool     UTF-8 strings; keys, then deduplicated values, name and version
+#
+# All integers are little-endian u32. The folded table is the same one
+# CompiledProfile builds, so lookups give identical results.
+BINARY_MAGIC = b"SEPROF\x00\x01"
+BINARY_FORMAT = 1
+BINARY_HEADER = struct.Struct("<8sII32sIIIIIIII")
+BINARY_ENTRY = struct.Struct("<IIII")
+BINARY_SLOT = struct.Struct("<I")
+EMPTY_SLOT = 0xFFFFFFFF
+
+
+def _slot_count(n: int) -> int:
+    # load factor <= 0.5 keeps probe chains short
+    size = 8
+    while size < 2 * n:
+        size *= 2
+    return size
+
+
+def encode_binary_profile(profile: AnyProfile) -> bytes:
+    cp = compile_profile(profile)
+    if isinstance(cp, MappedProfile):
+        items = sorted((k.encode("utf-8"), v.encode("utf-8")) for k, v in cp.items())
+    else:
+        items = sorted((k.encode("utf-8"), v.encode("utf-8")) for k, v in cp.table.items())
+    name, version = cp.name.encode("utf-8"), cp.version.encode("utf-8")
+
+    pool = bytearray()
+    interned: dict[bytes, int] = {}
+
+    def intern(s: bytes) -> int:
+        off = interned.get(s)
+        if off is None:
+            off = interned[s] = len(pool)
+            pool.extend(s)
+        return off
+
+    slot_count = _slot_count(len(items))
+    slots = [EMPTY_SLOT] * slot_count
+    for i, (k, _) in enumerate(items):
+        h = zlib.crc32(k) & (slot_count - 1)
+        while slots[h] != EMPTY_SLOT:
+            h = (h + 1) & (slot_count - 1)
+        slots[h] = i
+
+    slots_off = BINARY_HEADER.size
+    index_off = slots_off + BINARY_SLOT.size * slot_count
+    pool_off = index_off + BINARY_ENTRY.size * len(items)
+    key_offs = [intern(k) for k, _ in items]
+    index = bytearray()
+    for (k, v), ko in zip(items, key_offs):
+        index += BINARY_ENTRY.pack(pool_off + ko, len(k), pool_off + intern(v), len(v))
+    name_off, version_off = pool_off + intern(name), pool_off + intern(version)
+
+    body = struct.pack(f"<{slot_count}I", *slots) + bytes(index) + bytes(pool)
+    header = BINARY_HEADER.pack(
+        BINARY_MAGIC,
+        BINARY_FORMAT,
+        zlib.crc32(body),
+        bytes.fromhex(cp.digest),
+        len(items),
+        index_off,
+        slot_count,
+        slots_off,
+        name_off,
+        len(name),
+        version_off,
+        len(version),
+    )
+    return header + body
+
+
+def write_binary_profile(profile: AnyProfile, out_path: Path) -> None:
+    from tools.asset_store import write_atomic
+
+    write_atomic(out_path, encode_binary_profile(profile))
+
+
+def is_binary_profile(path: Path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+class MappedProfile:
+    """
+    Lookup-only view of a binary profile, backed by mmap.
+
+    Nothing is parsed up front: a lookup hashes the key and probes the slot
+    table, so processes that map the same file share its pages. Same API and
+    results as CompiledProfile, minus the `table` dict.
+    """
+
+    __slots__ = ("name", "version", "digest", "hits", "misses", "_mm", "_count", "_index_off", "_slots_off", "_mask")
+
+    def __init__(self, path: Path, verify: bool = True) -> None:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mm) < BINARY_HEADER.size:
+                raise ValueError(f"{path}: truncated binary profile")
+            (
+                magic, fmt, crc, digest, count, index_off, slot_count, slots_off,
+                name_off, name_len, version_off, version_len,
+            ) = BINARY_HEADER.unpack_from(mm, 0)
+            if magic != BINARY_MAGIC or fmt != BINARY_FORMAT:
+                raise ValueError(f"{path}: not a binary profile (format {BINARY_FORMAT})")
+            if (
+                slot_count & (slot_count - 1)
+                or slot_count <= count
+                or slots_off + BINARY_SLOT.size * slot_count > len(mm)
+                or index_off + BINARY_ENTRY.size * count > len(mm)
+            ):
+                raise ValueError(f"{path}: truncated binary profile")
+            if verify:
+                # a view, not mm[...]: slicing the mmap would copy the whole file
+                with memoryview(mm) as view, view[BINARY_HEADER.size :] as body:
+                    ok = zlib.crc32(body) == crc
+                if not ok:
+                    raise ValueError(f"{path}: checksum mismatch")
+        except BaseException:
+            mm.close()
+            raise
+        self._mm = mm
+        self._count = count
+        self._index_off = index_off
+        self._slots_off = slots_off
+        self._mask = slot_count - 1
+        self.name = mm[name_off : name_off + name_len].decode("utf-8")
+        self.version = mm[version_off : version_off + version_len].decode("utf-8")
+        self.digest = digest.hex()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "MappedProfile":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, word: str) -> bool:
+        return self.resolve_quiet(word) is not None
+
+    def _find(self, word: str) -> Optional[str]:
+        try:
+            key = word.encode("utf-8")
+        except UnicodeEncodeError:  # lone surrogates can't be a key
+            return None
+        mm = self._mm
+        mask = self._mask
+        slots_off = self._slots_off
+        index_off = self._index_off
+        slot_size, entry_size = BINARY_SLOT.size, BINARY_ENTRY.size
+        h = zlib.crc32(key) & mask
+        while True:
+            (i,) = BINARY_SLOT.unpack_from(mm, slots_off + slot_size * h)
+            if i == EMPTY_SLOT:
+                return None
+            ko, kl, vo, vl = BINARY_ENTRY.unpack_from(mm, index_off + entry_size * i)
+            if kl == len(key) and mm[ko : ko + kl] == key:
+                return mm[vo : vo + vl].decode("utf-8")
+            h = (h + 1) & mask
+
+    def resolve_quiet(self, word: str) -> Optional[str]:
+        e = self._find(word)
+        if e is None:
+            w = word.strip().lower()
+            if w != word:
+                e = self._find(w)
+        return e
+
+    def resolve(self, word: str) -> Optional[str]:
+        e = self.resolve_quiet(word)
+        if e is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return e
+
+    def resolve_many(self, tokens: Iterable[str]) -> list[Optional[str]]:
+        return [self.resolve(t) for t in tokens]
+
+    def reset_counters(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        """(key, value) pairs in key order."""
+        mm = self._mm
+        for i in range(self._count):
+            ko, kl, vo, vl = BINARY_ENTRY.unpack_from(mm, self._index_off + BINARY_ENTRY.size * i)
+            yield mm[ko : ko + kl].decode("utf-8"), mm[vo : vo + vl].decode("utf-8")
+
+    def values(self) -> Iterable[str]:
+        return (v for _, v in self.items())
+
+
+AnyProfile = Union[Profile, CompiledProfile, MappedProfile]
+LookupProfile = Union[CompiledProfile, MappedProfile]
+
+
+# id(Profile) -> (weak ref to it, its CompiledProfile); entries drop when the Profile dies
+_compiled: dict[int, tuple[weakref.ref, CompiledProfile]] = {}
+
+
+def compile_profile(profile: AnyProfile) -> LookupProfile:
+    """
+    Lookup table for any profile. A plain Profile is compiled once and the
+    result reused for as long as that object lives (Profiles are treated as
+    immutable), so per-call helpers like convert_line() stay cheap.
+    """
+    if isinstance(profile, (CompiledProfile, MappedProfile)):
+        return profile
+    key = id(profile)
+    hit = _compiled.get(key)
+    if hit is not None and hit[0]() is profile:
+        return hit[1]
+    cp = CompiledProfile(profile)
+    _compiled[key] = (weakref.ref(profile, lambda _, key=key: _compiled.pop(key, None)), cp)
+    return cp
+
+
+def load_compiled_profile(path: Path) -> LookupProfile:
+    """JSON profiles are parsed and compiled; binary ones are mapped as-is."""
+    if is_binary_profile(path):
+        return MappedProfile(path)
+    return CompiledProfile(load_profile(path))
+
+
+def merge_profiles(base: Profile, overlays: Iterable[Profile]) -> Profile:
+    """
+    Apply overlays to base, in order; later layers win.
+
+    An overlay sets or adds entries and aliases, and a null value deletes
+    one. Aliases inherit overrides of their target: when an overlay changes
+    the entry of a word but not of its aliases, an alias whose entry was
+    just a copy of the old value (ali -> ale, both ♾️) follows the new one,
+    while an alias with its own, different glyph keeps it.
+    """
+    entries = dict(base.entries)
+    aliases = dict(base.aliases)
+    names = [base.name]
+    for layer in overlays:
+        for k, v in layer.aliases.items():
+            if v is None:
+                aliases.pop(k, None)
+            else:
+                aliases[k] = v
+        for k, v in layer.entries.items():
+            old = entries.get(k)
+            if v is None:
+                entries.pop(k, None)
+            else:
+                entries[k] = v
+            for alias, target in aliases.items():
+                if target == k and alias not in layer.entries and alias in entries and entries[alias] == old:
+                    if v is None:
+                        del entries[alias]
+                    else:
+                        entries[alias] = v
+        if layer.name:
+            names.append(layer.name)
+    return Profile(name=" + ".join(names), version=base.version, aliases=aliases, entries=entries)
+
+
+def _layer(path: Path) -> Profile:
+    if is_binary_profile(path):
+        # the binary table has aliases folded in, so overrides could not reach them
+        raise ValueError(f"{path}: binary profiles cannot be layered, use the JSON source")
+    return load_profile(path)
+
+
+def stack_key(paths: Sequence[Path]) -> str:
+    """Cache key of an overlay stack: the content hashes of its files, in order."""
+    h = hashlib.sha256(f"stack:{STACK_FORMAT}:{BINARY_FORMAT}".encode("ascii"))
+    for path in paths:
+        h.update(hashlib.sha256(path.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def load_profile_stack(paths: Sequence[Path], cache_dir: Optional[Path] = None) -> LookupProfile:
+    """
+    Base profile plus overlays as one flat lookup table. A single path is
+    just load_compiled_profile(). A stack is merged once and stored as a
+    binary profile under cache_dir, keyed by stack_key(); later loads of the
+    same inputs map that file, so lookups cost the same as for one profile
+    whatever the number of layers. cache_dir=None compiles in memory.
+    Layers must be JSON: a binary profile can only be used on its own.
+    """
+    paths = list(paths)
+    if not paths:
+        raise ValueError("no profile given")
+    if len(paths) == 1:
+        return load_compiled_profile(paths[0])
+
+    cached = None
+    if cache_dir is not None:
+        cached = cache_dir / f"{stack_key(paths)}.bin"
+        try:
+            return MappedProfile(cached)
+        except (OSError, ValueError):
+            pass
+
+    layers = [_layer(p) for p in paths]
+    compiled = CompiledProfile(merge_profiles(layers[0], layers[1:]))
+    if cached is not None:
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            write_binary_profile(compiled, cached)  # atomic on its own
+        except OSError:
+            pass  # read-only checkout: still usable, just not cached
+    return compiled
+
+
+def main() -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Compile a JSON profile into the binary, mmap-able format.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compile", help="Write <profile>.bin (or --out) from a JSON profile")
+    c.add_argument("profile", type=Path)
+    c.add_argument("--out", type=Path, default=None)
+    v = sub.add_parser("verify", help="Check a binary profile against its JSON source")
+    v.add_argument("binary", type=Path)
+    v.add_argument("json", type=Path)
+    args = ap.parse_args()
+
+    if args.cmd == "compile":
+        out = args.out or args.profile.with_suffix(".bin")
+        cp = CompiledProfile(load_profile(args.profile))
+        write_binary_profile(cp, out)
+        print(f"OK: {out} ({len(cp)} keys, {out.stat().st_size} bytes, digest {cp.digest[:16]})")
+        return 0
+
+    p = load_profile(args.json)
+    with MappedProfile(args.binary) as mp:
+        words = set(p.entries) | set(p.aliases) | {w.upper() for w in p.entries} | {f" {w} " for w in p.entries}
+        bad = sorted(w for w in words if mp.resolve_quiet(w) != resolve(w, p))
+        digest_ok = mp.digest == CompiledProfile(p).digest
+    for w in bad[:20]:
+        print(f"mismatch: {w!r}", file=sys.stderr)
+    if bad or not digest_ok:
+        print(f"FAIL: {len(bad)} mismatches, digest {'ok' if digest_ok else 'differs'}", file=sys.stderr)
+        return 1
+    print(f"OK: {args.binary} matches {args.json} ({len(words)} words checked)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
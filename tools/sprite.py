@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import base64
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+from tools.png import Image, read_png, write_png
+
+# Inline image output for emojify_to_html: all used Twemoji PNGs packed into
+# one sprite sheet, or embedded as base64 data URIs in a single CSS file.
+# Either way the page needs one or two requests instead of one per emoji.
+
+SPRITE_NAME = "sprite.png"
+CSS_NAME = "emoji.css"
+
+# Shared by both modes; .e-<slug> rules select the glyph
+BASE_CSS = "span.emoji {{ display: inline-block; background-repeat: no-repeat; {extra}}}\n"
+
+
+def css_class(slug: str) -> str:
+    return f"e-{slug}"
+
+
+@dataclass
+class SpriteSheet:
+    image: Image
+    columns: int
+    rows: int
+    cell_width: int
+    cell_height: int
+    # slug -> (column, row)
+    cells: dict[str, tuple[int, int]]
+
+
+def build_sprite(images: dict[str, Image], columns: int = 0) -> SpriteSheet:
+    """Pack images (slug -> RGBA image) into a grid; cells are sized to the largest image."""
+    slugs = sorted(images)
+    n = max(1, len(slugs))
+    cols = columns or math.ceil(math.sqrt(n))
+    rows = math.ceil(n / cols)
+    cw = max((im.width for im in images.values()), default=1)
+    ch = max((im.height for im in images.values()), default=1)
+
+    width = cols * cw
+    sheet = bytearray(width * rows * ch * 4)
+    cells: dict[str, tuple[int, int]] = {}
+    for i, slug in enumerate(slugs):
+        im = images[slug]
+        col, row = i % cols, i // cols
+        cells[slug] = (col, row)
+        for y in range(im.height):
+            dst = ((row * ch + y) * width + col * cw) * 4
+            sheet[dst : dst + im.width * 4] = im.rgba[y * im.width * 4 : (y + 1) * im.width * 4]
+    return SpriteSheet(Image(width, rows * ch, sheet), cols, rows, cw, ch, cells)
+
+
+def sprite_css(sheet: SpriteSheet, href: str = SPRITE_NAME) -> str:
+    # Percent sizes/positions keep the sprite aligned at any rendered emoji size
+    out = [
+        BASE_CSS.format(
+            extra=f"background-image: url({href}); "
+            f"background-size: {sheet.columns * 100}% {sheet.rows * 100}%; "
+        )
+    ]
+    for slug, (col, row) in sorted(sheet.cells.items()):
+        x = col * 100 / (sheet.columns - 1) if sheet.columns > 1 else 0
+        y = row * 100 / (sheet.rows - 1) if sheet.rows > 1 else 0
+        out.append(f".{css_class(slug)} {{ background-position: {x:g}% {y:g}%; }}\n")
+    return "".join(out)
+
+
+def data_uri_css(pngs: dict[str, bytes]) -> str:
+    out = [BASE_CSS.format(extra="background-size: contain; ")]
+    for slug, data in sorted(pngs.items()):
+        uri = "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+        out.append(f".{css_class(slug)} {{ background-image: url({uri}); }}\n")
+    return "".join(out)
+
+
+def write_inline_assets(outdir: Path, sources: dict[str, Path], mode: str) -> list[Path]:
+    """Write emoji.css (and sprite.png for mode "sprite") for the given slug -> PNG path map."""
+    css_path = outdir / CSS_NAME
+    if mode == "sprite":
+        sheet = build_sprite({slug: read_png(p.read_bytes()) for slug, p in sources.items()})
+        sprite_path = outdir / SPRITE_NAME
+        sprite_path.write_bytes(write_png(sheet.image))
+        css_path.write_text(sprite_css(sheet), encoding="utf-8")
+        return [css_path, sprite_path]
+    if mode == "datauri":
+        css_path.write_text(data_uri_css({slug: p.read_bytes() for slug, p in sources.items()}), encoding="utf-8")
+        return [css_path]
+    raise ValueError(f"Unknown inline image mode: {mode}")
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-import unicodedata
+from functools import lru_cache
+from typing import Iterable, Optional
 
 # Variation selectors: text/emoji presentation
 VS15 = 0xFE0E
 VS16 = 0xFE0F
 
+# str.translate() table dropping both selectors
+_DROP_VS = {VS15: None, VS16: None}
+
 def emoji_to_codepoints(s: str) -> list[int]:
     # Python strings are Unicode scalar values; iterating gives code points.
     return [ord(ch) for ch in s]
@@ -15,14 +19,38 @@ def to_twemoji_slug(s: str) -> str:
     Twemoji assets are named by hex codepoints joined with '-'.
     In most cases FE0F is omitted in filenames (Twemoji convention).
     """
-    cps = []
-    for cp in emoji_to_codepoints(s):
-        if cp in (VS15, VS16):
-            continue
-        cps.append(cp)
-    return "-".join(f"{cp:x}" for cp in cps)
+    return "-".join([f"{ord(ch):x}" for ch in s.translate(_DROP_VS)])
 
 def is_probably_emoji_token(token: str) -> bool:
     # Heuristic: if it contains any char in emoji-ish categories or is non-ascii symbol.
     # Good enough for our space-separated pipeline.
-    return any(ord(ch) > 0x7F for ch in token) and token.strip() != ""
+    # (non-ASCII implies non-empty, so "not only whitespace" is enough for strip() != "")
+    return not token.isascii() and not token.isspace()
+
+# Glyphs outside a profile (raw emoji already in the text) go through a bounded memo
+cached_twemoji_slug = lru_cache(maxsize=4096)(to_twemoji_slug)
+
+class SlugIndex:
+    """
+    Precomputed emoji -> slug table for a fixed set of glyphs (e.g. a profile's
+    entries), so the per-token work is one dict probe. Other tokens fall back to
+    is_probably_emoji_token() and the bounded cached_twemoji_slug().
+    """
+
+    __slots__ = ("slugs",)
+
+    def __init__(self, glyphs: Iterable[str]) -> None:
+        self.slugs: dict[str, str] = {g: to_twemoji_slug(g) for g in glyphs if is_probably_emoji_token(g)}
+
+    def slug(self, token: str) -> str:
+        s = self.slugs.get(token)
+        return s if s is not None else cached_twemoji_slug(token)
+
+    def emoji_slug(self, token: str) -> Optional[str]:
+        """Slug if token looks like an emoji, else None."""
+        s = self.slugs.get(token)
+        if s is not None:
+            return s
+        if is_probably_emoji_token(token):
+            return cached_twemoji_slug(token)
+        return None